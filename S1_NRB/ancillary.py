@@ -1,17 +1,93 @@
 import os
+import re
 import sys
 import logging
 import binascii
 from lxml import etree
 from datetime import datetime, timedelta
-from osgeo import gdal
+from osgeo import gdal, ogr
 import spatialist
-from spatialist.vector import bbox, intersect
+from spatialist.vector import bbox
 import pyroSAR
-from pyroSAR import examine, identify_many
+from pyroSAR import examine
 import S1_NRB
 
 
+class SceneName(object):
+    """
+    Lightweight Sentinel-1 scene descriptor with the attributes encoded in the file name.
+    Can be used instead of a :class:`pyroSAR.drivers.ID` object where only these attributes are needed,
+    e.g. for grouping and ordering scenes, without accessing the scene itself.
+    
+    Parameters
+    ----------
+    scene: str
+        the scene file name or path, e.g. `S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160.zip`
+    
+    Attributes
+    ----------
+    scene: str
+        the scene file name or path as provided
+    sensor: str
+        S1A or S1B
+    acquisition_mode: str
+        e.g. IW, EW or S1-S6
+    product: str
+        SLC, GRD or OCN
+    resolution: str
+        the resolution class F, H, M or _
+    polarizations: list[str]
+        the polarizations, e.g. ['VV', 'VH']
+    start: str
+        the acquisition start in format '%Y%m%dT%H%M%S'
+    stop: str
+        the acquisition stop in format '%Y%m%dT%H%M%S'
+    orbitNumber_abs: int
+        the absolute orbit number
+    frameNumber: int
+        the data take ID in decimal representation
+    uid: str
+        the unique product identifier (last four characters of the name)
+    
+    Raises
+    ------
+    RuntimeError
+    """
+    __slots__ = ['scene', 'sensor', 'acquisition_mode', 'product', 'resolution', 'polarizations',
+                 'start', 'stop', 'orbitNumber_abs', 'frameNumber', 'uid']
+    pattern = re.compile(r'(?P<sensor>S1[AB])_'
+                         r'(?P<acquisition_mode>S[1-6]|IW|EW|WV|EN|N[1-6]|IM)_'
+                         r'(?P<product>SLC|GRD|OCN)(?P<resolution>[FHM_])_'
+                         r'[12][SA](?P<polarizations>SH|SV|DH|DV|HH|VV|HV|VH)_'
+                         r'(?P<start>[0-9]{8}T[0-9]{6})_'
+                         r'(?P<stop>[0-9]{8}T[0-9]{6})_'
+                         r'(?P<orbitNumber_abs>[0-9]{6})_'
+                         r'(?P<frameNumber>[0-9A-F]{6})_'
+                         r'(?P<uid>[0-9A-F]{4})')
+    pol_lookup = {'SH': ['HH'], 'SV': ['VV'], 'DH': ['HH', 'HV'], 'DV': ['VV', 'VH']}
+    
+    def __init__(self, scene):
+        match = self.pattern.match(os.path.basename(scene))
+        if match is None:
+            raise RuntimeError(f'not a Sentinel-1 scene name: {scene}')
+        self.scene = scene
+        self.sensor, self.acquisition_mode, self.product, self.resolution, pols, \
+            self.start, self.stop, orbit, frame, self.uid = match.groups()
+        self.polarizations = self.pol_lookup.get(pols, [pols])
+        self.orbitNumber_abs = int(orbit)
+        self.frameNumber = int(frame, 16)
+    
+    def __repr__(self):
+        return f'SceneName({self.scene!r})'
+    
+    @property
+    def meta(self):
+        """
+        the attributes as dictionary, consistent with :attr:`pyroSAR.drivers.ID.meta`
+        """
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
 def check_scene_consistency(scenes):
     """
     Check the consistency of a scene selection.
@@ -24,7 +100,8 @@ def check_scene_consistency(scenes):
     
     Parameters
     ----------
-    scenes: list[str or pyroSAR.drivers.ID]
+    scenes: list[str or pyroSAR.drivers.ID or SceneName]
+        the scenes; file names are not opened but read as :class:`SceneName`
 
     Returns
     -------
@@ -33,7 +110,7 @@ def check_scene_consistency(scenes):
     ------
     RuntimeError
     """
-    scenes = identify_many(scenes)
+    scenes = [SceneName(x) if isinstance(x, str) else x for x in scenes]
     for attr in ['sensor', 'acquisition_mode', 'product', 'frameNumber']:
         values = set([getattr(x, attr) for x in scenes])
         if not len(values) == 1:
@@ -170,19 +247,20 @@ def group_by_time(scenes, time=3):
 
     Parameters
     ----------
-    scenes:list[pyroSAR.drivers.ID or str]
-        a list of image names
+    scenes:list[pyroSAR.drivers.ID or SceneName or str]
+        a list of image names; file names are not opened but read as :class:`SceneName`
     time: int or float
         a time difference in seconds by which to group the scenes.
         The default of 3 seconds incorporates the overlap between SLCs.
 
     Returns
     -------
-    list[list[pyroSAR.drivers.ID]]
-        a list of sub-lists containing the file names of the grouped scenes
+    list[list[pyroSAR.drivers.ID or SceneName]]
+        a list of sub-lists containing the grouped scenes
     """
     # sort images by time stamp
-    scenes = identify_many(scenes, sortkey='start')
+    scenes = [SceneName(x) if isinstance(x, str) else x for x in scenes]
+    scenes = sorted(scenes, key=lambda x: x.start)
     
     if len(scenes) < 2:
         return [scenes]
@@ -248,13 +326,23 @@ def _log_process_config(logger, config):
     ard_dir             {config['ard_dir']}
     wbm_dir             {config['wbm_dir']}
     log_dir             {config['log_dir']}
+    cache_dir           {config.get('cache_dir')}
     etad_dir            {config['etad_dir']}
     scene_dir           {config['scene_dir']}
     db_file             {config['db_file']}
     stac_catalog        {config['stac_catalog']}
     stac_collections    {config['stac_collections']}
+    stac_cache_ttl      {config.get('stac_cache_ttl')}
+    asf_mirror          {config.get('asf_mirror')}
+    dem_cache_size      {config.get('dem_cache_size')}
+    dem_cache_mode      {config.get('dem_cache_mode')}
     kml_file            {config['kml_file']}
     gdal_threads        {config.get('gdal_threads')}
+    ard_workers         {config.get('ard_workers')}
+    sar_workers         {config.get('sar_workers')}
+    work_queue          {config.get('work_queue')}
+    profile             {config.get('profile')}
+    trace               {config.get('trace')}
     snap_gpt_args       {config['snap_gpt_args']}
     
     ====================================================================================================================
@@ -336,7 +424,10 @@ def vrt_add_overviews(vrt, overviews, resampling='AVERAGE'):
 def buffer_min_overlap(geom1, geom2, percent=1):
     """
     Buffer a geometry to a minimum overlap with a second geometry.
-    The geometry is iteratively buffered until the minimum overlap is reached.
+    The extent of `geom1` is enlarged in steps of 1% of its width and height until its intersection
+    with `geom2` covers at least `percent` of the area of `geom2`. As the overlap grows monotonically with
+    the buffer, the smallest sufficient step is found by doubling the buffer and subsequent bisection, so that
+    only a few intersections need to be computed.
     If the overlap of the input geometries is already larger than the defined
     threshold, a copy of the original geometry is returned.
 
@@ -347,33 +438,54 @@ def buffer_min_overlap(geom1, geom2, percent=1):
     geom2: spatialist.vector.Vector
         the reference geometry to intersect with
     percent: int or float
-        the minimum overlap in percent of `geom1`
+        the minimum overlap in percent of `geom2`; must not be larger than 100
 
     Returns
     -------
-
+    spatialist.vector.Vector
+        the buffered bounding box of `geom1` in EPSG:4326
     """
-    geom2_area = geom2.getArea()
+    if percent > 100:
+        raise RuntimeError("'percent' must not be larger than 100")
     ext = geom1.extent
-    ext2 = ext.copy()
     xdist = ext['xmax'] - ext['xmin']
     ydist = ext['ymax'] - ext['ymin']
-    buffer = 0
-    overlap = 0
-    while overlap < percent:
+    with geom2.clone() as ref:
+        ref.reproject(4326)
+        geometries = [feat.GetGeometryRef().Clone() for feat in ref.layer]
+        ref.layer.ResetReading()
+    # the area of geom2 in the same CRS as the intersections
+    geom2_area = sum([geom.GetArea() for geom in geometries])
+    
+    def buffered(buffer):
         xbuf = xdist * buffer / 100 / 2
         ybuf = ydist * buffer / 100 / 2
-        ext2['xmin'] = ext['xmin'] - xbuf
-        ext2['xmax'] = ext['xmax'] + xbuf
-        ext2['ymin'] = ext['ymin'] - ybuf
-        ext2['ymax'] = ext['ymax'] + ybuf
-        with bbox(ext2, 4326) as geom3:
-            ext3 = geom3.extent
-            with intersect(geom2, geom3) as inter:
-                inter_area = inter.getArea()
-                overlap = inter_area / geom2_area * 100
-        buffer += 1
-    return bbox(ext3, 4326)
+        return {'xmin': ext['xmin'] - xbuf, 'xmax': ext['xmax'] + xbuf,
+                'ymin': ext['ymin'] - ybuf, 'ymax': ext['ymax'] + ybuf}
+    
+    def overlap(buffer):
+        ext2 = buffered(buffer)
+        ring = ogr.Geometry(ogr.wkbLinearRing)
+        for x, y in [('xmin', 'ymin'), ('xmin', 'ymax'), ('xmax', 'ymax'), ('xmax', 'ymin'), ('xmin', 'ymin')]:
+            ring.AddPoint_2D(ext2[x], ext2[y])
+        box = ogr.Geometry(ogr.wkbPolygon)
+        box.AddGeometry(ring)
+        inter_area = sum([geom.Intersection(box).GetArea() for geom in geometries])
+        return inter_area / geom2_area * 100
+    
+    # find a buffer reaching the minimum overlap by doubling,
+    # then the smallest one by bisection between the last two buffers
+    lower = upper = 0
+    while overlap(upper) < percent:
+        lower = upper
+        upper = max(1, upper * 2)
+    while upper - lower > 1:
+        middle = (lower + upper) // 2
+        if overlap(middle) < percent:
+            lower = middle
+        else:
+            upper = middle
+    return bbox(buffered(upper), 4326)
 
 
 def buffer_time(start, stop, **kwargs):
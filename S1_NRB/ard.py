@@ -15,18 +15,19 @@ from spatialist.vector import Vector, vectorize, boundary, bbox, intersect
 from spatialist.raster import Raster, rasterize, Dtype
 from spatialist.auxil import gdalwarp, gdalbuildvrt
 from spatialist.ancillary import finder
-from pyroSAR import identify, identify_many
+from S1_NRB.cache import identify_many
 import S1_NRB
-from S1_NRB import dem, ocn
+from S1_NRB import dem, ocn, metrics, profiling
 from S1_NRB.metadata import extract, xml, stac
 from S1_NRB.metadata.mapping import LERC_ERR_THRES
-from S1_NRB.ancillary import generate_unique_id, vrt_add_overviews
+from S1_NRB.ancillary import SceneName, generate_unique_id, vrt_add_overviews
 from S1_NRB.metadata.extract import copy_src_meta, get_src_meta, find_in_annotation
 from S1_NRB.snap import find_datasets
+from S1_NRB.ledger import track, tile_name
 
 
 def format(config, product_type, scenes, datadir, outdir, tile, extent, epsg, wbm=None, dem_type=None, multithread=True,
-           compress=None, overviews=None, kml=None, annotation=None, update=False):
+           compress=None, overviews=None, kml=None, annotation=None, update=False, ledger=None):
     """
     Finalizes the generation of Sentinel-1 Analysis Ready Data (ARD) products after SAR processing has finished.
     This includes the following:
@@ -88,6 +89,10 @@ def format(config, product_type, scenes, datadir, outdir, tile, extent, epsg, wb
         - wm: OCN product wind model; requires OCN scenes via argument `scenes_ocn`
     update: bool
         modify existing products so that only missing files are re-created?
+    ledger: S1_NRB.ledger.Ledger or None
+        an optional processing ledger. If defined, the product directory and all finished layers are recorded.
+        A product whose generation has not been finished is resumed by re-creating only the layers that
+        have not been recorded as finished. See :meth:`S1_NRB.ledger.Ledger.cleanup`.
     
     Returns
     -------
@@ -112,7 +117,8 @@ def format(config, product_type, scenes, datadir, outdir, tile, extent, epsg, wb
     t = proc_time.isoformat().encode()
     product_id = generate_unique_id(encoded_str=t)
     
-    src_ids, datasets_sar = get_datasets(scenes=scenes, datadir=datadir, extent=extent, epsg=epsg)
+    with metrics.measure('ard.get_datasets'):
+        src_ids, datasets_sar = get_datasets(scenes=scenes, datadir=datadir, extent=extent, epsg=epsg)
     if len(src_ids) == 0:
         print('None of the processed scenes overlap with the current tile {tile_id}'.format(tile_id=tile))
         return
@@ -154,14 +160,26 @@ def format(config, product_type, scenes, datadir, outdir, tile, extent, epsg, wb
     
     ard_base = skeleton_dir.format(**meta)
     existing = finder(outdir, [ard_base.replace(product_id, '*')], foldermode=2)
-    if len(existing) > 0:
+    record = None
+    if ledger is not None:
+        record = ledger.get(kind='tile', name=tile_name(tile, scenes))
+    if record is not None and record['status'] == 'done' and not update:
+        return 'Already processed - Skip!'
+    if record is not None and record['outputs'] is not None and os.path.isdir(record['outputs'][0]):
+        ard_dir = record['outputs'][0]
+        if not update:
+            # resume a product whose generation has not been finished
+            ledger.cleanup(directory=ard_dir)
+    elif record is None and len(existing) > 0:
+        # no ledger or a product created before the ledger was introduced
         if not update:
             return 'Already processed - Skip!'
-        else:
-            ard_dir = existing[0]
+        ard_dir = existing[0]
     else:
         ard_dir = os.path.join(outdir, ard_base)
     os.makedirs(ard_dir, exist_ok=True)
+    if ledger is not None:
+        ledger.set(kind='tile', name=tile_name(tile, scenes), status='running', outputs=[ard_dir])
     subdirectories = ['measurement', 'annotation', 'source', 'support']
     for subdirectory in subdirectories:
         os.makedirs(os.path.join(ard_dir, subdirectory), exist_ok=True)
@@ -215,7 +233,9 @@ def format(config, product_type, scenes, datadir, outdir, tile, extent, epsg, wb
                        'dstNodata': dst_nodata_float, 'multithread': multithread,
                        'creationOptions': write_options[key]}
             
-            gdalwarp(src=source, dst=outname, **options)
+            with track(ledger, kind='layer', name=outname, inputs=images), \
+                    metrics.measure('ard.gdalwarp', layer=key):
+                gdalwarp(src=source, dst=outname, **options)
             if ras is not None:
                 ras.close()
         datasets_ard[key] = outname
@@ -233,21 +253,23 @@ def format(config, product_type, scenes, datadir, outdir, tile, extent, epsg, wb
         
         dm_path = ref_tif.replace(f'-{ref_key}.tif', '-dm.tif')
         if not os.path.isfile(dm_path):
-            create_data_mask(outname=dm_path, datasets=datasets_sar, extent=extent, epsg=epsg,
-                             driver=driver, creation_opt=write_options['dm'],
-                             overviews=overviews, overview_resampling=ovr_resampling,
-                             dst_nodata=dst_nodata_byte, wbm=wbm, product_type=product_type)
+            with track(ledger, kind='layer', name=dm_path), metrics.measure('ard.create_data_mask'):
+                create_data_mask(outname=dm_path, datasets=datasets_sar, extent=extent, epsg=epsg,
+                                 driver=driver, creation_opt=write_options['dm'],
+                                 overviews=overviews, overview_resampling=ovr_resampling,
+                                 dst_nodata=dst_nodata_byte, wbm=wbm, product_type=product_type)
         datasets_ard['dm'] = dm_path
     
     # create acquisition ID image raster (-id.tif)
     if 'id' in allowed:
         id_path = ref_tif.replace(f'-{ref_key}.tif', '-id.tif')
         if not os.path.isfile(id_path):
-            create_acq_id_image(outname=id_path, ref_tif=ref_tif,
-                                datasets=datasets_sar, src_ids=src_ids,
-                                extent=extent, epsg=epsg, driver=driver,
-                                creation_opt=write_options['id'],
-                                overviews=overviews, dst_nodata=dst_nodata_byte)
+            with track(ledger, kind='layer', name=id_path), metrics.measure('ard.create_acq_id_image'):
+                create_acq_id_image(outname=id_path, ref_tif=ref_tif,
+                                    datasets=datasets_sar, src_ids=src_ids,
+                                    extent=extent, epsg=epsg, driver=driver,
+                                    creation_opt=write_options['id'],
+                                    overviews=overviews, dst_nodata=dst_nodata_byte)
         datasets_ard['id'] = id_path
     
     # create DEM (-em.tif)
@@ -262,10 +284,11 @@ def format(config, product_type, scenes, datadir, outdir, tile, extent, epsg, wb
             log_pyro = logging.getLogger('pyroSAR')
             level = log_pyro.level
             log_pyro.setLevel('NOTSET')
-            dem.to_mgrs(dem_type=dem_type, dst=em_path, kml=kml,
-                        overviews=overviews, tile=tile, tr=tr,
-                        create_options=write_options['em'],
-                        pbar=False)
+            with track(ledger, kind='layer', name=em_path), metrics.measure('ard.dem'):
+                dem.to_mgrs(dem_type=dem_type, dst=em_path, kml=kml,
+                            overviews=overviews, tile=tile, tr=tr,
+                            create_options=write_options['em'],
+                            pbar=False)
             log_pyro.setLevel(level)
         datasets_ard['em'] = em_path
     
@@ -371,9 +394,11 @@ def format(config, product_type, scenes, datadir, outdir, tile, extent, epsg, wb
         
         gapfill = True if src_ids[0].product == 'GRD' else False
         
-        wind_normalization(src=wm, dst_wm=wm_ard, dst_wn=wn_ard, measurement=copol_sigma0,
-                           gapfill=gapfill, bounds=bounds, epsg=epsg, driver=driver, creation_opt=write_options['wm'],
-                           dst_nodata=dst_nodata_float, multithread=multithread)
+        with track(ledger, kind='layer', name=wm_ard, inputs=wm), metrics.measure('ard.wind_normalization'):
+            wind_normalization(src=wm, dst_wm=wm_ard, dst_wn=wn_ard, measurement=copol_sigma0,
+                               gapfill=gapfill, bounds=bounds, epsg=epsg, driver=driver,
+                               creation_opt=write_options['wm'], dst_nodata=dst_nodata_float,
+                               multithread=multithread)
         datasets_ard['wm'] = wm_ard
         datasets_ard[f'{copol_sigma0_key}-wn'] = wn_ard
     
@@ -390,20 +415,57 @@ def format(config, product_type, scenes, datadir, outdir, tile, extent, epsg, wb
     # create metadata files in XML and (STAC) JSON formats
     start = datetime.strptime(ard_start, '%Y%m%dT%H%M%S')
     stop = datetime.strptime(ard_stop, '%Y%m%dT%H%M%S')
-    meta = extract.meta_dict(config=config, target=ard_dir, src_ids=src_ids, sar_dir=datadir,
-                             proc_time=proc_time, start=start, stop=stop, compression=compress,
-                             product_type=product_type, wm_ref_files=wm_ref_files)
+    with metrics.measure('ard.meta_dict'), profiling.profile('extract.meta_dict'):
+        meta = extract.meta_dict(config=config, target=ard_dir, src_ids=src_ids, sar_dir=datadir,
+                                 proc_time=proc_time, start=start, stop=stop, compression=compress,
+                                 product_type=product_type, wm_ref_files=wm_ref_files)
     ard_assets = sorted(sorted(list(datasets_ard.values()), key=lambda x: os.path.splitext(x)[1]),
                         key=lambda x: os.path.basename(os.path.dirname(x)), reverse=True)
     if config['meta']['copy_original']:
         copy_src_meta(ard_dir=ard_dir, src_ids=src_ids)
     if 'OGC' in config['meta']['format']:
-        xml.parse(meta=meta, target=ard_dir, assets=ard_assets, exist_ok=True)
+        with metrics.measure('ard.xml'), profiling.profile('xml.parse'):
+            xml.parse(meta=meta, target=ard_dir, assets=ard_assets, exist_ok=True)
     if 'STAC' in config['meta']['format']:
-        stac.parse(meta=meta, target=ard_dir, assets=ard_assets, exist_ok=True)
+        with metrics.measure('ard.stac'), profiling.profile('stac.parse'):
+            stac.parse(meta=meta, target=ard_dir, assets=ard_assets, exist_ok=True)
     return str(round((time.time() - start_time), 2))
 
 
+def find_products(outdir, scenes, product_type, tile):
+    """
+    Find existing ARD products of a tile by their directory name.
+    The products are matched by mission, acquisition mode, product type, absolute orbit number, data take ID
+    and MGRS tile ID, which are all derived from the source scene names. Other than in :func:`format`,
+    no access to the SAR processing output is needed. This is used to recognize products that have been
+    created before the processing ledger was introduced (see :mod:`S1_NRB.ledger`).
+    
+    Parameters
+    ----------
+    outdir: str
+        the directory containing the ARD products of the tile
+    scenes: list[str]
+        the source scenes of the tile
+    product_type: str
+        the type of ARD product; either 'NRB' or 'ORB'
+    tile: str
+        ID of an MGRS tile
+    
+    Returns
+    -------
+    list[str]
+        the product directories
+    """
+    if not os.path.isdir(outdir):
+        return []
+    first = SceneName(sorted([os.path.basename(x) for x in scenes])[0])
+    pattern = '{mission}_{mode}_{ard_spec}__1S*_*_{orbitnumber:06}_{datatake:0>6}_{tile}_*'
+    pattern = pattern.format(mission=first.sensor, mode=first.acquisition_mode, ard_spec=product_type,
+                             orbitnumber=first.orbitNumber_abs,
+                             datatake=hex(first.frameNumber).replace('x', '').upper(), tile=tile)
+    return finder(outdir, [pattern], foldermode=2)
+
+
 def get_datasets(scenes, datadir, extent, epsg):
     """
     Collect processing output for a list of scenes.
@@ -1013,7 +1075,7 @@ def create_acq_id_image(outname, ref_tif, datasets, src_ids, extent,
         if not len(src_scenes) == 2 and len(datasets) == 2:
             raise RuntimeError('expected lists `src_scenes` and `valid_mask_list` to be of length 2; length is '
                                '{} and {} respectively'.format(len(src_scenes), len(datasets)))
-        starts_src = [datetime.strptime(identify(f).start, '%Y%m%dT%H%M%S') for f in src_scenes]
+        starts_src = [datetime.strptime(sid.start, '%Y%m%dT%H%M%S') for sid in src_ids]
         start_valid = [re.search('[0-9]{8}T[0-9]{6}', os.path.basename(x)).group() for x in src_scenes]
         start_valid = [datetime.strptime(x, '%Y%m%dT%H%M%S') for x in start_valid]
         if starts_src[0] > starts_src[1]:
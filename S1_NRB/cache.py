@@ -0,0 +1,362 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import operator
+import threading
+import pyroSAR
+from pyroSAR import drivers
+from S1_NRB import context
+
+_schema = 1
+_identified = {}
+_lock = threading.Lock()
+
+
+class DiskCache(object):
+    """
+    A simple on-disk cache for JSON-serializable values, e.g. the results of catalog queries.
+    Each value is stored in a file named by the hash of its key (see :meth:`key`), so the cache can be
+    shared by several processes and is kept between processing runs.
+
+    Parameters
+    ----------
+    directory: str
+        the cache directory; is created if it does not exist
+    ttl: int or float or None
+        the time to live of an entry in seconds. Older entries are discarded on access.
+        None: entries never expire. 0: all entries are expired, i.e. they are refreshed.
+    max_size: int or None
+        the maximum size of the cache in bytes. If exceeded when an entry is added, the least recently
+        used entries are removed. None: no size limit.
+        The size is scanned once and then tracked by the instance, so entries added by other processes
+        are only taken into account at the next eviction.
+
+    Examples
+    --------
+    >>> from S1_NRB.cache import DiskCache
+    >>> cache = DiskCache(directory='/path/to/cache', ttl=3600)
+    >>> key = cache.key(collections=['sentinel-1-grd'], bbox=[11.0, 45.9, 12.4, 47.0])
+    >>> value = cache.get(key)
+    >>> if value is None:
+    >>>     value = ['S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160.SAFE']
+    >>>     cache.set(key, value)
+    """
+
+    def __init__(self, directory, ttl=None, max_size=100 * 1024 ** 2):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+        self._size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def __str__(self):
+        return self.directory
+
+    @staticmethod
+    def key(**kwargs):
+        """
+        Create a cache key from arbitrary keyword arguments.
+        The key does not depend on the order of the arguments or of dictionary entries.
+
+        Parameters
+        ----------
+        kwargs
+            the arguments defining the cached value, e.g. query parameters
+
+        Returns
+        -------
+        str
+            the SHA-256 hash of the arguments
+        """
+        encoded = json.dumps(kwargs, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        """
+        Get a value from the cache.
+
+        Parameters
+        ----------
+        key: str
+            the cache key
+
+        Returns
+        -------
+        object or None
+            the cached value or None if no entry exists or the entry has expired
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if self.ttl is not None and time.time() - entry['created'] >= self.ttl:
+            return None
+        # the modification time marks the last access and is used for size-based eviction
+        os.utime(path)
+        return entry['value']
+
+    def set(self, key, value):
+        """
+        Add a value to the cache or replace an existing one.
+
+        Parameters
+        ----------
+        key: str
+            the cache key
+        value
+            a JSON-serializable value
+
+        Returns
+        -------
+
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'created': time.time(), 'value': value}, f)
+        os.replace(tmp, path)
+        if self.max_size is not None:
+            # the directory is only scanned on the first write and if the size limit is exceeded
+            if self._size is None:
+                self._size = sum([x[1] for x in self._entries()])
+            else:
+                self._size += os.path.getsize(path) - replaced
+            if self._size > self.max_size:
+                self.evict(max_size=self.max_size)
+
+    def evict(self, max_size=0):
+        """
+        Remove the least recently used entries until the cache size does not exceed `max_size`.
+
+        Parameters
+        ----------
+        max_size: int
+            the maximum size of the cache in bytes. Default 0: remove all entries.
+
+        Returns
+        -------
+
+        """
+        entries = self._entries()
+        size = sum([x[1] for x in entries])
+        for mtime, fsize, path in sorted(entries):
+            if size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= fsize
+        self._size = size
+
+    def _entries(self):
+        entries = []
+        for root, dirs, files in os.walk(self.directory):
+            for file in files:
+                if file.endswith('.json'):
+                    path = os.path.join(root, file)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+
+def configure(directory):
+    """
+    Enable the persistent cache of :func:`identify` for the current processing run.
+    The metadata of the handlers is stored as JSON in an SQLite database `identify.db` in `directory`.
+    The file name is stored in the run context; see :mod:`S1_NRB.context`.
+
+    Parameters
+    ----------
+    directory: str
+        the cache directory
+
+    Returns
+    -------
+    str
+        the name of the database file
+    """
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, 'identify.db')
+    con = sqlite3.connect(filename, timeout=120)
+    try:
+        # the pickled handlers of earlier versions are not read anymore
+        con.execute('DROP TABLE IF EXISTS scenes')
+        con.execute('''CREATE TABLE IF NOT EXISTS handlers
+                       (path TEXT PRIMARY KEY,
+                        size INTEGER NOT NULL,
+                        mtime INTEGER NOT NULL,
+                        version TEXT NOT NULL,
+                        data TEXT NOT NULL)''')
+        con.commit()
+    finally:
+        con.close()
+    context.update(identify_cache=filename)
+    return filename
+
+
+def identify(scene):
+    """
+    Cached version of :func:`pyroSAR.drivers.identify`.
+    The metadata handlers are kept in memory for the lifetime of the process and, if configured via
+    :func:`configure`, in a database shared by all processes and processing runs.
+    Instead of the handler objects, the name of the handler class, the metadata dictionary and the remaining
+    instance attributes are stored as JSON, from which a handler is restored without reading the scene.
+    The entries are stored by the real path, size and modification time of the scene and the versions of the
+    cache format and pyroSAR, so a handler is created anew if the scene or pyroSAR has changed or if an entry
+    cannot be restored. Each call returns a new object that can safely be modified,
+    e.g. by :meth:`pyroSAR.drivers.ID.unpack`.
+
+    Parameters
+    ----------
+    scene: str
+        a file or directory name
+
+    Returns
+    -------
+    pyroSAR.drivers.ID
+        a pyroSAR metadata handler
+    """
+    if not os.path.exists(scene):
+        raise OSError("No such file or directory: '{}'".format(scene))
+    path = os.path.realpath(scene)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns, _version())
+    data = _identified.get(key)
+    filename = context.get('identify_cache')
+    if data is None and filename is not None:
+        data = _read(filename, key)
+    if data is not None:
+        try:
+            handler = _decode(data)
+        except Exception:
+            # e.g. an incomplete entry or one that does not match the handler classes; the entry is replaced
+            handler = None
+        if handler is not None:
+            with _lock:
+                _identified[key] = data
+            return handler
+    handler = drivers.identify(scene)
+    try:
+        data = _encode(handler)
+    except (TypeError, ValueError):
+        # handlers with attributes that cannot be serialized are not cached
+        return handler
+    with _lock:
+        _identified[key] = data
+    if filename is not None:
+        _write(filename, key, data)
+    return handler
+
+
+def identify_many(scenes, sortkey=None):
+    """
+    Cached version of :func:`pyroSAR.drivers.identify_many` using :func:`identify`.
+    Scenes that cannot be identified are skipped.
+
+    Parameters
+    ----------
+    scenes: list[str or pyroSAR.drivers.ID]
+        the file names of the scenes to be identified
+    sortkey: str or None
+        sort the handler object list by an attribute
+
+    Returns
+    -------
+    list[pyroSAR.drivers.ID]
+        a list of pyroSAR metadata handlers
+    """
+    out = []
+    for scene in scenes:
+        if isinstance(scene, drivers.ID):
+            out.append(scene)
+        else:
+            try:
+                out.append(identify(scene))
+            except RuntimeError:
+                continue
+    if sortkey is not None:
+        out.sort(key=operator.attrgetter(sortkey))
+    return out
+
+
+def _version():
+    return f'{_schema}/{getattr(pyroSAR, "__version__", "unknown")}'
+
+
+def _encode(handler):
+    """
+    Helper function to serialize a metadata handler to JSON.
+    The standardized attributes (see :class:`pyroSAR.drivers.ID`) are not stored as they are restored from `meta`.
+    """
+    standard = getattr(handler, 'locals', [])
+    attributes = {k: v for k, v in vars(handler).items() if k not in standard and k != 'meta'}
+    record = {'driver': type(handler).__name__, 'meta': handler.meta, 'attributes': attributes}
+    return json.dumps(_tag(record))
+
+
+def _decode(data):
+    """
+    Helper function to restore a metadata handler serialized with :func:`_encode`.
+    """
+    record = json.loads(data, object_hook=_untag)
+    driver = getattr(drivers, record['driver'])
+    handler = driver.__new__(driver)
+    handler.__dict__.update(record['attributes'])
+    handler.meta = record['meta']
+    for item in record['attributes'].get('locals', []):
+        setattr(handler, item, handler.meta[item])
+    return handler
+
+
+def _tag(value):
+    # tuples, e.g. the pixel spacing and coordinates, are not preserved by JSON
+    if isinstance(value, tuple):
+        return {'__tuple__': [_tag(x) for x in value]}
+    if isinstance(value, list):
+        return [_tag(x) for x in value]
+    if isinstance(value, dict):
+        if not all(isinstance(x, str) for x in value.keys()):
+            raise TypeError('only dictionaries with string keys can be serialized')
+        return {k: _tag(v) for k, v in value.items()}
+    return value
+
+
+def _untag(value):
+    if list(value.keys()) == ['__tuple__']:
+        return tuple(value['__tuple__'])
+    return value
+
+
+def _read(filename, key):
+    con = sqlite3.connect(filename, timeout=120)
+    try:
+        row = con.execute('SELECT data FROM handlers WHERE path = ? AND size = ? AND mtime = ? AND version = ?',
+                          key).fetchone()
+    finally:
+        con.close()
+    return row[0] if row is not None else None
+
+
+def _write(filename, key, data):
+    con = sqlite3.connect(filename, timeout=120)
+    try:
+        con.execute('INSERT OR REPLACE INTO handlers VALUES (?, ?, ?, ?, ?)', key + (data,))
+        con.commit()
+    finally:
+        con.close()
@@ -1,39 +1,71 @@
 import click
 
 
-@click.command(name='s1_nrb',
-               no_args_is_help=True,
-               context_settings=dict(
-                   ignore_unknown_options=True,
-                   allow_extra_args=True, )
-               )
+class DefaultGroup(click.Group):
+    """
+    A command group that invokes a default command if the first argument is not the name of a subcommand.
+    This way, ``s1_nrb -c config.ini`` is interpreted as ``s1_nrb process -c config.ini``.
+    """
+    default_command = 'process'
+
+    def parse_args(self, ctx, args):
+        if len(args) > 0 and args[0] not in self.commands and args[0] not in ctx.help_option_names:
+            args.insert(0, self.default_command)
+        return super(DefaultGroup, self).parse_args(ctx, args)
+
+
+@click.group(name='s1_nrb', cls=DefaultGroup, no_args_is_help=True)
+def cli():
+    """
+    S1_NRB command line interface.
+
+    If no command is given, the 'process' command is executed, e.g. 's1_nrb -c config.ini'.
+    """
+    pass
+
+
+@cli.command(name='process',
+             no_args_is_help=True,
+             context_settings=dict(
+                 ignore_unknown_options=True,
+                 allow_extra_args=True, )
+             )
 @click.option('--config-file', '-c', required=False, type=click.Path(),
               help='Full path to an INI-style configuration text file.')
 @click.option('--section', '-s', required=False, type=str, default='PROCESSING', show_default=True,
               help='Section of the configuration file to read processing related parameters from.')
 @click.option('--debug', is_flag=True,
               help='Print debugging information for pyroSAR modules.')
+@click.option('--profile', required=False, type=str, default=None,
+              help='Comma-separated list of processing stages to profile, e.g. ard.format,extract.meta_dict. '
+                   'Overrides the configuration parameter profile.')
+@click.option('--refresh', is_flag=True,
+              help='Ignore cached catalog query results and query the catalogs again.')
 @click.option('--version', is_flag=True,
               help='Print S1_NRB version information and exit. Overrides all other arguments.')
 @click.pass_context
-def cli(ctx, config_file, section, debug, version):
+def process(ctx, config_file, section, debug, profile, refresh, version):
     """
     Central S1_NRB processing command.
-    
+
     Additional options can be passed to override individual processing parameters
     in the configuration file. For example, to read all values from the configuration
     file except the acquisition mode and the annotation layers:
-    
+
     s1_nrb -c config.ini --acq_mode IW --annotation dm,id
-    
+
     The snap_gpt_args argument can be provided by using a dedicated argument separator and quotes:
-    
+
     s1_nrb -c config.ini -- --snap_gpt_args "-J-Xmx100G -c 75G -q 30"
-    
+
     \b
     The following defaults are set:
     (processing section)
     - annotation:        dm,ei,id,lc,li,np,ratio
+    - ard_workers:       1
+    - asf_mirror:        online
+    - dem_cache_mode:    off
+    - dem_cache_size:    100
     - dem_type:          Copernicus 30m Global DEM
     - date_strict:       True
     - etad:              False
@@ -43,9 +75,15 @@ def cli(ctx, config_file, section, debug, version):
     - log_dir:           LOG
     - measurement:       gamma
     - ard_dir:           ARD
+    - cache_dir:         CACHE
     - sar_dir:           SAR
+    - sar_workers:       1
+    - stac_cache_ttl:    24
     - tmp_dir:           TMP
     - wbm_dir:           WBM
+    - work_queue:        None
+    - profile:           None
+    - trace:             False
     (metadata section)
     - access_url:        None
     - doi:               None
@@ -57,4 +95,100 @@ def cli(ctx, config_file, section, debug, version):
         print(S1_NRB.__version__)
     else:
         extra = {ctx.args[i][2:]: ctx.args[i + 1] for i in range(0, len(ctx.args), 2)}
+        if profile is not None:
+            extra['profile'] = profile
+        if refresh:
+            extra['stac_cache_ttl'] = '0'
+            extra['asf_mirror'] = 'refresh'
         S1_NRB.process(config_file=config_file, section_name=section, debug=debug, **extra)
+
+
+@cli.command(name='worker',
+             no_args_is_help=True,
+             context_settings=dict(
+                 ignore_unknown_options=True,
+                 allow_extra_args=True, )
+             )
+@click.option('--config-file', '-c', required=True, type=click.Path(),
+              help='Full path to an INI-style configuration text file.')
+@click.option('--section', '-s', required=False, type=str, default='PROCESSING', show_default=True,
+              help='Section of the configuration file to read processing related parameters from.')
+@click.option('--debug', is_flag=True,
+              help='Print debugging information for pyroSAR modules.')
+@click.option('--profile', required=False, type=str, default=None,
+              help='Comma-separated list of processing stages to profile, e.g. ard.format,extract.meta_dict. '
+                   'Overrides the configuration parameter profile.')
+@click.pass_context
+def worker(ctx, config_file, section, debug, profile):
+    """
+    Process jobs from the work queue defined by the configuration parameter work_queue.
+    The jobs are submitted by the process command. Multiple workers can be started on
+    different machines sharing the same file system, e.g.:
+
+    s1_nrb worker -c config.ini
+
+    Like for the process command, additional options can be passed to override individual
+    processing parameters, e.g. --gdal_threads 8.
+    """
+    from S1_NRB.processor import worker
+    extra = {ctx.args[i][2:]: ctx.args[i + 1] for i in range(0, len(ctx.args), 2)}
+    if profile is not None:
+        extra['profile'] = profile
+    worker(config_file=config_file, section_name=section, debug=debug, **extra)
+
+
+@cli.command(name='plan',
+             no_args_is_help=True,
+             context_settings=dict(
+                 ignore_unknown_options=True,
+                 allow_extra_args=True, )
+             )
+@click.option('--config-file', '-c', required=True, type=click.Path(),
+              help='Full path to an INI-style configuration text file.')
+@click.option('--section', '-s', required=False, type=str, default='PROCESSING', show_default=True,
+              help='Section of the configuration file to read processing related parameters from.')
+@click.option('--output', '-o', required=False, type=click.Path(), default=None,
+              help='Name of a JSON file to write the plan to.')
+@click.option('--refresh', is_flag=True,
+              help='Ignore cached catalog query results and query the catalogs again.')
+@click.pass_context
+def plan(ctx, config_file, section, output, refresh):
+    """
+    Dry run of the process command: search the scenes and assign them to MGRS tiles without processing anything.
+    Prints the job graph of scenes and tiles, marks those that have already been processed and estimates
+    the CPU time, peak RAM and disk footprint needed for the remaining ones from previous processing runs, e.g.:
+
+    s1_nrb plan -c config.ini -o plan.json
+
+    Like for the process command, additional options can be passed to override individual
+    processing parameters, e.g. --mindate 20200101T000000.
+    """
+    from S1_NRB.processor import plan
+    extra = {ctx.args[i][2:]: ctx.args[i + 1] for i in range(0, len(ctx.args), 2)}
+    if refresh:
+        extra['stac_cache_ttl'] = '0'
+        extra['asf_mirror'] = 'refresh'
+    plan(config_file=config_file, section_name=section, outname=output, **extra)
+
+
+@cli.command(name='report', no_args_is_help=True)
+@click.option('--config-file', '-c', required=True, type=click.Path(),
+              help='Full path to an INI-style configuration text file.')
+@click.option('--section', '-s', required=False, type=str, default='PROCESSING', show_default=True,
+              help='Section of the configuration file to read processing related parameters from.')
+@click.option('--kind', type=click.Choice(['scene', 'tile', 'layer']), default=None,
+              help='Only report processing units of this kind.')
+@click.option('--status', type=click.Choice(['pending', 'running', 'done', 'failed']), multiple=True,
+              help='Only report processing units with this status. Can be defined multiple times.')
+def report(config_file, section, kind, status):
+    """
+    Report the status of processing units recorded in the processing ledger.
+    For example, to list all scenes and tiles that have not been finished:
+
+    s1_nrb report -c config.ini --status pending --status running --status failed
+    """
+    from S1_NRB.config import get_config
+    from S1_NRB import ledger
+    config = get_config(config_file=config_file, proc_section=section)
+    status = list(status) if len(status) > 0 else None
+    ledger.report(ledger=ledger.get_ledger(config=config), kind=kind, status=status)
@@ -25,7 +25,9 @@ def get_keys(section):
                 'work_dir', 'scene_dir', 'sar_dir', 'tmp_dir', 'wbm_dir', 'measurement',
                 'db_file', 'kml_file', 'dem_type', 'gdal_threads', 'log_dir', 'ard_dir',
                 'etad', 'etad_dir', 'product', 'annotation', 'stac_catalog', 'stac_collections',
-                'sensor', 'date_strict', 'snap_gpt_args', 'scene']
+                'sensor', 'date_strict', 'snap_gpt_args', 'scene', 'ard_workers', 'sar_workers',
+                'work_queue', 'profile', 'trace', 'cache_dir', 'stac_cache_ttl', 'asf_mirror',
+                'dem_cache_size', 'dem_cache_mode']
     elif section == 'metadata':
         return ['format', 'copy_original', 'access_url', 'licence', 'doi', 'processing_center']
     else:
@@ -83,8 +85,28 @@ def get_config(config_file, proc_section='PROCESSING', **kwargs):
     for item in ['sar_dir', 'tmp_dir', 'ard_dir', 'wbm_dir', 'log_dir']:
         if item not in proc_sec.keys():
             proc_sec[item] = item[:3].upper()
+    if 'cache_dir' not in proc_sec.keys():
+        proc_sec['cache_dir'] = 'CACHE'
+    if 'stac_cache_ttl' not in proc_sec.keys():
+        proc_sec['stac_cache_ttl'] = '24'
+    if 'asf_mirror' not in proc_sec.keys():
+        proc_sec['asf_mirror'] = 'online'
+    if 'dem_cache_size' not in proc_sec.keys():
+        proc_sec['dem_cache_size'] = '100'
+    if 'dem_cache_mode' not in proc_sec.keys():
+        proc_sec['dem_cache_mode'] = 'off'
     if 'gdal_threads' not in proc_sec.keys():
         proc_sec['gdal_threads'] = '4'
+    if 'ard_workers' not in proc_sec.keys():
+        proc_sec['ard_workers'] = '1'
+    if 'sar_workers' not in proc_sec.keys():
+        proc_sec['sar_workers'] = '1'
+    if 'work_queue' not in proc_sec.keys():
+        proc_sec['work_queue'] = 'None'
+    if 'profile' not in proc_sec.keys():
+        proc_sec['profile'] = 'None'
+    if 'trace' not in proc_sec.keys():
+        proc_sec['trace'] = 'False'
     if 'dem_type' not in proc_sec.keys():
         proc_sec['dem_type'] = 'Copernicus 30m Global DEM'
     if 'date_strict' not in proc_sec.keys():
@@ -149,18 +171,40 @@ def get_config(config_file, proc_section='PROCESSING', **kwargs):
             else:
                 v = os.path.join(proc_sec['work_dir'], v)
                 assert os.path.isfile(v), "Parameter '{}': File {} could not be found".format(k, v)
-        if k == 'db_file' and v is not None:
+        if k in ['db_file', 'work_queue'] and v is not None:
             if not any(x in v for x in ['/', '\\']):
                 v = os.path.join(proc_sec['work_dir'], v)
         if k == 'stac_collections':
             v = proc_sec.get_stac_collections(k)
         if k == 'gdal_threads':
             v = int(v)
+        if k == 'stac_cache_ttl':
+            v = float(v)
+            assert v >= 0, "Parameter '{}': must be >= 0; got {} instead".format(k, v)
+        if k == 'asf_mirror':
+            allowed = ['online', 'offline', 'refresh']
+            assert v in allowed, "Parameter '{}': expected to be one of {}; got '{}' instead".format(k, allowed, v)
+        if k == 'dem_cache_size' and v is not None:
+            v = float(v)
+            assert v > 0, "Parameter '{}': must be > 0; got {} instead".format(k, v)
+            v = int(v * 1024 ** 3)
+        if k == 'dem_cache_mode':
+            allowed = ['off', 'online', 'offline']
+            assert v in allowed, "Parameter '{}': expected to be one of {}; got '{}' instead".format(k, allowed, v)
+        if k == 'ard_workers':
+            v = int(v)
+            assert v >= 1, "Parameter '{}': must be >= 1; got {} instead".format(k, v)
+        if k == 'sar_workers':
+            if v != 'auto':
+                v = int(v)
+                assert v >= 1, "Parameter '{}': must be >= 1 or 'auto'; got {} instead".format(k, v)
+            else:
+                v = None
         if k == 'dem_type':
             allowed = ['Copernicus 10m EEA DEM', 'Copernicus 30m Global DEM II',
                        'Copernicus 30m Global DEM', 'GETASSE30']
             assert v in allowed, "Parameter '{}': expected to be one of {}; got '{}' instead".format(k, allowed, v)
-        if k in ['etad', 'date_strict']:
+        if k in ['etad', 'date_strict', 'trace']:
             v = proc_sec.getboolean(k)
         if k == 'product':
             allowed = ['GRD', 'SLC']
@@ -174,6 +218,13 @@ def get_config(config_file, proc_section='PROCESSING', **kwargs):
             v = proc_sec.get_list(k)
         if k == 'datatake':
             v = proc_sec.get_list(k)
+        if k == 'profile':
+            v = proc_sec.get_list(k)
+            if v is not None:
+                allowed = ['snap.process', 'ard.format', 'extract.meta_dict', 'stac.parse', 'xml.parse']
+                for stage in v:
+                    assert stage in allowed, "Parameter '{}': expected to be one of {}; " \
+                                             "got '{}' instead".format(k, allowed, stage)
         out_dict[k] = v
     
     if out_dict['db_file'] is None and out_dict['stac_catalog'] is None:
@@ -0,0 +1,78 @@
+import threading
+
+_settings = {}
+_lock = threading.Lock()
+
+
+def get(key):
+    """
+    Get a setting of the current processing run.
+
+    Parameters
+    ----------
+    key: str
+        the name of the setting:
+
+        - metrics: the metrics file; see :func:`S1_NRB.metrics.configure`
+        - profile: the profile directory and stages; see :func:`S1_NRB.profiling.configure`
+        - identify_cache: the database of the scene metadata cache; see :func:`S1_NRB.cache.configure`
+        - dem_store: the DEM tile store parameters; see :func:`S1_NRB.dem.configure`
+
+    Returns
+    -------
+    Any
+        the value or None if the setting is not defined
+    """
+    return _settings.get(key)
+
+
+def update(**kwargs):
+    """
+    Define settings of the current processing run. Settings with value None are removed.
+
+    Parameters
+    ----------
+    kwargs
+        the settings to be defined. See :func:`get`.
+
+    Returns
+    -------
+
+    """
+    with _lock:
+        for key, value in kwargs.items():
+            if value is None:
+                _settings.pop(key, None)
+            else:
+                _settings[key] = value
+
+
+def settings():
+    """
+    Get a copy of all settings of the current processing run, e.g. to pass them to worker processes
+    with :func:`activate`.
+
+    Returns
+    -------
+    dict
+    """
+    with _lock:
+        return dict(_settings)
+
+
+def activate(values):
+    """
+    Replace the settings of the current process, e.g. in the initializer of a worker process.
+
+    Parameters
+    ----------
+    values: dict
+        the settings as returned by :func:`settings`
+
+    Returns
+    -------
+
+    """
+    with _lock:
+        _settings.clear()
+        _settings.update(values)
@@ -1,12 +1,28 @@
 import os
 import re
+import json
+import time
+import shutil
+import sqlite3
 import tempfile
 import itertools
+import threading
+from math import ceil, floor
 from getpass import getpass
-from pyroSAR.auxdata import dem_autoload, dem_create
+from contextlib import contextmanager
+from lxml import etree
+from osgeo import gdal
+from pyroSAR.ancillary import Lock
+from pyroSAR.auxdata import DEMHandler, dem_autoload, dem_create, getasse30_hdr
 import S1_NRB.tile_extraction as tile_ex
 from S1_NRB.ancillary import generate_unique_id, get_max_ext, vrt_add_overviews
+from S1_NRB import context
 from spatialist import Raster, bbox
+from spatialist.ancillary import finder
+from spatialist.auxil import gdalbuildvrt
+
+_stores = {}
+_lock = threading.Lock()
 
 
 def prepare(vector, dem_type, dem_dir, wbm_dir, kml_file, dem_strict=True,
@@ -150,8 +166,10 @@ def prepare(vector, dem_type, dem_dir, wbm_dir, kml_file, dem_strict=True,
         # DEM download and VRT mosaic creation
         
         # get download authentication if either WBM or DEM VRTs will be created
-        c_wbm = fname_wbm_tmp is not None and not os.path.isfile(fname_wbm_tmp)
-        c_dem = fname_dem_tmp is not None and not os.path.isfile(fname_dem_tmp)
+        # with a tile store, the VRTs are always recreated because their source tiles might have been evicted
+        store = get_store() is not None
+        c_wbm = fname_wbm_tmp is not None and (store or not os.path.isfile(fname_wbm_tmp))
+        c_dem = fname_dem_tmp is not None and (store or not os.path.isfile(fname_dem_tmp))
         if c_wbm or c_dem:
             username, password = authenticate(dem_type=dem_type,
                                               username=username,
@@ -161,18 +179,18 @@ def prepare(vector, dem_type, dem_dir, wbm_dir, kml_file, dem_strict=True,
         if c_wbm:
             os.makedirs(wbm_dir, exist_ok=True)
             with bbox(coordinates=ext_4326, crs=4326) as vec:
-                dem_autoload(geometries=[vec], demType=dem_type,
-                             vrt=fname_wbm_tmp, product='wbm',
-                             username=username, password=password,
-                             crop=False)
+                autoload(geometries=[vec], dem_type=dem_type,
+                         vrt=fname_wbm_tmp, product='wbm',
+                         username=username, password=password,
+                         crop=False)
         # download DEM tiles and combine them in a VRT mosaic
         if c_dem:
             os.makedirs(dem_dir, exist_ok=True)
             with bbox(coordinates=ext_4326, crs=4326) as vec:
-                dem_autoload(geometries=[vec], demType=dem_type,
-                             vrt=fname_dem_tmp, product='dem',
-                             username=username, password=password,
-                             crop=False)
+                autoload(geometries=[vec], dem_type=dem_type,
+                         vrt=fname_dem_tmp, product='dem',
+                         username=username, password=password,
+                         crop=False)
         ###############################################
         if len(dem_target) > 0:
             msg = '### creating DEM MGRS tiles: \n{tiles}'
@@ -244,7 +262,7 @@ def mosaic(geometry, dem_type, outname, epsg=None, kml_file=None,
     """
     Create a new scene-specific DEM mosaic GeoTIFF file.
     Can be created from MGRS-tiled DEMs as created by :func:`S1_NRB.dem.prepare`
-    or ad hoc using :func:`pyroSAR.auxdata.dem_autoload` and :func:`pyroSAR.auxdata.dem_create`.
+    or ad hoc using :func:`autoload` and :func:`pyroSAR.auxdata.dem_create`.
     In the former case the arguments `username`, `password` and `threads` are ignored and
     all tiles found in `dem_dir` are read.
     In the latter case the arguments `epsg`, `kml_file` and `dem_dir` are ignored and the DEM is
@@ -299,9 +317,9 @@ def mosaic(geometry, dem_type, outname, epsg=None, kml_file=None,
                 geoid_convert = True
             geoid = 'EGM2008'
             vrt = outname.replace('.tif', '.vrt')
-            dem_autoload([geometry], demType=dem_type,
-                         vrt=vrt, buffer=buffer, product='dem',
-                         username=username, password=password)
+            autoload([geometry], dem_type=dem_type,
+                     vrt=vrt, buffer=buffer, product='dem',
+                     username=username, password=password)
             dem_create(src=vrt, dst=outname, pbar=False,
                        geoid_convert=geoid_convert, geoid=geoid,
                        threads=threads, nodata=-32767)
@@ -356,9 +374,468 @@ def to_mgrs(tile, dst, kml, dem_type, overviews, tr, format='COG',
     vrt = tempfile.NamedTemporaryFile(suffix='.vrt').name
     with bbox(coordinates=ext, crs=epsg) as vec:
         vec.reproject(4326)
-        dem_autoload(geometries=[vec], demType=dem_type, vrt=vrt)
+        autoload(geometries=[vec], dem_type=dem_type, vrt=vrt)
     vrt_add_overviews(vrt=vrt, overviews=overviews)
     dem_create(src=vrt, dst=dst, t_srs=epsg, tr=tr,
                geoid_convert=geoid_convert, geoid=geoid, pbar=pbar,
                outputBounds=bounds, threads=threads, format=format,
                creationOptions=create_options)
+
+
+def configure(directory, max_size=None, offline=False):
+    """
+    Enable the :class:`TileStore` for :func:`autoload` in the current processing run.
+    The settings are stored in the run context; see :mod:`S1_NRB.context`.
+    
+    Parameters
+    ----------
+    directory: str or None
+        the store directory. If None, the store is disabled and :func:`autoload` uses
+        :func:`pyroSAR.auxdata.dem_autoload`.
+    max_size: int or None
+        the maximum size of the stored tiles in bytes. None: no limit.
+    offline: bool
+        only use tiles that are already in the store?
+    
+    Returns
+    -------
+    TileStore or None
+        the configured store or None if the store is disabled
+    """
+    if directory is None:
+        context.update(dem_store=None)
+        return None
+    context.update(dem_store={'directory': directory, 'max_size': max_size, 'offline': offline})
+    return get_store()
+
+
+def get_store():
+    """
+    Get the :class:`TileStore` configured with :func:`configure`.
+    
+    Returns
+    -------
+    TileStore or None
+        the store or None if none has been configured
+    """
+    settings = context.get('dem_store')
+    if settings is None:
+        return None
+    key = json.dumps(settings, sort_keys=True)
+    with _lock:
+        if key not in _stores.keys():
+            _stores[key] = TileStore(**settings)
+        return _stores[key]
+
+
+def autoload(geometries, dem_type, vrt=None, buffer=None, username=None,
+             password=None, product='dem', crop=True):
+    """
+    Obtain the DEM tiles overlapping with a list of geometries and optionally mosaic them in a VRT.
+    If a store has been configured with :func:`configure`, the tiles are read from the :class:`TileStore`.
+    Otherwise :func:`pyroSAR.auxdata.dem_autoload` is called.
+    
+    Parameters
+    ----------
+    geometries: list[spatialist.vector.Vector]
+        the geometries to obtain DEM data for; CRS must be EPSG:4326
+    dem_type: str
+        The DEM type.
+    vrt: str or None
+        an optional GDAL VRT file created from the obtained DEM tiles
+    buffer: int or float or None
+        a buffer in degrees to add around the individual geometries
+    username: str or None
+        The username for accessing the DEM tiles.
+    password: str or None
+        The password for accessing the DEM tiles.
+    product: str
+        the sub-product to extract from the DEM product, e.g. 'dem' or 'wbm'
+    crop: bool
+        crop the VRT to the extent of the geometries or use the full extent of the DEM tiles?
+    
+    Returns
+    -------
+    list[str] or None
+        the names of the obtained files or None if a VRT file was defined
+    """
+    store = get_store()
+    if store is None:
+        return dem_autoload(geometries=geometries, demType=dem_type, vrt=vrt, buffer=buffer,
+                            username=username, password=password, product=product, crop=crop)
+    return store.load(geometries=geometries, dem_type=dem_type, vrt=vrt, buffer=buffer,
+                      username=username, password=password, product=product, crop=crop)
+
+
+class TileStore(object):
+    """
+    Local store of DEM and WBM source tiles shared by all processing runs and used by :func:`autoload`.
+    The tiles are stored as GeoTIFF files per DEM type, product and tile ID, e.g. `N46_E011`, and recorded
+    in an SQLite database `index.db`, so that the directory never needs to be listed. Tiles delivered in
+    archives are extracted once when they are added. Tiles that do not exist on the server, e.g. over the
+    ocean, are recorded as empty so that they are not searched again.
+    If the size of the store exceeds `max_size`, the least recently used tiles are removed. Tiles accessed within
+    the last `grace` seconds are kept, because other processes using the same store (e.g. parallel SAR workers) might
+    have just mosaicked them in a VRT that has not been read yet. Hence, `max_size` might be exceeded temporarily.
+    
+    Parameters
+    ----------
+    directory: str
+        the store directory; is created if it does not exist
+    max_size: int or None
+        the maximum size of the stored tiles in bytes. None: no limit.
+    offline: bool
+        only use tiles that are already in the store? In this case an error is raised if a tile is missing.
+        The store can be filled beforehand with :meth:`seed` or by copying the directory of another store.
+    grace: int or float
+        the time in seconds after the last access during which a tile is not removed
+    
+    Examples
+    --------
+    >>> from S1_NRB.dem import TileStore
+    >>> from spatialist import bbox
+    >>> store = TileStore(directory='DEM_STORE', max_size=50 * 1024 ** 3)
+    >>> ext = {'xmin': 12, 'xmax': 13, 'ymin': 50, 'ymax': 51}
+    >>> with bbox(coordinates=ext, crs=4326) as vec:
+    >>>     store.load(geometries=[vec], dem_type='Copernicus 30m Global DEM', vrt='dem.vrt')
+    """
+    
+    def __init__(self, directory, max_size=None, offline=False, grace=3600):
+        self.directory = directory
+        self.max_size = max_size
+        self.offline = offline
+        self.grace = grace
+        os.makedirs(directory, exist_ok=True)
+        self.filename = os.path.join(directory, 'index.db')
+        with self._connect() as con:
+            con.execute('''CREATE TABLE IF NOT EXISTS tiles
+                           (dem_type TEXT,
+                            product TEXT,
+                            tile TEXT,
+                            path TEXT,
+                            size INTEGER,
+                            accessed REAL,
+                            PRIMARY KEY (dem_type, product, tile))''')
+        self._handler = DEMHandler([])
+    
+    def __str__(self):
+        return self.directory
+    
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.filename, timeout=120)
+        try:
+            yield con
+            con.commit()
+        finally:
+            con.close()
+    
+    @staticmethod
+    def tile_id(y, x):
+        """
+        Get the ID of the tile with the given lower left corner.
+        
+        Parameters
+        ----------
+        y: int
+            the latitude of the lower left corner
+        x: int
+            the longitude of the lower left corner
+        
+        Returns
+        -------
+        str
+            the tile ID, e.g. `N46_E011`
+        """
+        return '{}{:02d}_{}{:03d}'.format('S' if y < 0 else 'N', abs(y), 'W' if x < 0 else 'E', abs(x))
+    
+    def load(self, geometries, dem_type, vrt=None, buffer=None, username=None,
+             password=None, product='dem', crop=True):
+        """
+        Obtain the tiles overlapping with a list of geometries from the store and optionally mosaic them in a VRT.
+        Missing tiles are downloaded with :class:`pyroSAR.auxdata.DEMHandler` unless the store is offline.
+        The arguments and the created VRT are the same as for :func:`pyroSAR.auxdata.dem_autoload`.
+        
+        Returns
+        -------
+        list[str] or None
+            the names of the stored files or None if a VRT file was defined
+        """
+        config = self._handler.config[dem_type]
+        step = config['tilesize']
+        cells = {}
+        for geometry in geometries:
+            ext = _apply_buffer(geometry.extent, buffer)
+            lat, lon = DEMHandler.intrange(ext, step=step)
+            for y in lat:
+                for x in lon:
+                    cells[self.tile_id(y, x)] = (y, x)
+        found = self._lookup(dem_type=dem_type, product=product, tiles=list(cells.keys()))
+        missing = {k: v for k, v in cells.items() if k not in found.keys()}
+        if len(missing) > 0:
+            if self.offline:
+                raise RuntimeError('the following {} tiles are missing in the offline DEM store {}: {}'
+                                   .format(dem_type, self.directory, sorted(missing.keys())))
+            found.update(self._fetch(dem_type=dem_type, product=product, cells=missing,
+                                     username=username, password=password))
+        with self._connect() as con:
+            con.executemany('UPDATE tiles SET accessed = ? WHERE dem_type = ? AND product = ? AND tile = ?',
+                            [(time.time(), dem_type, product, x) for x in cells.keys()])
+        if self.max_size is not None:
+            self.evict(max_size=self.max_size, keep=[found[x] for x in cells.keys()], grace=self.grace)
+        files = sorted([x for x in found.values() if x is not None])
+        if vrt is None:
+            return files
+        self._buildvrt(files=files, vrt=vrt, geometries=geometries, dem_type=dem_type,
+                       product=product, buffer=buffer, crop=crop)
+    
+    def seed(self, directory, dem_type, product='dem'):
+        """
+        Add tiles from a directory, e.g. one filled by :func:`pyroSAR.auxdata.dem_autoload` on another node,
+        to the store. Both raster files and the archives delivered by the DEM servers are accepted.
+        The source files are kept.
+        
+        Parameters
+        ----------
+        directory: str
+            the directory to search for tiles
+        dem_type: str
+            The DEM type of the tiles.
+        product: str
+            the sub-product to be extracted from the archives, e.g. 'dem' or 'wbm'
+        
+        Returns
+        -------
+        list[str]
+            the IDs of the added tiles
+        """
+        pattern = self._handler.config[dem_type]['pattern'][product]
+        files = finder(directory, [pattern, '*.zip', '*.tar', '*.tar.gz'])
+        added = self._import(files=files, dem_type=dem_type, product=product, move=False)
+        return sorted(added.keys())
+    
+    def evict(self, max_size=0, keep=None, grace=0):
+        """
+        Remove the least recently used tiles until the size of the store does not exceed `max_size`.
+        
+        Parameters
+        ----------
+        max_size: int
+            the maximum size of the store in bytes. Default 0: remove all tiles.
+        keep: list[str] or None
+            the names of files that must not be removed, e.g. those currently used
+        grace: int or float
+            the time in seconds after the last access during which a tile is not removed.
+            If the recently used tiles alone exceed `max_size`, the store remains larger until they have expired.
+        
+        Returns
+        -------
+        
+        """
+        keep = [] if keep is None else keep
+        recent = time.time() - grace
+        with self._connect() as con:
+            rows = con.execute('SELECT dem_type, product, tile, path, size, accessed FROM tiles '
+                               'WHERE path IS NOT NULL ORDER BY accessed').fetchall()
+            size = sum([x[4] for x in rows])
+            for dem_type, product, tile, path, fsize, accessed in rows:
+                if size <= max_size or accessed > recent:
+                    # all remaining tiles have been accessed more recently
+                    break
+                if path in keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                con.execute('DELETE FROM tiles WHERE dem_type = ? AND product = ? AND tile = ?',
+                            (dem_type, product, tile))
+                size -= fsize
+    
+    def _lookup(self, dem_type, product, tiles):
+        out = {}
+        with self._connect() as con:
+            for tile in tiles:
+                row = con.execute('SELECT path FROM tiles WHERE dem_type = ? AND product = ? AND tile = ?',
+                                  (dem_type, product, tile)).fetchone()
+                if row is not None and (row[0] is None or os.path.isfile(row[0])):
+                    out[tile] = row[0]
+        return out
+    
+    def _fetch(self, dem_type, product, cells, username, password):
+        """
+        Download missing tiles with :class:`pyroSAR.auxdata.DEMHandler` and add them to the store.
+        The downloads are placed in the subdirectory `download`, which is used as pyroSAR auxiliary data
+        directory and keeps the server file lists, and are deleted once they have been added.
+        """
+        step = self._handler.config[dem_type]['tilesize']
+        target = os.path.join(self.directory, dem_type)
+        os.makedirs(target, exist_ok=True)
+        with Lock(target):
+            # tiles might have been added by another process in the meantime
+            found = self._lookup(dem_type=dem_type, product=product, tiles=list(cells.keys()))
+            cells = {k: v for k, v in cells.items() if k not in found.keys()}
+            if len(cells) == 0:
+                return found
+            geometries = [bbox({'xmin': x, 'xmax': x + step, 'ymin': y, 'ymax': y + step}, crs=4326)
+                          for y, x in cells.values()]
+            handler = DEMHandler(geometries)
+            handler.auxdatapath = os.path.join(self.directory, 'download')
+            files = handler.load(dem_type=dem_type, product=product,
+                                 username=username, password=password)
+            for geometry in geometries:
+                geometry.close()
+            added = self._import(files=files, dem_type=dem_type, product=product,
+                                 move=True, tiles=list(cells.keys()))
+            for file in files:
+                if os.path.isfile(file):
+                    os.remove(file)
+            # tiles not available on the server
+            empty = [x for x in cells.keys() if x not in added.keys()]
+            with self._connect() as con:
+                con.executemany('INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, NULL, 0, ?)',
+                                [(dem_type, product, x, time.time()) for x in empty])
+            found.update(added)
+            found.update({x: None for x in empty})
+        return found
+    
+    def _import(self, files, dem_type, product, move, tiles=None):
+        """
+        Add raster files or archives containing them to the store.
+        The tile ID of each raster is derived from the location of its center.
+        """
+        config = self._handler.config[dem_type]
+        step = config['tilesize']
+        pattern = config['pattern'][product]
+        if dem_type == 'GETASSE30':
+            for file in files:
+                if file.endswith('.zip'):
+                    getasse30_hdr(file)
+        sources = []
+        for file in files:
+            if re.search(r'\.(?:zip|tar(\.gz)?)$', file):
+                sources.extend([config['vsi'] + x for x in finder(file, [pattern])])
+            else:
+                sources.append(file)
+        outdir = os.path.join(self.directory, dem_type, product)
+        os.makedirs(outdir, exist_ok=True)
+        added = {}
+        rows = []
+        for source in sources:
+            ras = gdal.Open(source)
+            gt = ras.GetGeoTransform()
+            x = gt[0] + gt[1] * ras.RasterXSize / 2
+            y = gt[3] + gt[5] * ras.RasterYSize / 2
+            ras = None
+            tile = self.tile_id(int(floor(y / step) * step), int(floor(x / step) * step))
+            if tiles is not None and tile not in tiles:
+                continue
+            dst = os.path.join(outdir, tile + '.tif')
+            tmp = f'{dst}.{os.getpid()}.tmp'
+            if source.startswith('/vsi') or not source.endswith('.tif'):
+                gdal.Translate(tmp, source, format='GTiff',
+                               creationOptions=['COMPRESS=DEFLATE', 'TILED=YES', 'BIGTIFF=IF_SAFER'])
+            elif move:
+                shutil.move(source, tmp)
+            else:
+                shutil.copyfile(source, tmp)
+            os.replace(tmp, dst)
+            added[tile] = dst
+            rows.append((dem_type, product, tile, dst, os.path.getsize(dst), time.time()))
+        with self._connect() as con:
+            con.executemany('INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return added
+    
+    def _buildvrt(self, files, vrt, geometries, dem_type, product, buffer, crop):
+        """
+        Create the VRT mosaic in the same way as :meth:`pyroSAR.auxdata.DEMHandler.load`.
+        """
+        config = self._handler.config[dem_type]
+        # the common extent of all geometries
+        extent = {}
+        for geometry in geometries:
+            ext = geometry.extent
+            if len(extent.keys()) == 0:
+                extent = ext
+            else:
+                for key in ['xmin', 'ymin']:
+                    extent[key] = max(extent[key], ext[key])
+                for key in ['xmax', 'ymax']:
+                    extent[key] = min(extent[key], ext[key])
+        extent = _apply_buffer(extent, buffer)
+        res = None
+        for key, val in config['resolution'].items():
+            ymin, ymax = [int(y) for y in key.split('-')]
+            if ymin <= abs(extent['ymin']) <= ymax:
+                res = val
+                break
+        if res is None:
+            raise RuntimeError("no resolution of DEM type '{}' is defined for latitude {}; available: {}"
+                               .format(dem_type, extent['ymin'], list(config['resolution'].keys())))
+        if not crop:
+            f = config['tilesize']
+            extent['xmin'] = floor(extent['xmin'] / f) * f
+            extent['ymin'] = floor(extent['ymin'] / f) * f
+            extent['xmax'] = ceil(extent['xmax'] / f) * f
+            extent['ymax'] = ceil(extent['ymax'] / f) * f
+        if config['area_or_point'] == 'point':
+            extent['xmin'] -= res[0] / 2
+            extent['ymin'] += res[1] / 2
+            extent['xmax'] -= res[0] / 2
+            extent['ymax'] += res[1] / 2
+        datatype = None
+        if len(files) == 0:
+            # the AOI is completely over the ocean; use a dummy file with one pixel spanning the whole globe
+            files = [self._dummy()]
+            datatype = config['datatype'][product]
+            src_nodata = 0
+            dst_nodata = 0 if product == 'dem' else config['nodata'][product]
+            xres, yres = res
+        else:
+            ras = gdal.Open(files[0])
+            src_nodata = config['nodata'][product]
+            if src_nodata is None:
+                src_nodata = ras.GetRasterBand(1).GetNoDataValue()
+            gt = ras.GetGeoTransform()
+            xres, yres = gt[1], abs(gt[5])
+            ras = None
+            dst_nodata = 0 if product == 'dem' else None
+        opts = {'srcNodata': src_nodata, 'targetAlignedPixels': False,
+                'xRes': xres, 'yRes': yres, 'hideNodata': True,
+                'outputBounds': (extent['xmin'], extent['ymin'], extent['xmax'], extent['ymax'])}
+        if dst_nodata is not None:
+            opts['VRTNodata'] = dst_nodata
+        gdalbuildvrt(src=files, dst=vrt, **opts)
+        if datatype is not None:
+            tree = etree.parse(source=vrt)
+            band = tree.find(path='VRTRasterBand')
+            band.attrib['dataType'] = datatype
+            tree.write(file=vrt, pretty_print=True, xml_declaration=False, encoding='utf-8')
+    
+    def _dummy(self):
+        filename = os.path.join(self.directory, 'dummy_dem.tif')
+        if not os.path.isfile(filename):
+            tmp = f'{filename}.{os.getpid()}.tmp'
+            driver = gdal.GetDriverByName('GTiff')
+            dataset = driver.Create(tmp, 1, 1, 1, gdal.GDT_Byte)
+            dataset.SetGeoTransform([-180, 360, 0, 90, 0, -180])
+            dataset.SetProjection('EPSG:4326')
+            band = dataset.GetRasterBand(1)
+            band.SetNoDataValue(255)
+            band.Fill(0)
+            band.FlushCache()
+            band = None
+            dataset = None
+            driver = None
+            os.replace(tmp, filename)
+        return filename
+
+
+def _apply_buffer(extent, buffer):
+    ext = dict(extent)
+    if buffer is not None:
+        ext['xmin'] -= buffer
+        ext['xmax'] += buffer
+        ext['ymin'] -= buffer
+        ext['ymax'] += buffer
+    return ext
@@ -4,7 +4,7 @@ import time
 import shutil
 import tarfile as tf
 import zipfile as zf
-from pyroSAR import identify
+from S1_NRB.cache import identify
 from spatialist.ancillary import finder
 from s1etad_tools.cli.slc_correct import s1etad_slc_correct_main
 
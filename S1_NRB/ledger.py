@@ -0,0 +1,386 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager, nullcontext
+
+
+class Ledger(object):
+    """
+    Persistent SQLite record of processing units (SAR scenes, ARD tiles and their individual layers).
+    Each unit is identified by its kind and a unique name and stores the configuration fingerprint,
+    the set of inputs, the processing status, start and stop timestamps and the output paths.
+    Skip and resume decisions are made from this record instead of the existence of output directories,
+    which might also originate from processing runs that have crashed.
+
+    Only the file name is stored in the object so that it can be passed to other processes.
+    A new database connection is opened for every transaction.
+
+    Parameters
+    ----------
+    filename: str
+        the SQLite database file. Will be created if it does not exist.
+
+    Examples
+    --------
+    >>> from S1_NRB.ledger import Ledger
+    >>> ledger = Ledger('ledger.db')
+    >>> with ledger.unit(kind='scene', name='S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160'):
+    >>>     ...
+    """
+    status_options = ['pending', 'running', 'done', 'failed']
+
+    def __init__(self, filename):
+        self.filename = filename
+        with self._connect() as con:
+            con.execute('''CREATE TABLE IF NOT EXISTS units
+                           (kind TEXT NOT NULL,
+                            name TEXT NOT NULL,
+                            fingerprint TEXT,
+                            inputs TEXT,
+                            status TEXT NOT NULL,
+                            start REAL,
+                            stop REAL,
+                            outputs TEXT,
+                            message TEXT,
+                            PRIMARY KEY (kind, name))''')
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.filename, timeout=120)
+        try:
+            yield con
+            con.commit()
+        finally:
+            con.close()
+
+    def get(self, kind, name):
+        """
+        Get the record of a processing unit.
+
+        Parameters
+        ----------
+        kind: str
+            the kind of unit, e.g. 'scene', 'tile' or 'layer'
+        name: str
+            the unique name of the unit
+
+        Returns
+        -------
+        dict or None
+            the record or None if the unit is unknown.
+            The values of `inputs` and `outputs` are lists (or None).
+        """
+        records = self.select(kind=kind, name=name)
+        return records[0] if len(records) > 0 else None
+
+    def select(self, kind=None, name=None, status=None, prefix=None):
+        """
+        Select records of processing units.
+
+        Parameters
+        ----------
+        kind: str or None
+            the kind of unit
+        name: str or None
+            the unique name of the unit
+        status: str or list[str] or None
+            one or multiple status values
+        prefix: str or None
+            select only units whose name starts with this string
+
+        Returns
+        -------
+        list[dict]
+            the selected records sorted by kind and name
+        """
+        conditions = []
+        args = []
+        if kind is not None:
+            conditions.append('kind = ?')
+            args.append(kind)
+        if name is not None:
+            conditions.append('name = ?')
+            args.append(name)
+        if status is not None:
+            status = [status] if isinstance(status, str) else status
+            conditions.append('status IN ({})'.format(', '.join(['?'] * len(status))))
+            args.extend(status)
+        if prefix is not None:
+            conditions.append('substr(name, 1, ?) = ?')
+            args.extend([len(prefix), prefix])
+        query = 'SELECT * FROM units'
+        if len(conditions) > 0:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY kind, name'
+        with self._connect() as con:
+            con.row_factory = sqlite3.Row
+            rows = con.execute(query, args).fetchall()
+        out = []
+        for row in rows:
+            record = dict(row)
+            for key in ['inputs', 'outputs']:
+                if record[key] is not None:
+                    record[key] = json.loads(record[key])
+            out.append(record)
+        return out
+
+    def set(self, kind, name, status, **kwargs):
+        """
+        Create or update the record of a processing unit.
+        The start timestamp is set if the status is 'running', the stop timestamp if it is 'done' or 'failed'.
+        Fields not defined via `kwargs` keep their value.
+
+        Parameters
+        ----------
+        kind: str
+            the kind of unit
+        name: str
+            the unique name of the unit
+        status: str
+            the new status; one of 'pending', 'running', 'done' or 'failed'
+        kwargs
+            further fields to set: `fingerprint`, `inputs`, `outputs` and `message`
+
+        Returns
+        -------
+
+        """
+        if status not in self.status_options:
+            raise ValueError(f"unknown status '{status}'; options: {self.status_options}")
+        fields = {'status': status}
+        if status == 'running':
+            fields['start'] = time.time()
+            fields['stop'] = None
+        elif status in ['done', 'failed']:
+            fields['stop'] = time.time()
+        for key, value in kwargs.items():
+            if key not in ['fingerprint', 'inputs', 'outputs', 'message']:
+                raise KeyError(f"unknown field '{key}'")
+            if key in ['inputs', 'outputs'] and value is not None:
+                value = json.dumps(sorted(value))
+            fields[key] = value
+        keys = list(fields.keys())
+        update = ', '.join([f'{key} = excluded.{key}' for key in keys])
+        query = 'INSERT INTO units (kind, name, {}) VALUES (?, ?, {}) ' \
+                'ON CONFLICT (kind, name) DO UPDATE SET {}'
+        query = query.format(', '.join(keys), ', '.join(['?'] * len(keys)), update)
+        with self._connect() as con:
+            con.execute(query, [kind, name] + [fields[key] for key in keys])
+
+    def is_done(self, kind, name, fingerprint=None, inputs=None):
+        """
+        Has a processing unit been finished successfully with the same configuration and inputs?
+
+        Parameters
+        ----------
+        kind: str
+            the kind of unit
+        name: str
+            the unique name of the unit
+        fingerprint: str or None
+            the configuration fingerprint to compare with. See :func:`fingerprint`.
+        inputs: list[str] or None
+            the inputs to compare with
+
+        Returns
+        -------
+        bool
+        """
+        record = self.get(kind=kind, name=name)
+        if record is None or record['status'] != 'done':
+            return False
+        if fingerprint is not None and record['fingerprint'] != fingerprint:
+            return False
+        if inputs is not None and record['inputs'] != sorted(inputs):
+            return False
+        return True
+
+    @contextmanager
+    def unit(self, kind, name, **kwargs):
+        """
+        Context manager to track the processing of a unit.
+        The status is set to 'running' on entering and to 'done' or 'failed' on exit.
+
+        Parameters
+        ----------
+        kind: str
+            the kind of unit
+        name: str
+            the unique name of the unit
+        kwargs
+            further fields to set when entering. See :meth:`set`.
+
+        Returns
+        -------
+
+        """
+        self.set(kind=kind, name=name, status='running', **kwargs)
+        try:
+            yield self
+        except BaseException as e:
+            self.set(kind=kind, name=name, status='failed', message=f'{type(e).__name__}: {e}')
+            raise
+        self.set(kind=kind, name=name, status='done', message=None)
+
+    def cleanup(self, directory):
+        """
+        Remove all files in a directory that are not recorded as finished layers.
+        This is used to resume the generation of a product that has crashed or failed:
+        finished layers are kept while half-written layers and cheap derivatives
+        (e.g. VRTs and metadata) are created anew.
+
+        Parameters
+        ----------
+        directory: str
+            the product directory
+
+        Returns
+        -------
+        list[str]
+            the removed files
+        """
+        done = [x['name'] for x in self.select(kind='layer', status='done', prefix=directory)]
+        removed = []
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                path = os.path.join(root, file)
+                if path not in done:
+                    os.remove(path)
+                    removed.append(path)
+        return removed
+
+
+def get_ledger(config):
+    """
+    Get the processing ledger of a configuration.
+    The ledger file is stored next to `db_file` (e.g. `scenes_ledger.db` for `scenes.db`)
+    or as `ledger.db` in `work_dir` if scenes are searched in a STAC catalog.
+
+    Parameters
+    ----------
+    config: dict
+        Dictionary of the parsed config parameters for the current process.
+
+    Returns
+    -------
+    Ledger
+    """
+    if config['db_file'] is not None:
+        filename = os.path.splitext(config['db_file'])[0] + '_ledger.db'
+    else:
+        filename = os.path.join(config['work_dir'], 'ledger.db')
+    return Ledger(filename=filename)
+
+
+def fingerprint(config, kind):
+    """
+    Compute a fingerprint of the configuration parameters that define the output of a processing unit.
+
+    Parameters
+    ----------
+    config: dict
+        Dictionary of the parsed config parameters for the current process.
+    kind: {'scene', 'tile'}
+        the kind of processing unit
+
+    Returns
+    -------
+    str
+        the SHA-256 hash of the relevant parameters
+    """
+    keys = ['product', 'acq_mode', 'measurement', 'annotation', 'dem_type', 'etad']
+    if kind == 'tile':
+        keys.append('meta')
+    elif kind != 'scene':
+        raise ValueError(f"unknown kind '{kind}'; options: 'scene', 'tile'")
+    values = {key: config[key] for key in keys}
+    if kind == 'tile':
+        # the processing mode only selects the stages to run; of the ARD stages only the product type
+        # defines the output, so that an 'nrb' run after a 'sar, nrb' run recognizes the finished tiles
+        values['product_type'] = 'NRB' if 'nrb' in config['mode'] else 'ORB'
+    encoded = json.dumps(values, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def tile_name(tile, scenes):
+    """
+    Get the unique ledger name of an ARD tile processing unit, which is composed of the
+    MGRS tile ID and the name of the first source scene, e.g.
+    `32TNT_S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160`.
+
+    Parameters
+    ----------
+    tile: str
+        the MGRS tile ID
+    scenes: list[str]
+        the source scenes of the tile
+
+    Returns
+    -------
+    str
+    """
+    first = sorted([os.path.basename(x) for x in scenes])[0]
+    return '{}_{}'.format(tile, os.path.splitext(first)[0])
+
+
+def track(ledger, kind, name, **kwargs):
+    """
+    Like :meth:`Ledger.unit` but returns a context manager without effect if `ledger` is None.
+
+    Parameters
+    ----------
+    ledger: Ledger or None
+        the processing ledger
+    kind: str
+        the kind of unit
+    name: str
+        the unique name of the unit
+    kwargs
+        further fields to set. See :meth:`Ledger.set`.
+
+    Returns
+    -------
+    contextlib.AbstractContextManager
+    """
+    if ledger is None:
+        return nullcontext()
+    return ledger.unit(kind=kind, name=name, **kwargs)
+
+
+def report(ledger, kind=None, status=None):
+    """
+    Print a summary and a list of the processing units recorded in a ledger.
+
+    Parameters
+    ----------
+    ledger: Ledger
+        the processing ledger
+    kind: str or None
+        only report units of this kind
+    status: str or list[str] or None
+        only report units with this status
+
+    Returns
+    -------
+
+    """
+    records = ledger.select(kind=kind, status=status)
+    summary = {}
+    for record in records:
+        key = (record['kind'], record['status'])
+        summary[key] = summary.get(key, 0) + 1
+    print(f'ledger: {ledger.filename}')
+    for (k, s), count in sorted(summary.items()):
+        print(f'{k:<6} {s:<8} {count}')
+    print()
+    for record in records:
+        if record['start'] is not None and record['stop'] is not None:
+            duration = '{:.1f}s'.format(record['stop'] - record['start'])
+        else:
+            duration = '-'
+        line = f"{record['kind']:<6} {record['status']:<8} {duration:>10}  {record['name']}"
+        if record['message'] is not None:
+            line += f"  ({record['message']})"
+        print(line)
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import socket
+import resource
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from S1_NRB import context
+
+_local = threading.local()
+
+
+def configure(directory):
+    """
+    Enable the recording of metrics for the current processing run.
+    The metrics are written to a JSON lines file `<YYYYmmddTHHMM>_metrics.jsonl` in `directory`.
+    The file name is stored in the run context; see :mod:`S1_NRB.context`.
+
+    Parameters
+    ----------
+    directory: str
+        the directory to write the metrics file to, e.g. the log directory
+
+    Returns
+    -------
+    str
+        the name of the metrics file
+    """
+    now = datetime.now().strftime('%Y%m%dT%H%M')
+    os.makedirs(directory, exist_ok=True)
+    filename = os.path.join(directory, f'{now}_metrics.jsonl')
+    context.update(metrics=filename)
+    return filename
+
+
+@contextmanager
+def measure(step, unit=None, **labels):
+    """
+    Measure the resources used by a processing step.
+    A record is appended to the metrics file defined via :func:`configure` when the step has finished
+    (also if it failed). Nothing is written if metrics have not been configured.
+    The record contains the following values:
+
+    - `wall`: the wall time in seconds
+    - `cpu`: the user and system CPU time in seconds of the current process and its finished child processes
+      (e.g. SNAP GPT)
+    - `peak_rss`: the peak resident set size in bytes of the current process or its largest child process.
+      This is a high-water mark since process start, which is only specific to the step if it was reached during it.
+    - `read_bytes` and `write_bytes`: the bytes read from and written to the file system by the current process
+      and its finished child processes; reads served from the page cache are not counted
+    - `start`: the start time as seconds since the epoch and `tid`: the native thread ID,
+      which are used to place the step on a timeline (see :func:`export_trace`)
+
+    Parameters
+    ----------
+    step: str
+        the name of the processing step, e.g. 'snap.rtc'
+    unit: str or None
+        the name of the processing unit, e.g. a scene or tile. If None, the unit of the enclosing step is used.
+    labels
+        additional values to be stored in the record, e.g. `layer='vv-g-lin'`
+
+    Examples
+    --------
+    >>> from S1_NRB import metrics
+    >>> with metrics.measure('sar', unit='S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160'):
+    >>>     with metrics.measure('snap.rtc'):
+    >>>         ...
+    """
+    units = getattr(_local, 'units', [])
+    if unit is None and len(units) > 0:
+        unit = units[-1]
+    _local.units = units + [unit]
+    start_time = time.time()
+    start = _usage()
+    status = 'done'
+    try:
+        yield
+    except BaseException:
+        status = 'failed'
+        raise
+    finally:
+        _local.units = units
+        stop = _usage()
+        filename = context.get('metrics')
+        if filename is not None:
+            record = {'time': datetime.now().isoformat(timespec='seconds'),
+                      'host': socket.gethostname(), 'pid': os.getpid(), 'tid': threading.get_native_id(),
+                      'step': step, 'unit': unit, 'status': status, 'start': round(start_time, 6)}
+            record.update(labels)
+            for key in ['wall', 'cpu', 'read_bytes', 'write_bytes']:
+                record[key] = round(stop[key] - start[key], 6)
+            record['peak_rss'] = stop['peak_rss']
+            with open(filename, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+
+def read(filename):
+    """
+    Read the records of a metrics file.
+
+    Parameters
+    ----------
+    filename: str
+        the JSON lines metrics file
+
+    Returns
+    -------
+    list[dict]
+    """
+    with open(filename, 'r') as f:
+        return [json.loads(line) for line in f if line.strip() != '']
+
+
+def export_prometheus(filename, outname):
+    """
+    Aggregate the records of a metrics file per processing step and write them to a
+    Prometheus textfile as read by the textfile collector of the node exporter.
+    The file is replaced atomically.
+
+    Parameters
+    ----------
+    filename: str
+        the JSON lines metrics file
+    outname: str
+        the name of the Prometheus textfile, e.g. `metrics.prom`
+
+    Returns
+    -------
+
+    """
+    series = [('runs_total', 'counter', 'Number of finished runs of the processing step'),
+              ('failures_total', 'counter', 'Number of failed runs of the processing step'),
+              ('wall_seconds_total', 'counter', 'Wall time spent in the processing step'),
+              ('cpu_seconds_total', 'counter', 'CPU time spent in the processing step'),
+              ('read_bytes_total', 'counter', 'Bytes read from the file system in the processing step'),
+              ('write_bytes_total', 'counter', 'Bytes written to the file system in the processing step'),
+              ('peak_rss_bytes', 'gauge', 'Largest peak resident set size observed in the processing step')]
+    steps = {}
+    for record in read(filename):
+        values = steps.setdefault(record['step'], {key: 0 for key, _, _ in series})
+        values['runs_total'] += 1
+        values['failures_total'] += record['status'] == 'failed'
+        values['wall_seconds_total'] += record['wall']
+        values['cpu_seconds_total'] += record['cpu']
+        values['read_bytes_total'] += record['read_bytes']
+        values['write_bytes_total'] += record['write_bytes']
+        values['peak_rss_bytes'] = max(values['peak_rss_bytes'], record['peak_rss'])
+    lines = []
+    for key, kind, description in series:
+        name = f's1_nrb_step_{key}'
+        lines.append(f'# HELP {name} {description}.')
+        lines.append(f'# TYPE {name} {kind}')
+        for step, values in sorted(steps.items()):
+            lines.append(f'{name}{{step="{step}"}} {round(values[key], 3)}')
+    tmp = outname + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp, outname)
+
+
+def export_trace(filename, outname):
+    """
+    Convert the records of a metrics file to a trace in the Chrome trace event format, which can be
+    viewed with e.g. https://ui.perfetto.dev or chrome://tracing. Each step is a span on the track of the
+    process and thread it was run in, so that nested steps are shown below each other and concurrent workers
+    side by side. The processes are named by host and process ID.
+
+    Parameters
+    ----------
+    filename: str
+        the JSON lines metrics file
+    outname: str
+        the name of the trace JSON file
+
+    Returns
+    -------
+
+    """
+    records = [x for x in read(filename) if 'start' in x]
+    t0 = min([x['start'] for x in records], default=0)
+    events = []
+    processes = {}
+    threads = set()
+    for record in records:
+        key = (record['host'], record['pid'])
+        if key not in processes:
+            processes[key] = len(processes) + 1
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': processes[key],
+                           'args': {'name': '{} {}'.format(*key)}})
+        pid = processes[key]
+        if (pid, record['tid']) not in threads:
+            threads.add((pid, record['tid']))
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': record['tid'],
+                           'args': {'name': 'thread {}'.format(record['tid'])}})
+        args = {k: v for k, v in record.items() if k not in ['time', 'host', 'pid', 'tid', 'step', 'start', 'wall']}
+        events.append({'name': record['step'], 'cat': record['step'].split('.')[0], 'ph': 'X',
+                       'ts': round((record['start'] - t0) * 1e6), 'dur': round(record['wall'] * 1e6),
+                       'pid': pid, 'tid': record['tid'], 'args': args})
+    with open(outname, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def finalize(trace=False):
+    """
+    Write the metrics recorded since :func:`configure` to the Prometheus textfile `metrics.prom`
+    next to the metrics file. See :func:`export_prometheus`.
+
+    Parameters
+    ----------
+    trace: bool
+        also write the metrics as a trace `<YYYYmmddTHHMM>_trace.json` next to the metrics file?
+        See :func:`export_trace`.
+
+    Returns
+    -------
+
+    """
+    filename = context.get('metrics')
+    if filename is not None and os.path.isfile(filename):
+        outname = os.path.join(os.path.dirname(filename), 'metrics.prom')
+        export_prometheus(filename=filename, outname=outname)
+        if trace:
+            export_trace(filename=filename, outname=filename.replace('_metrics.jsonl', '_trace.json'))
+
+
+def _usage():
+    """
+    Helper function to read the current resource usage of the process and its finished child processes.
+    """
+    out = {'wall': time.perf_counter(), 'cpu': 0, 'read_bytes': 0, 'write_bytes': 0, 'peak_rss': 0}
+    for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+        usage = resource.getrusage(who)
+        out['cpu'] += usage.ru_utime + usage.ru_stime
+        # block counts are in units of 512 bytes
+        out['read_bytes'] += usage.ru_inblock * 512
+        out['write_bytes'] += usage.ru_oublock * 512
+        # kilobytes on Linux
+        out['peak_rss'] = max(out['peak_rss'], usage.ru_maxrss * 1024)
+    return out
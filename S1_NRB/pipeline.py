@@ -0,0 +1,143 @@
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import S1_NRB.ancillary as anc
+
+
+def execute(nodes, workers, logger, initializers=None):
+    """
+    Execute a directed acyclic graph (DAG) of processing nodes.
+    A node is started as soon as all nodes it depends on have finished successfully.
+    If a node fails, all nodes depending on it are skipped while independent nodes continue.
+
+    If the number of workers of all pools is 1, the nodes are executed one after the other in the current
+    process, always choosing the ready node with the highest priority. Otherwise, each pool is a separate
+    :class:`concurrent.futures.ProcessPoolExecutor` and nodes are submitted to their pool once they are ready.
+
+    Parameters
+    ----------
+    nodes: dict[str, dict]
+        the processing nodes with unique names as keys. Each node is a dictionary with the following keys:
+
+        - func: the function to be executed; must be importable by the worker processes
+        - kwargs: the keyword arguments passed to `func`
+        - deps: the names of nodes that have to be finished before the node can be started.
+          Names not contained in `nodes` are considered finished.
+        - pool: the name of the worker pool in `workers`
+        - priority: nodes with higher priority are started first in sequential execution
+        - proc_step: the processing step name passed to :func:`S1_NRB.ancillary.log`
+        - scenes: the scene name(s) passed to :func:`S1_NRB.ancillary.log`
+        - msg: an optional message printed when the node is started
+    workers: dict[str, int]
+        the number of workers per pool
+    logger: logging.Logger
+        The log handler for the current process.
+    initializers: dict[str, tuple] or None
+        optional worker process initializers per pool as tuple `(initializer, initargs)`.
+        See :class:`concurrent.futures.ProcessPoolExecutor`.
+
+    Returns
+    -------
+    dict[str, str]
+        the status of each node; one of 'done', 'failed' or 'skipped'
+
+    Raises
+    ------
+    Exception
+        the first exception raised by a node, after all other possible nodes have been executed
+    RuntimeError
+        if the node graph contains a cycle
+    """
+    status = {name: 'pending' for name in nodes.keys()}
+    errors = []
+
+    def ready():
+        out = []
+        for name, node in nodes.items():
+            if status[name] == 'pending':
+                deps = [status.get(x, 'done') for x in node['deps']]
+                if any(x in ['failed', 'skipped'] for x in deps):
+                    status[name] = 'skipped'
+                    anc.log(handler=logger, mode='warning', proc_step=node['proc_step'],
+                            scenes=node['scenes'], msg='skipped due to a failed dependency')
+                elif all(x == 'done' for x in deps):
+                    out.append(name)
+        return out
+
+    def start(name):
+        status[name] = 'running'
+        msg = nodes[name].get('msg')
+        if msg is not None:
+            print(msg)
+
+    def finish(name, result=None, error=None):
+        node = nodes[name]
+        if error is None:
+            status[name] = 'done'
+            if result == 'Already processed - Skip!':
+                print('### ' + result)
+            anc.log(handler=logger, mode='info', proc_step=node['proc_step'],
+                    scenes=node['scenes'], msg=result)
+        else:
+            status[name] = 'failed'
+            # must be called from within the except block for the traceback to be logged
+            anc.log(handler=logger, mode='exception', proc_step=node['proc_step'],
+                    scenes=node['scenes'], msg=error)
+            errors.append(error)
+
+    if all(x <= 1 for x in workers.values()):
+        while True:
+            candidates = ready()
+            if len(candidates) == 0:
+                break
+            name = max(candidates, key=lambda x: nodes[x]['priority'])
+            start(name)
+            try:
+                result = nodes[name]['func'](**nodes[name]['kwargs'])
+                finish(name, result=result)
+            except Exception as e:
+                finish(name, error=e)
+    else:
+        pools = {}
+        initializers = {} if initializers is None else initializers
+        for pool, n in workers.items():
+            initializer, initargs = initializers.get(pool, (None, ()))
+            pools[pool] = ProcessPoolExecutor(max_workers=n, initializer=initializer,
+                                              initargs=initargs)
+        futures = {}
+        try:
+            while True:
+                candidates = sorted(ready(), key=lambda x: nodes[x]['priority'], reverse=True)
+                for name in candidates:
+                    node = nodes[name]
+                    start(name)
+                    future = pools[node['pool']].submit(node['func'], **node['kwargs'])
+                    futures[future] = name
+                if len(futures) == 0:
+                    break
+                finished, _ = wait(futures.keys(), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = futures.pop(future)
+                    try:
+                        finish(name, result=future.result())
+                    except Exception as e:
+                        # the traceback of the worker process is attached to the exception
+                        finish(name, error=e)
+        except BaseException:
+            # do not wait for the running nodes on errors and keyboard interrupts, which might take hours;
+            # nodes that have not been started yet are cancelled
+            for future in futures.keys():
+                future.cancel()
+            for pool in pools.values():
+                pool.shutdown(wait=False)
+            raise
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+
+    pending = [name for name, value in status.items() if value == 'pending']
+    if len(pending) > 0:
+        raise RuntimeError(f'the processing graph contains a cycle between nodes: {pending}')
+    if len(errors) > 0:
+        failed = len([x for x in status.values() if x == 'failed'])
+        skipped = len([x for x in status.values() if x == 'skipped'])
+        print(f'{failed}/{len(nodes)} processing steps failed, {skipped} skipped')
+        raise errors[0]
+    return status
@@ -0,0 +1,241 @@
+import os
+import re
+import json
+import statistics
+from S1_NRB import snap
+
+# [2023-05-05 10:00:00,000] [    INFO] [    SAR] -- S1A_IW_GRDH_1SDV_..._D160.zip -- 523.12
+_pattern_log = re.compile(r'^\[.*?\] \[\s*INFO\] \[\s*(?P<step>\w+)\] -- (?P<scenes>.*) -- (?P<seconds>[0-9.]+)$')
+
+
+def read_timings(log_dir):
+    """
+    Read the processing times of SAR scenes and ARD tiles from the log files of previous runs.
+    These are the info lines written by :func:`S1_NRB.ancillary.log` after a scene or tile has been processed.
+
+    Parameters
+    ----------
+    log_dir: str
+        the directory containing the log files `*_process.log`
+
+    Returns
+    -------
+    dict
+        a dictionary with keys
+
+        - `sar`: a dictionary with lists of processing times in seconds per product type, e.g. 'GRD' or 'SLC'
+        - `ard`: a list of processing times in seconds
+    """
+    out = {'sar': {}, 'ard': []}
+    if not os.path.isdir(log_dir):
+        return out
+    for item in sorted(os.listdir(log_dir)):
+        if not item.endswith('_process.log'):
+            continue
+        with open(os.path.join(log_dir, item), 'r') as f:
+            for line in f:
+                match = _pattern_log.search(line.rstrip())
+                if match is None:
+                    continue
+                step = match.group('step')
+                seconds = float(match.group('seconds'))
+                if step == 'SAR':
+                    product = _product(match.group('scenes'))
+                    out['sar'].setdefault(product, []).append(seconds)
+                elif step in ['NRB', 'ORB']:
+                    out['ard'].append(seconds)
+    return out
+
+
+def directory_size(path):
+    """
+    Get the total size of all files in a directory.
+
+    Parameters
+    ----------
+    path: str
+        the directory
+
+    Returns
+    -------
+    int
+        the size in bytes
+    """
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for file in files:
+            fname = os.path.join(root, file)
+            if not os.path.islink(fname):
+                size += os.path.getsize(fname)
+    return size
+
+
+def calibrate(log_dir, ledger):
+    """
+    Derive per-unit processing times and disk footprints from previous processing runs.
+    The times are the medians of the values read via :func:`read_timings`,
+    the footprints the medians of the output sizes of all units recorded as finished in the ledger.
+
+    Parameters
+    ----------
+    log_dir: str
+        the directory containing the log files of previous runs
+    ledger: S1_NRB.ledger.Ledger
+        the processing ledger
+
+    Returns
+    -------
+    dict
+        a dictionary with keys
+
+        - `sar_seconds`: the SAR processing time per product type (or key `all` for all types)
+        - `ard_seconds`: the ARD processing time per tile or None
+        - `sar_bytes`: the disk footprint of a processed SAR scene or None
+        - `ard_bytes`: the disk footprint of an ARD product or None
+        - `samples`: the number of values each estimate is based on
+    """
+    timings = read_timings(log_dir=log_dir)
+    sar = {product: statistics.median(values) for product, values in timings['sar'].items()}
+    values_all = [x for values in timings['sar'].values() for x in values]
+    if len(values_all) > 0:
+        sar['all'] = statistics.median(values_all)
+    ard = statistics.median(timings['ard']) if len(timings['ard']) > 0 else None
+    sizes = {}
+    for kind in ['scene', 'tile']:
+        sizes[kind] = []
+        for record in ledger.select(kind=kind, status='done'):
+            for path in record['outputs'] or []:
+                if os.path.isdir(path):
+                    sizes[kind].append(directory_size(path))
+    return {'sar_seconds': sar,
+            'ard_seconds': ard,
+            'sar_bytes': statistics.median(sizes['scene']) if len(sizes['scene']) > 0 else None,
+            'ard_bytes': statistics.median(sizes['tile']) if len(sizes['tile']) > 0 else None,
+            'samples': {'sar_seconds': len(values_all), 'ard_seconds': len(timings['ard']),
+                        'sar_bytes': len(sizes['scene']), 'ard_bytes': len(sizes['tile'])}}
+
+
+def estimate(graph, calibration, gpt_args, gdal_threads, gdal_cache, sar_workers, ard_workers):
+    """
+    Estimate the resources needed to process the unfinished units of a processing plan.
+
+    Parameters
+    ----------
+    graph: dict
+        the processing plan as created by :func:`S1_NRB.processor.plan` with keys `scenes` and `tiles`
+    calibration: dict
+        the calibration values returned by :func:`calibrate`
+    gpt_args: list[str] or None
+        the additional SNAP GPT arguments; used to read the number of threads and the JVM heap size.
+        See :func:`S1_NRB.snap.gpt_resources`.
+    gdal_threads: int
+        the number of GDAL threads per ARD worker
+    gdal_cache: int
+        the GDAL block cache size in bytes
+    sar_workers: int
+        the number of concurrent SAR workers
+    ard_workers: int
+        the number of concurrent ARD workers
+
+    Returns
+    -------
+    dict
+        a dictionary with the number of units to be processed (`scenes`, `tiles`), `cpu_hours`,
+        `wall_hours`, `peak_ram_bytes` and `disk_bytes`. Values that cannot be estimated
+        due to missing calibration data are None.
+    """
+    gpt = snap.gpt_resources(gpt_args)
+    sar_threads = gpt['threads'] if gpt['threads'] is not None else os.cpu_count()
+    scenes = [x for x in graph['scenes'] if x['status'] != 'done']
+    tiles = [x for x in graph['tiles'] if x['status'] != 'done']
+
+    sar_seconds = []
+    for scene in scenes:
+        seconds = calibration['sar_seconds']
+        sar_seconds.append(seconds.get(scene['product'], seconds.get('all')))
+    if None in sar_seconds:
+        sar_seconds = None
+    else:
+        sar_seconds = sum(sar_seconds)
+    if calibration['ard_seconds'] is not None:
+        ard_seconds = calibration['ard_seconds'] * len(tiles)
+    else:
+        ard_seconds = None if len(tiles) > 0 else 0
+
+    if sar_seconds is not None and ard_seconds is not None:
+        cpu_hours = (sar_seconds * sar_threads + ard_seconds * gdal_threads) / 3600
+        wall_hours = (sar_seconds / sar_workers + ard_seconds / ard_workers) / 3600
+    else:
+        cpu_hours = wall_hours = None
+
+    # SAR and ARD workers may run at the same time
+    ram = 0
+    if len(scenes) > 0:
+        if gpt['memory'] is not None:
+            ram += gpt['memory'] * 1.2 * min(sar_workers, len(scenes))
+        else:
+            ram = None
+    if ram is not None and len(tiles) > 0:
+        ram += gdal_cache * min(ard_workers, len(tiles))
+
+    disk = 0
+    for key, units in [('sar_bytes', scenes), ('ard_bytes', tiles)]:
+        if len(units) > 0:
+            if calibration[key] is None or disk is None:
+                disk = None
+            else:
+                disk += calibration[key] * len(units)
+    return {'scenes': len(scenes), 'tiles': len(tiles), 'cpu_hours': cpu_hours,
+            'wall_hours': wall_hours, 'peak_ram_bytes': ram, 'disk_bytes': disk}
+
+
+def summarize(graph, outname=None):
+    """
+    Print a processing plan and optionally write it to a JSON file.
+
+    Parameters
+    ----------
+    graph: dict
+        the processing plan as created by :func:`S1_NRB.processor.plan`
+    outname: str or None
+        the name of the JSON file to be written
+
+    Returns
+    -------
+
+    """
+    print('###### [   PLAN] SAR scenes')
+    for scene in graph['scenes']:
+        print(f"{scene['status']:<8} {scene['name']}")
+        for neighbor in scene['neighbors']:
+            print(f"         neighbor: {neighbor}")
+        if scene['ocn'] is not None:
+            print(f"         OCN:      {scene['ocn']}")
+    print('###### [   PLAN] ARD tiles')
+    for tile in graph['tiles']:
+        scenes = [os.path.basename(x) for x in tile['scenes']]
+        print(f"{tile['status']:<8} {tile['tile']} | Scenes: {scenes}")
+    print('###### [   PLAN] estimate')
+    est = graph['estimate']
+
+    def fmt(value, unit, factor=1):
+        return 'unknown (no calibration data)' if value is None else f'{value / factor:.2f} {unit}'
+
+    print(f"scenes to be processed: {est['scenes']}")
+    print(f"tiles to be processed:  {est['tiles']}")
+    print(f"CPU time:               {fmt(est['cpu_hours'], 'h')}")
+    print(f"wall time:              {fmt(est['wall_hours'], 'h')}")
+    print(f"peak RAM:               {fmt(est['peak_ram_bytes'], 'GiB', 1024 ** 3)}")
+    print(f"disk footprint:         {fmt(est['disk_bytes'], 'GiB', 1024 ** 3)}")
+    if outname is not None:
+        with open(outname, 'w') as f:
+            json.dump(graph, f, indent=2)
+        print(f'plan written to {outname}')
+
+
+def _product(scene):
+    """
+    Helper function to get the product type from a scene name.
+    """
+    match = re.search(r'S1[AB]_[A-Z0-9]{2}_(?P<product>SLC|GRD|OCN)', scene)
+    return match.group('product') if match is not None else 'unknown'
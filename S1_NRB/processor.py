@@ -1,15 +1,25 @@
 import os
 import time
-from osgeo import gdal
-from spatialist import bbox, intersect
+import shutil
+from osgeo import gdal, ogr
+from spatialist import bbox
 from spatialist.ancillary import finder
-from pyroSAR import identify, identify_many, Archive
+from pyroSAR import Archive
 from S1_NRB import etad, dem, ard, snap
 from S1_NRB.config import get_config, snap_conf, gdal_conf
 import S1_NRB.ancillary as anc
 import S1_NRB.tile_extraction as tile_ex
 from S1_NRB import search
 from S1_NRB import ocn
+from S1_NRB import pipeline
+from S1_NRB import ledger
+from S1_NRB import workqueue
+from S1_NRB import planner
+from S1_NRB import metrics
+from S1_NRB import profiling
+from S1_NRB import cache
+from S1_NRB import context
+from S1_NRB.cache import DiskCache, identify, identify_many
 
 gdal.UseExceptions()
 
@@ -33,6 +43,7 @@ def main(config_file, section_name='PROCESSING', debug=False, **kwargs):
     update = False  # update existing products? Internal development flag.
     config = get_config(config_file=config_file, proc_section=section_name, **kwargs)
     logger = anc.set_logging(config=config, debug=debug)
+    _setup(config=config)
     geocode_prms = snap_conf(config=config)
     gdal_prms = gdal_conf(config=config)
     
@@ -47,15 +58,322 @@ def main(config_file, section_name='PROCESSING', debug=False, **kwargs):
                                           username=None, password=None)
     ####################################################################################################################
     # scene selection
+    with metrics.measure('search'):
+        selection = _select_scenes(config=config)
+    if selection is None:
+        return
+    scenes, aoi_tiles, neighbors, scenes_ocn = selection
+    ####################################################################################################################
+    # annotation layer selection
+    annotation = config.get('annotation', None)
+    measurement = config['measurement']
+    export_extra = None
+    lookup = {'dm': 'layoverShadowMask',
+              'ei': 'incidenceAngleFromEllipsoid',
+              'lc': 'scatteringArea',
+              'ld': 'lookDirection',
+              'li': 'localIncidenceAngle',
+              'np': 'NESZ',
+              'gs': 'gammaSigmaRatio',
+              'sg': 'sigmaGammaRatio'}
+    
+    if annotation is not None:
+        annotation = ['gs' if x == 'ratio' and measurement == 'gamma' else 'sg' if x == 'ratio'
+        else x for x in annotation]
+        export_extra = []
+        for layer in annotation:
+            if layer in lookup:
+                export_extra.append(lookup[layer])
+    ####################################################################################################################
+    # The processing steps are organized as a graph of nodes which are executed as soon as the nodes they depend on
+    # have finished: SAR scenes and OCN products have no dependencies, ARD tiles depend on the SAR scenes (and OCN
+    # products) that overlap with them. This way, the first ARD products are created while other scenes are still
+    # being processed. The ledger records the status of each node so that finished scenes and tiles are skipped
+    # and the unfinished ones of a crashed run are processed again.
+    nodes = {}
+    led = ledger.get_ledger(config=config)
+    sar_workers = _sar_workers(config=config)
+    ard_workers = config['ard_workers']
+    # in distributed mode, each worker processes one node at a time
+    parallel = max(sar_workers, ard_workers) > 1 and config['work_queue'] is None
+    # the overlap of all scenes with the MGRS tiles; used for geocoding and the selection of the ARD tiles
+    with metrics.measure('tile_overlaps'):
+        overlaps = _tile_overlaps(scenes=scenes, config=config)
+    ####################################################################################################################
+    # main SAR processing
+    if sar_flag:
+        for i, scene in enumerate(scenes):
+            scene_base = os.path.splitext(os.path.basename(scene.scene))[0]
+            out_dir_scene = os.path.join(config['sar_dir'], scene_base)
+            tmp_dir_scene = os.path.join(config['tmp_dir'], scene_base)
+            
+            fingerprint = ledger.fingerprint(config=config, kind='scene')
+            inputs = [scene.scene] + (neighbors[i] if neighbors[i] is not None else [])
+            record = led.get(kind='scene', name=scene_base)
+            # scenes processed before the ledger was introduced are only recognized by their directory
+            legacy = record is None and os.path.isdir(out_dir_scene)
+            if not update and (legacy or led.is_done(kind='scene', name=scene_base,
+                                                     fingerprint=fingerprint, inputs=inputs)):
+                msg = 'Already processed - Skip!'
+                print(f'###### [    SAR] Scene {i + 1}/{len(scenes)}: {scene.scene}')
+                print('### ' + msg)
+                anc.log(handler=logger, mode='info', proc_step='GEOCODE', scenes=scene.scene, msg=msg)
+                continue
+            if record is not None and not update and os.path.isdir(out_dir_scene):
+                # remove the incomplete or outdated output of a previous run
+                shutil.rmtree(out_dir_scene)
+            led.set(kind='scene', name=scene_base, status='pending',
+                    fingerprint=fingerprint, inputs=inputs, outputs=[out_dir_scene])
+            os.makedirs(out_dir_scene, exist_ok=True)
+            os.makedirs(tmp_dir_scene, exist_ok=True)
+            nodes[f'sar:{scene.scene}'] = {
+                'func': _sar_scene, 'deps': [], 'pool': 'sar', 'priority': 0,
+                'proc_step': 'SAR', 'scenes': scene.scene,
+                'msg': f'###### [    SAR] Scene {i + 1}/{len(scenes)}: {scene.scene}',
+                'kwargs': {'scene': scene, 'neighbors': neighbors[i], 'config': config,
+                           'geocode_prms': geocode_prms, 'export_extra': export_extra,
+                           'username': username, 'password': password, 'logger': logger,
+                           'led': led, 'tiles': [overlaps[1][j] for j in overlaps[0][i].indices]}}
+    ####################################################################################################################
+    # OCN preparation
+    ocn_nodes = _ocn_nodes(scenes=scenes, scenes_ocn=scenes_ocn)
+    for scene, scene_ocn in zip(scenes, scenes_ocn):
+        nodes[f'ocn:{scene.scene}'] = {
+            'func': _ocn_extract, 'deps': [], 'pool': 'ocn', 'priority': 1,
+            'proc_step': 'OCN', 'scenes': scene_ocn.scene, 'msg': None,
+            'kwargs': {'scene': scene_ocn, 'config': config}}
+    ####################################################################################################################
+    # ARD - final product generation
+    threads_ard = max(1, gdal_prms['threads'] // ard_workers) if parallel else gdal_prms['threads']
+    if nrb_flag or orb_flag:
+        product_type = 'NRB' if nrb_flag else 'ORB'
+        
+        # prepare WBM MGRS tiles
+        vec = [x.geometry() for x in scenes]
+        extent = anc.get_max_ext(geometries=vec)
+        del vec
+        with bbox(coordinates=extent, crs=4326) as box, metrics.measure('dem.prepare'):
+            dem.prepare(vector=box, threads=gdal_prms['threads'],
+                        dem_dir=None, wbm_dir=config['wbm_dir'],
+                        dem_type=config['dem_type'], kml_file=config['kml_file'],
+                        tilenames=aoi_tiles, username=username, password=password,
+                        dem_strict=True)
+        print('preparing {} products'.format(product_type))
+        tiles_ard = _select_tiles(scenes=scenes, config=config, aoi_tiles=aoi_tiles, overlaps=overlaps)
+        t_total = len(tiles_ard)
+        for t, (tilename, extent, epsg, scenes_sub_fnames) in enumerate(tiles_ard):
+            outdir = os.path.join(config['ard_dir'], tilename)
+            os.makedirs(outdir, exist_ok=True)
+            fname_wbm = os.path.join(config['wbm_dir'], config['dem_type'],
+                                     '{}_WBM.tif'.format(tilename))
+            if not os.path.isfile(fname_wbm):
+                fname_wbm = None
+            add_dem = True  # add the DEM as output layer?
+            dem_type = config['dem_type'] if add_dem else None
+            msg = '###### [    {product_type}] Tile {t}/{t_total}: {tile} | Scenes: {scenes} '
+            msg = msg.format(tile=tilename, t=t + 1, t_total=t_total,
+                             scenes=[os.path.basename(s) for s in scenes_sub_fnames],
+                             product_type=product_type)
+            name = ledger.tile_name(tile=tilename, scenes=scenes_sub_fnames)
+            fingerprint = ledger.fingerprint(config=config, kind='tile')
+            existing = ard.find_products(outdir=outdir, scenes=scenes_sub_fnames,
+                                         product_type=product_type, tile=tilename)
+            skip, outputs = _tile_outputs(led=led, name=name, fingerprint=fingerprint, inputs=scenes_sub_fnames,
+                                          existing=existing, update=update)
+            if skip:
+                print(msg)
+                print('### Already processed - Skip!')
+                anc.log(handler=logger, mode='info', proc_step=product_type,
+                        scenes=scenes_sub_fnames, msg='Already processed - Skip!')
+                continue
+            led.set(kind='tile', name=name, status='pending', fingerprint=fingerprint,
+                    inputs=scenes_sub_fnames, outputs=outputs)
+            deps = _tile_deps(scenes=scenes_sub_fnames, ocn_nodes=ocn_nodes)
+            nodes[f'ard:{tilename}:{t}'] = {
+                'func': _ard_tile, 'deps': deps, 'pool': 'ard', 'priority': 2,
+                'proc_step': product_type, 'scenes': scenes_sub_fnames, 'msg': msg,
+                'kwargs': {'led': led, 'config': config, 'product_type': product_type, 'scenes': scenes_sub_fnames,
+                           'datadir': config['sar_dir'], 'outdir': outdir, 'tile': tilename,
+                           'extent': extent, 'epsg': epsg, 'wbm': fname_wbm, 'dem_type': dem_type,
+                           'kml': config['kml_file'], 'multithread': threads_ard > 1,
+                           'annotation': annotation, 'update': update}}
+    ####################################################################################################################
+    # execution
+    if parallel:
+        print(f'processing with {sar_workers} SAR worker(s) and {ard_workers} ARD worker(s) '
+              f'using {threads_ard} GDAL thread(s) each')
+    try:
+        if config['work_queue'] is not None:
+            # DEM credentials are not written to the queue;
+            # the workers read them from the environment variables DEM_USER and DEM_PASS
+            for node in nodes.values():
+                for key in ['username', 'password']:
+                    if key in node['kwargs']:
+                        node['kwargs'][key] = None
+            queue = workqueue.get_queue(config['work_queue'])
+            queue.submit(nodes)
+            print(f'submitted {len(nodes)} jobs to work queue {queue}; '
+                  f'start workers with: s1_nrb worker -c {config_file}')
+        else:
+            # the run context is passed to the worker processes explicitly
+            settings = context.settings()
+            pipeline.execute(nodes=nodes, logger=logger,
+                             workers={'sar': sar_workers, 'ocn': 1, 'ard': ard_workers},
+                             initializers={'sar': (_worker_init, (settings,)),
+                                           'ocn': (_worker_init, (settings,)),
+                                           'ard': (_worker_init, (settings, threads_ard))})
+    finally:
+        gdal.SetConfigOption('GDAL_NUM_THREADS', gdal_prms['threads_before'])
+        metrics.finalize(trace=config['trace'])
+
+
+def worker(config_file, section_name='PROCESSING', debug=False, **kwargs):
+    """
+    Process jobs from the work queue defined by configuration parameter `work_queue` until all jobs
+    have finished or are blocked by failed dependencies. The jobs are submitted to the queue by :func:`main`.
+    Multiple workers can be started on different machines sharing the same file system.
+    
+    Parameters
+    ----------
+    config_file: str
+        Full path to a `config.ini` file.
+    section_name: str
+        Section name of the `config.ini` file that processing parameters
+        should be parsed from. Default is 'PROCESSING'.
+    debug: bool
+        Set pyroSAR logging level to DEBUG? Default is False.
+    **kwargs
+        extra arguments to override parameters in the config file. E.g. `gdal_threads`.
+    """
+    config = get_config(config_file=config_file, proc_section=section_name, **kwargs)
+    if config['work_queue'] is None:
+        raise RuntimeError("parameter 'work_queue' must be defined to start a worker")
+    logger = anc.set_logging(config=config, debug=debug)
+    _setup(config=config)
+    gdal_prms = gdal_conf(config=config)
+    queue = workqueue.get_queue(config['work_queue'])
+    try:
+        summary = workqueue.work(queue=queue, logger=logger)
+    finally:
+        gdal.SetConfigOption('GDAL_NUM_THREADS', gdal_prms['threads_before'])
+        metrics.finalize(trace=config['trace'])
+    print('work queue summary: ' + ', '.join([f'{k}: {v}' for k, v in summary.items()]))
+
+
+def plan(config_file, section_name='PROCESSING', outname=None, **kwargs):
+    """
+    Dry run of :func:`main`: search the scenes and assign them to MGRS tiles without processing anything.
+    The resulting job graph marks the scenes and tiles that have already been processed and estimates
+    the CPU time, peak RAM and disk footprint needed to process the remaining ones.
+    The estimates are calibrated from the processing times in the log files of previous runs
+    and the sizes of products recorded as finished in the processing ledger. See :mod:`S1_NRB.planner`.
+    
+    Parameters
+    ----------
+    config_file: str
+        Full path to a `config.ini` file.
+    section_name: str
+        Section name of the `config.ini` file that processing parameters
+        should be parsed from. Default is 'PROCESSING'.
+    outname: str or None
+        the name of a JSON file to write the plan to
+    **kwargs
+        extra arguments to override parameters in the config file. E.g. `acq_mode`.
+    
+    Returns
+    -------
+    dict or None
+        the processing plan with keys `scenes`, `tiles`, `calibration` and `estimate`
+        or None if no scenes could be found
+    """
+    config = get_config(config_file=config_file, proc_section=section_name, **kwargs)
+    cache.configure(directory=config['cache_dir'])
+    selection = _select_scenes(config=config)
+    if selection is None:
+        return None
+    scenes, aoi_tiles, neighbors, scenes_ocn = selection
+    led = ledger.get_ledger(config=config)
+    graph = {'scenes': [], 'tiles': []}
+    
+    ocn_lookup = {x.scene: y.scene for x, y in zip(scenes, scenes_ocn)}
+    ocn_nodes = _ocn_nodes(scenes=scenes, scenes_ocn=scenes_ocn)
+    fingerprint = ledger.fingerprint(config=config, kind='scene')
+    for i, scene in enumerate(scenes):
+        scene_base = os.path.splitext(os.path.basename(scene.scene))[0]
+        inputs = [scene.scene] + (neighbors[i] if neighbors[i] is not None else [])
+        legacy = led.get(kind='scene', name=scene_base) is None and \
+            os.path.isdir(os.path.join(config['sar_dir'], scene_base))
+        if 'sar' not in config['mode'] or legacy or \
+                led.is_done(kind='scene', name=scene_base, fingerprint=fingerprint, inputs=inputs):
+            status = 'done'
+        else:
+            status = 'todo'
+        graph['scenes'].append({'name': scene.scene, 'product': scene.product, 'status': status,
+                                'neighbors': neighbors[i] if neighbors[i] is not None else [],
+                                'ocn': ocn_lookup.get(scene.scene)})
+    
+    if 'nrb' in config['mode'] or 'orb' in config['mode']:
+        product_type = 'NRB' if 'nrb' in config['mode'] else 'ORB'
+        fingerprint = ledger.fingerprint(config=config, kind='tile')
+        tiles_ard = _select_tiles(scenes=scenes, config=config, aoi_tiles=aoi_tiles)
+        for t, (tilename, extent, epsg, scenes_sub_fnames) in enumerate(tiles_ard):
+            name = ledger.tile_name(tile=tilename, scenes=scenes_sub_fnames)
+            record = led.get(kind='tile', name=name)
+            # products created before the ledger was introduced are only recognized by their directory
+            legacy = record is None and len(ard.find_products(outdir=os.path.join(config['ard_dir'], tilename),
+                                                              scenes=scenes_sub_fnames,
+                                                              product_type=product_type, tile=tilename)) > 0
+            if legacy or led.is_done(kind='tile', name=name, fingerprint=fingerprint, inputs=scenes_sub_fnames):
+                status = 'done'
+            elif record is not None and record['outputs'] is not None and record['fingerprint'] == fingerprint \
+                    and record['inputs'] == sorted(scenes_sub_fnames):
+                status = 'resume'
+            else:
+                status = 'todo'
+            deps = _tile_deps(scenes=scenes_sub_fnames, ocn_nodes=ocn_nodes)
+            graph['tiles'].append({'name': f'ard:{tilename}:{t}', 'tile': tilename, 'epsg': epsg,
+                                   'scenes': scenes_sub_fnames, 'deps': deps, 'status': status})
+    
+    sar_workers = _sar_workers(config=config)
+    ard_workers = config['ard_workers']
+    threads = config['gdal_threads']
+    threads_ard = max(1, threads // ard_workers) if max(sar_workers, ard_workers) > 1 else threads
+    graph['calibration'] = planner.calibrate(log_dir=config['log_dir'], ledger=led)
+    graph['estimate'] = planner.estimate(graph=graph, calibration=graph['calibration'],
+                                         gpt_args=config['snap_gpt_args'], gdal_threads=threads_ard,
+                                         gdal_cache=gdal.GetCacheMax(), sar_workers=sar_workers,
+                                         ard_workers=ard_workers)
+    planner.summarize(graph=graph, outname=outname)
+    return graph
+
+
+def _select_scenes(config):
+    """
+    Search the scenes to be processed, their GRD neighbors and the OCN products.
+    
+    Parameters
+    ----------
+    config: dict
+        Dictionary of the parsed config parameters for the current process.
     
+    Returns
+    -------
+    tuple[list[pyroSAR.drivers.ID], list[str], list[list[str] or None], list[pyroSAR.drivers.ID]] or None
+        the scenes, the names of the AOI tiles, the neighbors of each scene and the OCN products
+        or None if no scenes or OCN products could be found
+    """
     if config['db_file'] is not None:
         scenes = finder(config['scene_dir'], [r'^S1[AB].*(SAFE|zip)$'],
                         regex=True, recursive=True, foldermode=1)
         archive = Archive(dbfile=config['db_file'])
         archive.insert(scenes)
     else:
+        stac_cache = DiskCache(directory=os.path.join(config['cache_dir'], 'stac'),
+                               ttl=config['stac_cache_ttl'] * 3600)
+        manifest_cache = DiskCache(directory=os.path.join(config['cache_dir'], 'manifest'))
         archive = search.STACArchive(url=config['stac_catalog'],
-                                     collections=config['stac_collections'])
+                                     collections=config['stac_collections'],
+                                     cache=stac_cache, manifest_cache=manifest_cache)
     
     if config['scene'] is None:
         attr_search = ['sensor', 'product', 'mindate', 'maxdate',
@@ -86,24 +404,27 @@ def main(config_file, section_name='PROCESSING', debug=False, **kwargs):
                   " datatake:     '{frameNumber}'\n"
             print(msg.format(**dict_search))
             archive.close()
-            return
+            return None
         print('found the following scene(s):')
         print('\n'.join(selection))
-        scenes = identify_many(selection, sortkey='start')
-        search.check_acquisition_completeness(scenes=scenes, archive=archive)
+        scenes = search.identify_catalog(archive=archive, scenes=selection, sortkey='start')
+        # all slices of the selected data takes, queried once and shared by the completeness check
+        # and the neighbor collection below
+        datatakes = search.query_datatakes(archive=archive, scenes=scenes)
+        mirror = search.ASFMirror(filename=os.path.join(config['cache_dir'], 'asf.db'), mode=config['asf_mirror'])
+        search.check_acquisition_completeness(scenes=scenes, archive=archive, datatakes=datatakes, mirror=mirror)
     else:
         if config['mode'] != ['sar']:
             raise RuntimeError("if argument 'scene' is set, the processing mode must be 'sar'")
         scenes = [identify(config['scene'])]
         aoi_tiles = []
+        datatakes = None
     ####################################################################################################################
     # get neighboring GRD scenes to add a buffer to the geocoded scenes
     # otherwise there will be a gap between final geocoded images.
     if config['product'] == 'GRD':
         print('###### [    SAR] collecting GRD neighbors')
-        neighbors = []
-        for scene in scenes:
-            neighbors.append(search.collect_neighbors(archive=archive, scene=scene))
+        neighbors = search.collect_neighbors_many(archive=archive, scenes=scenes, datatakes=datatakes)
     else:
         neighbors = [None for scene in scenes]
     ####################################################################################################################
@@ -123,169 +444,383 @@ def main(config_file, section_name='PROCESSING', debug=False, **kwargs):
                     print('found multiple OCN products for scene', scene.scene)
                     print('\n'.join(result))
                 archive.close()
-                return
+                return None
         scenes_ocn = identify_many(scenes_ocn)
     else:
         scenes_ocn = []
     
     archive.close()
-    ####################################################################################################################
-    # annotation layer selection
-    annotation = config.get('annotation', None)
-    measurement = config['measurement']
-    export_extra = None
-    lookup = {'dm': 'layoverShadowMask',
-              'ei': 'incidenceAngleFromEllipsoid',
-              'lc': 'scatteringArea',
-              'ld': 'lookDirection',
-              'li': 'localIncidenceAngle',
-              'np': 'NESZ',
-              'gs': 'gammaSigmaRatio',
-              'sg': 'sigmaGammaRatio'}
+    return scenes, aoi_tiles, neighbors, scenes_ocn
+
+
+def _select_tiles(scenes, config, aoi_tiles, overlaps=None):
+    """
+    Assign the scenes to the MGRS tiles they overlap with.
     
-    if annotation is not None:
-        annotation = ['gs' if x == 'ratio' and measurement == 'gamma' else 'sg' if x == 'ratio'
-        else x for x in annotation]
-        export_extra = []
-        for layer in annotation:
-            if layer in lookup:
-                export_extra.append(lookup[layer])
-    ####################################################################################################################
-    # main SAR processing
-    if sar_flag:
-        for i, scene in enumerate(scenes):
-            scene_base = os.path.splitext(os.path.basename(scene.scene))[0]
-            out_dir_scene = os.path.join(config['sar_dir'], scene_base)
-            tmp_dir_scene = os.path.join(config['tmp_dir'], scene_base)
-            
-            print(f'###### [    SAR] Scene {i + 1}/{len(scenes)}: {scene.scene}')
-            if os.path.isdir(out_dir_scene) and not update:
-                msg = 'Already processed - Skip!'
-                print('### ' + msg)
-                anc.log(handler=logger, mode='info', proc_step='GEOCODE', scenes=scene.scene, msg=msg)
+    Parameters
+    ----------
+    scenes: list[pyroSAR.drivers.ID]
+        the SAR scenes
+    config: dict
+        Dictionary of the parsed config parameters for the current process.
+    aoi_tiles: list[str]
+        the names of the AOI tiles; all tiles overlapping with the scenes are selected if empty
+    overlaps: tuple or None
+        the overlap of the scenes with the MGRS tiles as returned by :func:`_tile_overlaps`.
+        Is computed if None.
+    
+    Returns
+    -------
+    list[tuple]
+        the tiles as tuples `(tilename, extent, epsg, scene file names)`
+    """
+    if overlaps is None:
+        overlaps = _tile_overlaps(scenes=scenes, config=config)
+    matrix, tilenames = overlaps
+    index = tile_ex.grid_index(config['kml_file'])
+    rows = {x.scene: i for i, x in enumerate(scenes)}
+    selection_grouped = anc.group_by_time(scenes=scenes)
+    tiles_ard = []
+    for group in selection_grouped:
+        # check that the scenes can really be grouped together
+        anc.check_scene_consistency(scenes=group)
+        # select the tiles that overlap with the current scene group and
+        # for each tile all scenes from the group whose footprint overlaps with it
+        sub = matrix[[rows[x.scene] for x in group], :]
+        columns = sub.tocsc()
+        for j in sorted(set(sub.indices)):
+            tilename = tilenames[j]
+            if aoi_tiles and tilename not in aoi_tiles:
                 continue
-            else:
-                os.makedirs(out_dir_scene, exist_ok=True)
-                os.makedirs(tmp_dir_scene, exist_ok=True)
-            ############################################################################################################
-            # Preparation of DEM for SAR processing
-            dem_type_lookup = {'Copernicus 10m EEA DEM': 'EEA10',
-                               'Copernicus 30m Global DEM II': 'GLO30II',
-                               'Copernicus 30m Global DEM': 'GLO30',
-                               'GETASSE30': 'GETASSE30'}
-            dem_type_short = dem_type_lookup[config['dem_type']]
-            fname_base_dem = scene_base + f'_DEM_{dem_type_short}.tif'
-            fname_dem = os.path.join(tmp_dir_scene, fname_base_dem)
-            os.makedirs(tmp_dir_scene, exist_ok=True)
-            print('###### [    DEM] creating scene-specific mosaic:', fname_dem)
-            with scene.bbox() as geom:
-                dem.mosaic(geometry=geom, outname=fname_dem, dem_type=config['dem_type'],
-                           username=username, password=password)
-            ############################################################################################################
-            # ETAD correction
-            if config['etad']:
-                msg = '###### [   ETAD] Scene {s}/{s_total}: {scene}'
-                print(msg.format(s=i + 1, s_total=len(scenes), scene=scene.scene))
-                scene = etad.process(scene=scene, etad_dir=config['etad_dir'],
-                                     out_dir=tmp_dir_scene, log=logger)
-            ############################################################################################################
-            # determination of look factors
-            if scene.product == 'SLC':
-                rlks = {'IW': 5,
-                        'SM': 6,
-                        'EW': 3}[config['acq_mode']]
-                rlks *= int(geocode_prms['spacing'] / 10)
-                azlks = {'IW': 1,
-                         'SM': 6,
-                         'EW': 1}[config['acq_mode']]
-                azlks *= int(geocode_prms['spacing'] / 10)
-            else:
-                rlks = azlks = None
-            ############################################################################################################
-            # main processing routine
-            start_time = time.time()
-            try:
-                snap.process(scene=scene.scene, outdir=config['sar_dir'],
-                             measurement=measurement,
-                             tmpdir=config['tmp_dir'], kml=config['kml_file'],
-                             dem=fname_dem, neighbors=neighbors[i],
-                             export_extra=export_extra,
-                             gpt_args=config['snap_gpt_args'],
-                             rlks=rlks, azlks=azlks, **geocode_prms)
-                t = round((time.time() - start_time), 2)
-                anc.log(handler=logger, mode='info', proc_step='SAR', scenes=scene.scene, msg=t)
-            except Exception as e:
-                anc.log(handler=logger, mode='exception', proc_step='SAR', scenes=scene.scene, msg=e)
-                raise
+            scenes_sub = [group[i] for i in sorted(columns[:, j].indices)]
+            attrib = index.attributes(tilename)
+            xmin, xmax, ymin, ymax = ogr.CreateGeometryFromWkt(attrib['UTM_WKT']).GetEnvelope()
+            extent = {'xmin': xmin, 'xmax': xmax, 'ymin': ymin, 'ymax': ymax}
+            tiles_ard.append((tilename, extent, attrib['EPSG'], [x.scene for x in scenes_sub]))
+    return tiles_ard
+
+
+def _tile_overlaps(scenes, config):
+    """
+    Compute the overlap of all scenes with the MGRS tiles using :func:`S1_NRB.tile_extraction.tile_overlaps`.
+    
+    Parameters
+    ----------
+    scenes: list[pyroSAR.drivers.ID]
+        the SAR scenes
+    config: dict
+        Dictionary of the parsed config parameters for the current process.
+    
+    Returns
+    -------
+    tuple[scipy.sparse.csr_matrix, list[str]]
+        the scene x tile overlap matrix and the tile names
+    """
+    vec = [x.geometry() for x in scenes]
+    overlaps = tile_ex.tile_overlaps(vectors=vec, kml=config['kml_file'])
+    for x in vec:
+        x.close()
+    return overlaps
+
+
+def _ocn_nodes(scenes, scenes_ocn):
+    """
+    Get the names of the OCN nodes of the processing graph.
+    
+    Parameters
+    ----------
+    scenes: list[pyroSAR.drivers.ID]
+        the SAR scenes
+    scenes_ocn: list[pyroSAR.drivers.ID]
+        the OCN products of the SAR scenes; empty if no wind model annotation layer is created
+    
+    Returns
+    -------
+    set[str]
+        the node names `ocn:<SAR scene>`
+    """
+    return {f'ocn:{scene.scene}' for scene, scene_ocn in zip(scenes, scenes_ocn)}
+
+
+def _tile_deps(scenes, ocn_nodes):
+    """
+    Get the names of the nodes an ARD tile depends on: the SAR nodes of its source scenes
+    and their OCN nodes if these are part of the processing graph.
+    
+    Parameters
+    ----------
+    scenes: list[str]
+        the source scenes of the tile
+    ocn_nodes: set[str]
+        the names of the OCN nodes as returned by :func:`_ocn_nodes`
+    
+    Returns
+    -------
+    list[str]
+    """
+    deps = [f'sar:{scene}' for scene in scenes]
+    deps.extend([f'ocn:{scene}' for scene in scenes if f'ocn:{scene}' in ocn_nodes])
+    return deps
+
+
+def _sar_workers(config):
+    """
+    Determine the number of concurrent SAR workers with :func:`S1_NRB.snap.gpt_workers`.
+    If ARD products are generated, the ARD workers run at the same time as the SAR workers,
+    so their GDAL threads and block caches are subtracted from the resources available to SNAP.
+    
+    Parameters
+    ----------
+    config: dict
+        Dictionary of the parsed config parameters for the current process.
+    
+    Returns
+    -------
+    int
+        the number of SAR workers
+    """
+    reserved_threads = reserved_memory = 0
+    if 'nrb' in config['mode'] or 'orb' in config['mode']:
+        # the GDAL threads are split among the ARD workers, each using at least one thread
+        reserved_threads = max(config['gdal_threads'], config['ard_workers'])
+        reserved_memory = config['ard_workers'] * gdal.GetCacheMax()
+    return snap.gpt_workers(gpt_args=config['snap_gpt_args'], max_workers=config['sar_workers'],
+                            reserved_threads=reserved_threads, reserved_memory=reserved_memory)
+
+
+def _sar_scene(scene, neighbors, config, geocode_prms, export_extra, username, password, logger, led,
+               tiles=None):
+    """
+    SAR processing of a single scene: scene-specific DEM mosaic, optional ETAD correction and
+    processing with :func:`S1_NRB.snap.process`.
+    
+    Parameters
+    ----------
+    scene: pyroSAR.drivers.ID
+        the SAR scene
+    neighbors: list[str] or None
+        the neighboring GRD scenes used for buffering
+    config: dict
+        Dictionary of the parsed config parameters for the current process.
+    geocode_prms: dict
+        the parameters returned by :func:`S1_NRB.config.snap_conf`
+    export_extra: list[str] or None
+        the annotation layers to be exported by :func:`S1_NRB.snap.process`
+    username: str or None
+        the DEM download username
+    password: str or None
+        the DEM download password
+    logger: logging.Logger
+        The log handler for the current process.
+    led: S1_NRB.ledger.Ledger
+        the processing ledger in which the status of the scene is recorded
+    tiles: list[str] or None
+        the IDs of the MGRS tiles overlapping with the scene; see :func:`S1_NRB.snap.process`
+    
+    Returns
+    -------
+    float
+        the processing time of :func:`S1_NRB.snap.process` in seconds
+    """
+    scene_base = os.path.splitext(os.path.basename(scene.scene))[0]
+    with led.unit(kind='scene', name=scene_base), metrics.measure('sar', unit=scene_base):
+        return _sar_scene_run(scene=scene, neighbors=neighbors, config=config, geocode_prms=geocode_prms,
+                              export_extra=export_extra, username=username, password=password, logger=logger,
+                              tiles=tiles)
+
+
+def _sar_scene_run(scene, neighbors, config, geocode_prms, export_extra, username, password, logger,
+                   tiles=None):
+    """
+    Helper function of :func:`_sar_scene` performing the actual processing.
+    """
+    scene_base = os.path.splitext(os.path.basename(scene.scene))[0]
+    tmp_dir_scene = os.path.join(config['tmp_dir'], scene_base)
     ####################################################################################################################
-    # OCN preparation
-    for scene in scenes_ocn:
-        if scene.compression is not None:
-            scene.unpack(directory=config['tmp_dir'], exist_ok=True)
-        basename = os.path.basename(scene.scene).replace('.SAFE', '')
-        outdir = os.path.join(config['sar_dir'], basename)
-        os.makedirs(outdir, exist_ok=True)
-        for v in ['owiNrcsCmod', 'owiEcmwfWindSpeed', 'owiEcmwfWindDirection']:
-            out = os.path.join(outdir, f'{v}.tif')
-            if not os.path.isfile(out):
-                ocn.extract(src=scene.scene, dst=out, variable=v)
+    # Preparation of DEM for SAR processing
+    dem_type_lookup = {'Copernicus 10m EEA DEM': 'EEA10',
+                       'Copernicus 30m Global DEM II': 'GLO30II',
+                       'Copernicus 30m Global DEM': 'GLO30',
+                       'GETASSE30': 'GETASSE30'}
+    dem_type_short = dem_type_lookup[config['dem_type']]
+    fname_base_dem = scene_base + f'_DEM_{dem_type_short}.tif'
+    fname_dem = os.path.join(tmp_dir_scene, fname_base_dem)
+    os.makedirs(tmp_dir_scene, exist_ok=True)
+    print('###### [    DEM] creating scene-specific mosaic:', fname_dem)
+    with scene.bbox() as geom, metrics.measure('dem.mosaic'):
+        dem.mosaic(geometry=geom, outname=fname_dem, dem_type=config['dem_type'],
+                   username=username, password=password)
     ####################################################################################################################
-    # ARD - final product generation
-    if nrb_flag or orb_flag:
-        product_type = 'NRB' if nrb_flag else 'ORB'
-        
-        # prepare WBM MGRS tiles
-        vec = [x.geometry() for x in scenes]
-        extent = anc.get_max_ext(geometries=vec)
-        del vec
-        with bbox(coordinates=extent, crs=4326) as box:
-            dem.prepare(vector=box, threads=gdal_prms['threads'],
-                        dem_dir=None, wbm_dir=config['wbm_dir'],
-                        dem_type=config['dem_type'], kml_file=config['kml_file'],
-                        tilenames=aoi_tiles, username=username, password=password,
-                        dem_strict=True)
-        print('preparing {} products'.format(product_type))
-        selection_grouped = anc.group_by_time(scenes=scenes)
-        for s, group in enumerate(selection_grouped):
-            # check that the scenes can really be grouped together
-            anc.check_scene_consistency(scenes=group)
-            # get the geometries of all tiles that overlap with the current scene group
-            vec = [x.geometry() for x in group]
-            tiles = tile_ex.tile_from_aoi(vector=vec,
-                                          kml=config['kml_file'],
-                                          return_geometries=True,
-                                          tilenames=aoi_tiles)
-            del vec
-            t_total = len(tiles)
-            s_total = len(selection_grouped)
-            for t, tile in enumerate(tiles):
-                # select all scenes from the group whose footprint overlaps with the current tile
-                scenes_sub = [x for x in group if intersect(tile, x.geometry())]
-                scenes_sub_fnames = [x.scene for x in scenes_sub]
-                outdir = os.path.join(config['ard_dir'], tile.mgrs)
-                os.makedirs(outdir, exist_ok=True)
-                fname_wbm = os.path.join(config['wbm_dir'], config['dem_type'],
-                                         '{}_WBM.tif'.format(tile.mgrs))
-                if not os.path.isfile(fname_wbm):
-                    fname_wbm = None
-                add_dem = True  # add the DEM as output layer?
-                dem_type = config['dem_type'] if add_dem else None
-                extent = tile.extent
-                epsg = tile.getProjection('epsg')
-                msg = '###### [    {product_type}] Tile {t}/{t_total}: {tile} | Scenes: {scenes} '
-                print(msg.format(tile=tile.mgrs, t=t + 1, t_total=t_total,
-                                 scenes=[os.path.basename(s) for s in scenes_sub_fnames],
-                                 product_type=product_type, s=s + 1, s_total=s_total))
-                try:
-                    msg = ard.format(config=config, product_type=product_type, scenes=scenes_sub_fnames,
-                                     datadir=config['sar_dir'], outdir=outdir, tile=tile.mgrs, extent=extent, epsg=epsg,
-                                     wbm=fname_wbm, dem_type=dem_type, kml=config['kml_file'],
-                                     multithread=gdal_prms['multithread'], annotation=annotation, update=update)
-                    if msg == 'Already processed - Skip!':
-                        print('### ' + msg)
-                    anc.log(handler=logger, mode='info', proc_step=product_type, scenes=scenes_sub_fnames, msg=msg)
-                except Exception as e:
-                    anc.log(handler=logger, mode='exception', proc_step=product_type, scenes=scenes_sub_fnames, msg=e)
-                    raise
-            del tiles
-        gdal.SetConfigOption('GDAL_NUM_THREADS', gdal_prms['threads_before'])
+    # ETAD correction
+    if config['etad']:
+        print(f'###### [   ETAD] Scene: {scene.scene}')
+        with metrics.measure('etad'):
+            scene = etad.process(scene=scene, etad_dir=config['etad_dir'],
+                                 out_dir=tmp_dir_scene, log=logger)
+    ####################################################################################################################
+    # determination of look factors
+    if scene.product == 'SLC':
+        rlks = {'IW': 5,
+                'SM': 6,
+                'EW': 3}[config['acq_mode']]
+        rlks *= int(geocode_prms['spacing'] / 10)
+        azlks = {'IW': 1,
+                 'SM': 6,
+                 'EW': 1}[config['acq_mode']]
+        azlks *= int(geocode_prms['spacing'] / 10)
+    else:
+        rlks = azlks = None
+    ####################################################################################################################
+    # main processing routine
+    start_time = time.time()
+    with metrics.measure('snap.process'), profiling.profile('snap.process', unit=scene_base):
+        snap.process(scene=scene.scene, outdir=config['sar_dir'],
+                     measurement=config['measurement'],
+                     tmpdir=config['tmp_dir'], kml=config['kml_file'],
+                     dem=fname_dem, neighbors=neighbors,
+                     export_extra=export_extra,
+                     gpt_args=config['snap_gpt_args'],
+                     rlks=rlks, azlks=azlks, tiles=tiles, **geocode_prms)
+    return round((time.time() - start_time), 2)
+
+
+def _tile_outputs(led, name, fingerprint, inputs, existing, update=False):
+    """
+    Decide whether an ARD tile needs to be processed and which product directory is to be used.
+    
+    - a tile recorded as finished with the same fingerprint and inputs is skipped
+    - a product created before the ledger was introduced is only recognized by its directory and skipped
+    - the directory of an unfinished product with the same fingerprint and inputs is kept so that it can be resumed
+    - the directory of an outdated product (different fingerprint or inputs) is removed
+    
+    If `update` is True, nothing is skipped and the directory of an existing product is reused.
+    
+    Parameters
+    ----------
+    led: S1_NRB.ledger.Ledger
+        the processing ledger
+    name: str
+        the ledger name of the tile. See :func:`S1_NRB.ledger.tile_name`.
+    fingerprint: str
+        the configuration fingerprint. See :func:`S1_NRB.ledger.fingerprint`.
+    inputs: list[str]
+        the source scenes of the tile
+    existing: list[str]
+        the product directories of the tile as returned by :func:`S1_NRB.ard.find_products`
+    update: bool
+        update existing products?
+    
+    Returns
+    -------
+    tuple[bool, list[str] or None]
+        skip the tile? and the product directory to use or None if a new product is to be created
+    """
+    record = led.get(kind='tile', name=name)
+    if record is None:
+        if len(existing) == 0:
+            return False, None
+        return not update, existing[:1]
+    outputs = record['outputs']
+    current = record['fingerprint'] == fingerprint and record['inputs'] == sorted(inputs)
+    if current or update:
+        skip = current and record['status'] == 'done' and not update
+        return skip, outputs
+    # remove the outdated product so that it is not left behind untracked
+    for directory in outputs or []:
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+    return False, None
+
+
+def _ard_tile(led, **kwargs):
+    """
+    Run :func:`S1_NRB.ard.format` for a single tile and record its status in the processing ledger.
+    
+    Parameters
+    ----------
+    led: S1_NRB.ledger.Ledger
+        the processing ledger
+    kwargs
+        keyword arguments passed to :func:`S1_NRB.ard.format`
+    
+    Returns
+    -------
+    str or None
+        the return value of :func:`S1_NRB.ard.format`
+    """
+    name = ledger.tile_name(tile=kwargs['tile'], scenes=kwargs['scenes'])
+    with led.unit(kind='tile', name=name), metrics.measure('ard', unit=name), \
+            profiling.profile('ard.format', unit=name):
+        return ard.format(ledger=led, **kwargs)
+
+
+def _ocn_extract(scene, config):
+    """
+    Extract the wind model variables of an OCN product to GeoTIFF files in the SAR directory.
+    
+    Parameters
+    ----------
+    scene: pyroSAR.drivers.ID
+        the OCN product
+    config: dict
+        Dictionary of the parsed config parameters for the current process.
+    
+    Returns
+    -------
+    
+    """
+    if scene.compression is not None:
+        scene.unpack(directory=config['tmp_dir'], exist_ok=True)
+    basename = os.path.basename(scene.scene).replace('.SAFE', '')
+    outdir = os.path.join(config['sar_dir'], basename)
+    os.makedirs(outdir, exist_ok=True)
+    for v in ['owiNrcsCmod', 'owiEcmwfWindSpeed', 'owiEcmwfWindDirection']:
+        out = os.path.join(outdir, f'{v}.tif')
+        if not os.path.isfile(out):
+            with metrics.measure('ocn.extract', unit=basename, variable=v):
+                ocn.extract(src=scene.scene, dst=out, variable=v)
+
+
+def _setup(config):
+    """
+    Set up the context of a processing run, i.e. the metrics, profiling, scene metadata cache and DEM tile store.
+    The settings are stored in :mod:`S1_NRB.context` and passed to the worker processes by :func:`_worker_init`.
+    
+    Parameters
+    ----------
+    config: dict
+        the processing configuration
+    
+    Returns
+    -------
+    
+    """
+    metrics.configure(directory=config['log_dir'])
+    profiling.configure(directory=config['log_dir'], stages=config['profile'])
+    cache.configure(directory=config['cache_dir'])
+    # the DEM tile store is only used if enabled explicitly
+    store = None if config['dem_cache_mode'] == 'off' else os.path.join(config['cache_dir'], 'dem')
+    dem.configure(directory=store, max_size=config['dem_cache_size'],
+                  offline=config['dem_cache_mode'] == 'offline')
+
+
+def _worker_init(settings, threads=None):
+    """
+    Initializer for the worker processes.
+    Activates the context of the processing run and optionally sets the GDAL thread budget of an individual worker.
+    
+    Parameters
+    ----------
+    settings: dict
+        the run context as returned by :func:`S1_NRB.context.settings`
+    threads: int or None
+        the number of GDAL threads per worker. None: keep the current setting.
+    
+    Returns
+    -------
+    
+    """
+    context.activate(settings)
+    gdal.UseExceptions()
+    if threads is not None:
+        gdal.SetConfigOption('GDAL_NUM_THREADS', str(threads))
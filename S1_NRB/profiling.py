@@ -0,0 +1,141 @@
+import os
+import sys
+import cProfile
+import threading
+from datetime import datetime
+from collections import Counter
+from contextlib import contextmanager
+from S1_NRB import context
+
+STAGES = ['snap.process', 'ard.format', 'extract.meta_dict', 'stac.parse', 'xml.parse']
+
+_local = threading.local()
+
+
+def configure(directory, stages):
+    """
+    Enable the profiling of processing stages for the current processing run.
+    The profiles are written to a directory `<YYYYmmddTHHMM>_profiles` in `directory`.
+    The directory and the stages are stored in the run context; see :mod:`S1_NRB.context`.
+
+    Parameters
+    ----------
+    directory: str
+        the directory to write the profiles to, e.g. the log directory
+    stages: list[str] or None
+        the stages to be profiled; see :data:`STAGES`. If None, profiling is disabled.
+
+    Returns
+    -------
+    str or None
+        the name of the profile directory or None if profiling is disabled
+    """
+    if stages is None or len(stages) == 0:
+        context.update(profile=None)
+        return None
+    unknown = [x for x in stages if x not in STAGES]
+    if len(unknown) > 0:
+        raise ValueError(f'unknown profiling stages: {unknown}; options: {STAGES}')
+    now = datetime.now().strftime('%Y%m%dT%H%M')
+    outdir = os.path.join(directory, f'{now}_profiles')
+    os.makedirs(outdir, exist_ok=True)
+    context.update(profile={'directory': outdir, 'stages': list(stages)})
+    return outdir
+
+
+@contextmanager
+def profile(stage, unit=None, interval=0.01):
+    """
+    Profile a processing stage if it has been enabled via :func:`configure`.
+    Two files are written to the directory `<unit>` in the profile directory:
+
+    - `<stage>.prof`: a deterministic profile created with :mod:`cProfile`, which can be read with :mod:`pstats`
+      or visualized with tools like `snakeviz`. As only one deterministic profiler can be active at a time,
+      this file is not written for a stage that is nested in another profiled stage, e.g. `extract.meta_dict`
+      within `ard.format`; the nested stage is contained in the profile of the enclosing stage.
+    - `<stage>.collapsed`: the call stacks of the current thread sampled every `interval` seconds in the
+      collapsed format (one line `frame;frame;frame count` per stack), which can be converted to a flame graph
+      with e.g. `flamegraph.pl` or `speedscope`.
+
+    Parameters
+    ----------
+    stage: str
+        the name of the processing stage; see :data:`STAGES`
+    unit: str or None
+        the name of the processing unit, e.g. a scene or tile. If None, the unit of the enclosing stage is used.
+    interval: float
+        the sampling interval in seconds
+
+    Examples
+    --------
+    >>> from S1_NRB import profiling
+    >>> with profiling.profile('ard.format', unit='32TNS_S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160'):
+    >>>     with profiling.profile('extract.meta_dict'):
+    >>>         ...
+    """
+    units = getattr(_local, 'units', [])
+    if unit is None and len(units) > 0:
+        unit = units[-1]
+    settings = context.get('profile')
+    if settings is None or stage not in settings['stages']:
+        _local.units = units + [unit]
+        try:
+            yield
+        finally:
+            _local.units = units
+        return
+
+    outdir = os.path.join(settings['directory'], unit if unit is not None else 'main')
+    os.makedirs(outdir, exist_ok=True)
+    profiler = None
+    if not getattr(_local, 'active', False):
+        profiler = cProfile.Profile()
+    sampler = _Sampler(thread_id=threading.get_ident(), interval=interval)
+    _local.units = units + [unit]
+    sampler.start()
+    if profiler is not None:
+        _local.active = True
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _local.active = False
+            profiler.dump_stats(os.path.join(outdir, f'{stage}.prof'))
+        sampler.stop()
+        _local.units = units
+        sampler.write(os.path.join(outdir, f'{stage}.collapsed'))
+
+
+class _Sampler(threading.Thread):
+    """
+    Helper class to periodically record the call stack of a thread.
+    """
+
+    def __init__(self, thread_id, interval):
+        super(_Sampler, self).__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if len(stack) > 0:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, filename):
+        with open(filename, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
@@ -1,15 +1,25 @@
 import os
 import re
+import json
+import time
+import sqlite3
+from collections import OrderedDict
+from contextlib import contextmanager
 from lxml import etree
 from pathlib import Path
 import dateutil.parser
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from pystac_client import Client
 from pystac_client.stac_api_io import StacApiIO
+from pystac_client.conformance import ConformanceClasses
+from osgeo import ogr
 from spatialist import Vector, crsConvert
+from spatialist.vector import wkt2vector, intersect
 import asf_search as asf
-from pyroSAR import identify_many, ID
-from S1_NRB.ancillary import buffer_time
+from pyroSAR import ID, Archive
+from S1_NRB.ancillary import buffer_time, SceneName
+from S1_NRB.cache import identify, identify_many
 from S1_NRB.tile_extraction import aoi_from_tile, tile_from_aoi
 
 
@@ -67,6 +77,185 @@ class ASF(ID):
         return meta
 
 
+class CatalogScene(ID):
+    """
+    Base class for SAR metadata handlers created from catalog metadata instead of reading the scene itself.
+    The interface is consistent with the driver classes in :mod:`pyroSAR.drivers`.
+    Attributes not contained in the catalog metadata, as well as methods requiring access to the scene files
+    (e.g. reading annotation XML), are passed on to a full handler created with :func:`pyroSAR.drivers.identify`
+    on first access.
+    
+    Parameters
+    ----------
+    scene: str
+        the scene location
+    meta: dict
+        the metadata of the scene using the attribute names of :mod:`pyroSAR.drivers`.
+        Entries missing or None are read from the scene when needed.
+    """
+    
+    def __init__(self, scene, meta):
+        self.scene = scene
+        self._handler = None
+        self.meta = _LazyMeta({k: v for k, v in meta.items() if v is not None}, loader=self._load)
+        self.locals = ['acquisition_mode', 'coordinates', 'cycleNumber', 'frameNumber',
+                       'lines', 'orbit', 'orbitNumber_abs', 'orbitNumber_rel',
+                       'polarizations', 'product', 'projection', 'samples',
+                       'sensor', 'spacing', 'start', 'stop']
+        for item in self.locals:
+            if item in self.meta.keys():
+                setattr(self, item, self.meta[item])
+    
+    def __getattr__(self, item):
+        if item.startswith('_') or item in ['scene', 'meta', 'locals']:
+            raise AttributeError("object has no attribute '{}'".format(item))
+        return getattr(self._load(), item)
+    
+    def geometry(self, outname=None, driver=None, overwrite=True):
+        if 'coordinates' not in self.meta.keys():
+            self.meta['coordinates'] = self._load().meta['coordinates']
+        return super(CatalogScene, self).geometry(outname=outname, driver=driver, overwrite=overwrite)
+    
+    def _load(self):
+        if self._handler is None:
+            self._handler = identify(self.scene)
+        return self._handler
+    
+    def unpack(self, directory, overwrite=False, exist_ok=False):
+        handler = self._load()
+        handler.unpack(directory=directory, overwrite=overwrite, exist_ok=exist_ok)
+        self.scene = handler.scene
+
+
+class STACScene(CatalogScene):
+    """
+    SAR metadata handler for Sentinel-1 scenes created from STAC item metadata (see :class:`CatalogScene`).
+    Registered attributes if contained in the item properties:
+    
+    - acquisition_mode (`sar:instrument_mode`)
+    - coordinates (item geometry)
+    - frameNumber (`s1:datatake` or `s1:datatake_id`)
+    - orbit (`sat:orbit_state`)
+    - orbitNumber_abs (`sat:absolute_orbit`)
+    - orbitNumber_rel (`sat:relative_orbit`)
+    - polarizations (`sar:polarizations`)
+    - product (`sar:product_type`)
+    - projection
+    - sensor (`platform`)
+    - sliceNumber (`s1:slice_number`)
+    - start (`start_datetime`)
+    - stop (`end_datetime`)
+    - totalSlices (`s1:total_slices`)
+    
+    Parameters
+    ----------
+    scene: str
+        the scene location
+    geometry: dict or None
+        the GeoJSON geometry of the item
+    properties: dict
+        the item properties
+    """
+    properties = ['platform', 'start_datetime', 'end_datetime', 'sar:instrument_mode', 'sar:product_type',
+                  'sar:polarizations', 'sat:orbit_state', 'sat:absolute_orbit', 'sat:relative_orbit',
+                  's1:datatake', 's1:datatake_id', 's1:slice_number', 's1:total_slices']
+    
+    def __init__(self, scene, geometry, properties):
+        self._properties = properties
+        self._geometry = geometry
+        super(STACScene, self).__init__(scene=scene, meta=self.scanMetadata())
+    
+    def scanMetadata(self):
+        props = self._properties
+        meta = dict()
+        meta['acquisition_mode'] = props.get('sar:instrument_mode')
+        if self._geometry is not None:
+            geom = ogr.CreateGeometryFromJson(json.dumps(self._geometry))
+            if geom.GetGeometryType() == ogr.wkbMultiPolygon:
+                geom = geom.GetGeometryRef(0)
+            meta['coordinates'] = [tuple(x[:2]) for x in geom.GetGeometryRef(0).GetPoints()]
+            meta['projection'] = crsConvert(4326, 'wkt')
+        if 's1:datatake' in props.keys():
+            meta['frameNumber'] = int(props['s1:datatake'], 16)
+        elif 's1:datatake_id' in props.keys():
+            meta['frameNumber'] = int(props['s1:datatake_id'])
+        if 'sat:orbit_state' in props.keys():
+            meta['orbit'] = props['sat:orbit_state'][0].upper()
+        meta['orbitNumber_abs'] = props.get('sat:absolute_orbit')
+        meta['orbitNumber_rel'] = props.get('sat:relative_orbit')
+        meta['polarizations'] = props.get('sar:polarizations')
+        meta['product'] = props.get('sar:product_type')
+        if 'platform' in props.keys():
+            meta['sensor'] = props['platform'].upper().replace('SENTINEL-', 'S')
+        p2 = '%Y%m%dT%H%M%S'
+        if 'start_datetime' in props.keys():
+            meta['start'] = _utc(props['start_datetime']).strftime(p2)
+        if 'end_datetime' in props.keys():
+            meta['stop'] = _utc(props['end_datetime']).strftime(p2)
+        meta['sliceNumber'] = props.get('s1:slice_number')
+        meta['totalSlices'] = props.get('s1:total_slices')
+        return meta
+
+
+class ArchiveScene(CatalogScene):
+    """
+    SAR metadata handler created from a row of the data table of a :class:`pyroSAR.drivers.Archive`
+    (see :class:`CatalogScene`). Registered attributes:
+    
+    - acquisition_mode
+    - coordinates
+    - cycleNumber
+    - frameNumber
+    - lines
+    - orbit
+    - orbitNumber_abs
+    - orbitNumber_rel
+    - polarizations
+    - product
+    - projection
+    - samples
+    - sensor
+    - start
+    - stop
+    
+    Parameters
+    ----------
+    row: dict
+        the table row with the column values and the footprint geometry as WKT string (key `wkt`)
+    """
+    
+    def __init__(self, row):
+        self._row = row
+        super(ArchiveScene, self).__init__(scene=row['scene'], meta=self.scanMetadata())
+    
+    def scanMetadata(self):
+        row = self._row
+        meta = {k: row[k] for k in ['acquisition_mode', 'cycleNumber', 'frameNumber', 'lines', 'orbit',
+                                    'orbitNumber_abs', 'orbitNumber_rel', 'product', 'samples',
+                                    'sensor', 'start', 'stop']}
+        meta['polarizations'] = [x for x in ['HH', 'VV', 'HV', 'VH'] if row[x.lower()] == 1]
+        geom = ogr.CreateGeometryFromWkt(row['wkt'])
+        meta['coordinates'] = [tuple(x[:2]) for x in geom.GetGeometryRef(0).GetPoints()]
+        meta['projection'] = crsConvert(4326, 'wkt')
+        return meta
+
+
+class _LazyMeta(dict):
+    """
+    Helper class for the metadata dictionary of :class:`CatalogScene`,
+    which reads missing entries from the full metadata handler.
+    """
+    
+    def __init__(self, meta, loader):
+        super(_LazyMeta, self).__init__(meta)
+        self._loader = loader
+    
+    def __missing__(self, key):
+        value = self._loader().meta[key]
+        self[key] = value
+        return value
+
+
 class STACArchive(object):
     """
     Search for scenes in a SpatioTemporal Asset Catalog.
@@ -84,6 +273,19 @@ class STACArchive(object):
         the allowed timeout in seconds
     max_retries: int or None
         the number of times to retry requests. Set to None to disable retries.
+    cache: S1_NRB.cache.DiskCache or None
+        an optional cache for the query results. The results are stored by the URL, the collections
+        and the normalized query parameters, so that repeated queries do not need to be sent to the catalog.
+    proc_time_key: str
+        the item property containing the processing time of a scene. It is used to keep only the latest
+        of multiple products of the same acquisition. The processing time is read from the scene's manifest
+        if the property is not present.
+    manifest_cache: S1_NRB.cache.DiskCache or None
+        an optional cache for the processing times read from the scene manifests.
+        The entries are stored by scene path and modification time.
+    max_meta: int
+        the maximum number of selected scenes whose item metadata is kept for :meth:`identify_many`.
+        If exceeded, the metadata of the least recently used scenes is discarded.
     
     See Also
     --------
@@ -91,10 +293,16 @@ class STACArchive(object):
     pystac_client.stac_api_io.StacApiIO
     """
     
-    def __init__(self, url, collections, timeout=60, max_retries=20):
+    def __init__(self, url, collections, timeout=60, max_retries=20, cache=None,
+                 proc_time_key='processing:datetime', manifest_cache=None, max_meta=10000):
         self.url = url
         self.timeout = timeout
         self.max_tries = max_retries
+        self.cache = cache
+        self.proc_time_key = proc_time_key
+        self.manifest_cache = manifest_cache
+        self.max_meta = max_meta
+        self.scenes_meta = OrderedDict()
         self._open_catalog()
         if isinstance(collections, str):
             self.collections = [collections]
@@ -119,10 +327,26 @@ class STACArchive(object):
         del tree, proc
         return datetime.strptime(start, '%Y-%m-%dT%H:%M:%S.%f')
     
-    def _filter_duplicates(self, scenes):
+    def _filter_duplicates(self, scenes, proc_times=None):
+        """
+        Keep only the latest processed scene of multiple scenes of the same acquisition.
+        
+        Parameters
+        ----------
+        scenes: list[str]
+            the scene locations
+        proc_times: dict or None
+            the processing times of the scenes as read from the catalog, e.g. {'/path/to/scene.SAFE': datetime}.
+            The processing times of the remaining duplicates are read from the scene manifests in parallel.
+        
+        Returns
+        -------
+        list[str]
+            the sorted scene locations without duplicates
+        """
         tmp = sorted(scenes)
         pattern = '([0-9A-Z_]{16})_([0-9T]{15})_([0-9T]{15})'
-        keep = []
+        groups = []
         i = 0
         while i < len(tmp):
             group = [tmp[i]]
@@ -135,14 +359,51 @@ class STACArchive(object):
                     j += 1
                 else:
                     break
+            groups.append(group)
+            i = j
+        proc_times = dict(proc_times) if proc_times is not None else {}
+        missing = [x for group in groups if len(group) > 1
+                   for x in group if proc_times.get(x) is None]
+        if len(missing) > 0:
+            with ThreadPoolExecutor(max_workers=min(len(missing), 8)) as executor:
+                proc_times.update(zip(missing, executor.map(self._get_proc_time_cached, missing)))
+        keep = []
+        for group in groups:
             if len(group) > 1:
-                tproc = [self._get_proc_time(x) for x in group]
+                tproc = [proc_times[x] for x in group]
                 keep.append(group[tproc.index(max(tproc))])
             else:
                 keep.append(group[0])
-            i = j
         return keep
     
+    def _get_proc_time_cached(self, scene):
+        """
+        Read the processing time of a scene from its manifest using :attr:`manifest_cache`.
+        """
+        if self.manifest_cache is None:
+            return self._get_proc_time(scene)
+        path = os.path.realpath(scene)
+        key = self.manifest_cache.key(path=path, mtime=os.stat(os.path.join(path, 'manifest.safe')).st_mtime)
+        value = self.manifest_cache.get(key)
+        if value is None:
+            value = self._get_proc_time(path).isoformat()
+            self.manifest_cache.set(key, value)
+        return datetime.fromisoformat(value)
+    
+    @staticmethod
+    def _normalize_filter(flt):
+        """
+        Normalize a CQL2 filter so that the arguments of logical operators are in a defined order.
+        """
+        if isinstance(flt, dict):
+            out = {k: STACArchive._normalize_filter(v) for k, v in flt.items()}
+            if out.get('op') in ['and', 'or']:
+                out['args'] = sorted(out['args'], key=lambda x: json.dumps(x, sort_keys=True))
+            return out
+        elif isinstance(flt, list):
+            return [STACArchive._normalize_filter(x) for x in flt]
+        return flt
+    
     def _open_catalog(self):
         stac_api_io = StacApiIO(max_retries=self.max_tries)
         self.catalog = Client.open(url=self.url,
@@ -152,58 +413,186 @@ class STACArchive(object):
     def close(self):
         del self.catalog
     
-    def select(self, sensor=None, product=None, acquisition_mode=None,
-               mindate=None, maxdate=None, frameNumber=None,
-               vectorobject=None, date_strict=True, check_exist=True):
+    def identify_many(self, scenes, sortkey=None):
         """
-        Select scenes from the catalog. Used STAC keys:
-        
-        - platform
-        - start_datetime
-        - end_datetime
-        - sar:instrument_mode
-        - sar:product_type
-        - s1:datatake (custom)
+        Create metadata handlers for scenes from the item metadata of previous selections.
+        Scenes that have not been selected before or whose metadata has been discarded
+        (see parameter `max_meta`) are identified with :func:`pyroSAR.drivers.identify`.
         
         Parameters
         ----------
-        sensor: str or list[str] or None
-            S1A or S1B
-        product: str or list[str] or None
-            GRD or SLC
-        acquisition_mode: str or list[str] or None
-            IW, EW or SM
-        mindate: str or datetime.datetime or None
-            the minimum acquisition date
-        maxdate: str or datetime.datetime or None
-            the maximum acquisition date
-        frameNumber: int or list[int] or None
-            the data take ID in decimal representation.
-            Requires custom STAC key `s1:datatake`.
-        vectorobject: spatialist.vector.Vector or None
-            a geometry with which the scenes need to overlap
-        date_strict: bool
-            treat dates as strict limits or also allow flexible limits to incorporate scenes
-            whose acquisition period overlaps with the defined limit?
-            
-            - strict: start >= mindate & stop <= maxdate
-            - not strict: stop >= mindate & start <= maxdate
-        check_exist: bool
-            check whether found files exist locally?
+        scenes: list[str]
+            the scene locations as returned by :meth:`select`
+        sortkey: str or None
+            sort the handler object list by an attribute
         
         Returns
         -------
-        list[str]
-            the locations of the scene directories with suffix .SAFE
+        list[pyroSAR.drivers.ID]
+            the metadata handlers; of type :class:`STACScene` if the scene has been selected before
+        """
+        out = []
+        for scene in scenes:
+            if scene in self.scenes_meta.keys():
+                self.scenes_meta.move_to_end(scene)
+                geometry, properties = self.scenes_meta[scene]
+                out.append(STACScene(scene=scene, geometry=geometry, properties=properties))
+            else:
+                out.append(identify(scene))
+        if sortkey is not None:
+            out.sort(key=lambda x: getattr(x, sortkey))
+        return out
+    
+    def iselect(self, sensor=None, product=None, acquisition_mode=None,
+                mindate=None, maxdate=None, frameNumber=None,
+                vectorobject=None, date_strict=True, check_exist=True, page_size=100):
+        """
+        Select scenes from the catalog and yield them while the result pages are being retrieved.
+        Of multiple scenes with the same acquisition ID, i.e. scenes processed more than once, only the one
+        with the latest processing time is kept. If the catalog supports the STAC API sort extension, the items
+        are requested sorted by acquisition start so that these duplicates can be resolved while iterating;
+        only the scenes sharing the acquisition start of the last retrieved item are held back.
+        Otherwise all pages are retrieved before the first scene is yielded.
+        The arguments are the same as for :meth:`select`.
+        
+        Parameters
+        ----------
+        page_size: int
+            the number of items requested per page
+        
+        Yields
+        ------
+        str
+            the location of a scene directory with suffix .SAFE
         
         See Also
         --------
-        pystac_client.Client.search
+        select
+        pystac_client.ItemSearch.items
+        """
+        args, flt, site = self._query_args(sensor=sensor, product=product, acquisition_mode=acquisition_mode,
+                                           mindate=mindate, maxdate=maxdate, frameNumber=frameNumber,
+                                           vectorobject=vectorobject, date_strict=date_strict)
+        if site is not None and self._spatial_filter():
+            # search with the exact geometry instead of its bounding box
+            arg = {'op': 's_intersects', 'args': [{'property': 'geometry'}, json.loads(site.ExportToJson())]}
+            flt = {'op': 'and', 'args': (flt['args'] if flt is not None else []) + [arg]}
+            del args['bbox']
+        hrefs = None
+        if self.cache is not None:
+            key = self.cache.key(url=self.url, collections=sorted(self.collections),
+                                 filter=self._normalize_filter(flt), proc_time_key=self.proc_time_key,
+                                 **args)
+            hrefs = self.cache.get(key)
+        if hrefs is None:
+            items = self._items(args=args, flt=flt, page_size=page_size)
+        else:
+            items = iter(sorted(hrefs, key=lambda x: _times(x[0])[0]))
+        
+        if site is not None:
+            site_xmin, site_xmax, site_ymin, site_ymax = site.GetEnvelope()
+        retrieved = []
+        pending = []
+        proc_times = {}
+        # the metadata of the held back scenes; only that of the yielded scenes is kept
+        meta = {}
+        for href, geometry, properties in items:
+            retrieved.append((href, geometry, properties))
+            # the result of a bounding box search (or of a simplified geometry) is reduced to the
+            # items overlapping with the exact geometry; the cheap envelope test is done first
+            if site is not None and geometry is not None:
+                footprint = ogr.CreateGeometryFromJson(json.dumps(geometry))
+                xmin, xmax, ymin, ymax = footprint.GetEnvelope()
+                if xmin > site_xmax or xmax < site_xmin or ymin > site_ymax or ymax < site_ymin:
+                    continue
+                if not footprint.Intersects(site):
+                    continue
+            path = href[:re.search(r'\.SAFE', href).end()]
+            path = re.sub('^file://', '', path)
+            if Path(path).exists():
+                path = os.path.realpath(path)
+            else:
+                if check_exist:
+                    raise RuntimeError('scene does not exist locally:', path)
+            # duplicates share the same acquisition start; all scenes
+            # acquired before the current one are complete and can be passed on
+            if len(pending) > 0 and _times(path)[0] != _times(pending[0])[0]:
+                for scene in self._filter_duplicates(pending, proc_times):
+                    self._remember(scene, meta[scene])
+                    yield scene
+                pending = []
+                proc_times = {}
+                meta = {}
+            pending.append(path)
+            meta[path] = (geometry, properties)
+            if properties.get(self.proc_time_key) is not None:
+                proc_times[path] = _utc(properties[self.proc_time_key])
+        for scene in self._filter_duplicates(pending, proc_times):
+            self._remember(scene, meta[scene])
+            yield scene
+        if hrefs is None and self.cache is not None:
+            self.cache.set(key, retrieved)
+    
+    def _remember(self, scene, meta):
+        """
+        Keep the item metadata of a selected scene for :meth:`identify_many`.
+        """
+        self.scenes_meta[scene] = meta
+        self.scenes_meta.move_to_end(scene)
+        while len(self.scenes_meta) > self.max_meta:
+            self.scenes_meta.popitem(last=False)
+    
+    def _spatial_filter(self):
+        """
+        Does the catalog support the CQL2 spatial operators (e.g. `s_intersects`)?
+        """
+        pattern = r'cql2/[0-9.]+/conf/basic-spatial-(operators|functions)$'
+        return any(re.search(pattern, x) for x in self.catalog.get_conforms_to())
+    
+    def _items(self, args, flt, page_size):
+        """
+        Retrieve the items matching a query from the catalog page by page.
+        
+        Yields
+        ------
+        tuple[str, dict, dict]
+            the href of the first asset, the GeoJSON geometry and the properties of an item
+            used by :class:`STACScene` and for the processing time
+        """
+        keys = STACScene.properties + [self.proc_time_key]
+        sort = self.catalog.conforms_to(ConformanceClasses.SORT)
+        sortby = [{'field': 'properties.start_datetime', 'direction': 'asc'}] if sort else None
+        result = self.catalog.search(collections=self.collections,
+                                     filter=flt, max_items=None,
+                                     limit=page_size, sortby=sortby,
+                                     **args)
+        out = []
+        for item in result.items():
+            assets = item.assets
+            ref = assets[list(assets.keys())[0]]
+            properties = {k: v for k, v in item.properties.items() if k in keys}
+            if sort:
+                yield ref.href, item.geometry, properties
+            else:
+                out.append((ref.href, item.geometry, properties))
+        # without sorting, duplicates might be spread over all pages
+        for pair in sorted(out, key=lambda x: _times(x[0])[0]):
+            yield pair
+    
+    @staticmethod
+    def _query_args(sensor, product, acquisition_mode, mindate, maxdate,
+                    frameNumber, vectorobject, date_strict):
+        """
+        Translate the selection arguments to the arguments of :meth:`pystac_client.Client.search`.
+        
+        Returns
+        -------
+        tuple[dict, dict or None, osgeo.ogr.Geometry or None]
+            the search arguments `datetime` and `bbox`, the CQL2 filter and the union geometry
+            of `vectorobject` in EPSG:4326
         """
         pars = locals()
         del pars['date_strict']
-        del pars['check_exist']
-        del pars['self']
         
         lookup = {'product': 'sar:product_type',
                   'acquisition_mode': 'sar:instrument_mode',
@@ -215,6 +604,7 @@ class STACArchive(object):
                            'S1B': 'sentinel-1b'}
         
         args = {'datetime': [None, None]}
+        site = None
         flt = {'op': 'and', 'args': []}
         dt_pattern = '%Y-%m-%dT%H:%M:%SZ'
         for key in pars.keys():
@@ -246,6 +636,7 @@ class STACArchive(object):
                         vec.reproject(4326)
                         ext = vec.extent
                         args['bbox'] = [ext['xmin'], ext['ymin'], ext['xmax'], ext['ymax']]
+                        site = _union_geometry(vec)
                 else:
                     raise TypeError('argument vectorobject must be of type spatialist.vector.Vector')
             else:
@@ -270,40 +661,295 @@ class STACArchive(object):
             flt = None
         if args['datetime'] == [None, None]:
             args['datetime'] = None
-        result = self.catalog.search(collections=self.collections,
-                                     filter=flt, max_items=None,
-                                     **args)
-        result = list(result.items())
-        out = []
-        for item in result:
-            assets = item.assets
-            ref = assets[list(assets.keys())[0]]
-            href = ref.href
-            path = href[:re.search(r'\.SAFE', href).end()]
-            path = re.sub('^file://', '', path)
-            if Path(path).exists():
-                path = os.path.realpath(path)
-            else:
-                if check_exist:
-                    raise RuntimeError('scene does not exist locally:', path)
-            out.append(path)
-        out = self._filter_duplicates(out)
-        return out
+        return args, flt, site
+    
+    def select(self, sensor=None, product=None, acquisition_mode=None,
+               mindate=None, maxdate=None, frameNumber=None,
+               vectorobject=None, date_strict=True, check_exist=True, page_size=100):
+        """
+        Select scenes from the catalog. Used STAC keys:
+        
+        - platform
+        - start_datetime
+        - end_datetime
+        - sar:instrument_mode
+        - sar:product_type
+        - s1:datatake (custom)
+        
+        Parameters
+        ----------
+        sensor: str or list[str] or None
+            S1A or S1B
+        product: str or list[str] or None
+            GRD or SLC
+        acquisition_mode: str or list[str] or None
+            IW, EW or SM
+        mindate: str or datetime.datetime or None
+            the minimum acquisition date
+        maxdate: str or datetime.datetime or None
+            the maximum acquisition date
+        frameNumber: int or list[int] or None
+            the data take ID in decimal representation.
+            Requires custom STAC key `s1:datatake`.
+        vectorobject: spatialist.vector.Vector or None
+            a geometry with which the scenes need to overlap. If the catalog supports the CQL2 spatial operators,
+            it is queried with the union of all features using `s_intersects`, otherwise with their bounding box.
+            The result is reduced to the items whose footprint intersects any of the features.
+        date_strict: bool
+            treat dates as strict limits or also allow flexible limits to incorporate scenes
+            whose acquisition period overlaps with the defined limit?
+            
+            - strict: start >= mindate & stop <= maxdate
+            - not strict: stop >= mindate & start <= maxdate
+        check_exist: bool
+            check whether found files exist locally?
+        page_size: int
+            the number of items requested per page
+        
+        Returns
+        -------
+        list[str]
+            the locations of the scene directories with suffix .SAFE
+        
+        See Also
+        --------
+        iselect
+        pystac_client.Client.search
+        """
+        out = self.iselect(sensor=sensor, product=product, acquisition_mode=acquisition_mode,
+                           mindate=mindate, maxdate=maxdate, frameNumber=frameNumber,
+                           vectorobject=vectorobject, date_strict=date_strict,
+                           check_exist=check_exist, page_size=page_size)
+        return sorted(out)
+
+
+class ASFMirror(object):
+    """
+    Local mirror of the Alaska Satellite Facility (ASF) catalog used by :func:`asf_select`.
+    The search results are stored as GeoJSON features in an SQLite database together with the
+    time ranges that have been searched, so that repeated searches can be served locally
+    and processing nodes without internet access can use a mirror filled elsewhere.
+    
+    Parameters
+    ----------
+    filename: str
+        the SQLite database file. Will be created if it does not exist.
+    mode: str
+        the mode of operation:
+        
+        - online: serve searches covered by previous searches from the mirror; otherwise search the
+          ASF catalog and store the result
+        - offline: serve all searches from the mirror; the ASF catalog is never searched
+        - refresh: always search the ASF catalog and update the mirror
+    
+    Examples
+    --------
+    >>> from S1_NRB.search import ASFMirror, asf_select
+    >>> mirror = ASFMirror('asf.db')
+    >>> mirror.fill(sensor='S1A', product='GRD', acquisition_mode='IW',
+    >>>             mindate='20200701T000000', maxdate='20200801T000000')
+    >>> mirror.export_jsonl('asf.jsonl')
+    >>> # on another node
+    >>> mirror = ASFMirror('asf.db', mode='offline')
+    >>> mirror.import_jsonl('asf.jsonl')
+    >>> names = asf_select(sensor='S1A', product='GRD', acquisition_mode='IW',
+    >>>                    mindate='20200708T182600', maxdate='20200708T182800',
+    >>>                    return_value='sceneName', mirror=mirror)
+    """
+    modes = ['online', 'offline', 'refresh']
+    
+    def __init__(self, filename, mode='online'):
+        if mode not in self.modes:
+            raise RuntimeError(f"'mode' must be one of {self.modes}")
+        self.filename = filename
+        self.mode = mode
+        with self._connect() as con:
+            con.execute('''CREATE TABLE IF NOT EXISTS scenes
+                           (sceneName TEXT PRIMARY KEY,
+                            platform TEXT,
+                            processingLevel TEXT,
+                            beamModeType TEXT,
+                            start TEXT,
+                            stop TEXT,
+                            feature TEXT)''')
+            con.execute('''CREATE TABLE IF NOT EXISTS searches
+                           (query TEXT,
+                            start TEXT,
+                            stop TEXT,
+                            created REAL)''')
+    
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.filename, timeout=120)
+        try:
+            yield con
+            con.commit()
+        finally:
+            con.close()
+    
+    def search(self, platform, processing_level, beam_mode, start, stop, geometry=None):
+        """
+        Search the mirror or the ASF catalog depending on :attr:`mode`.
+        The arguments are those of :func:`asf_search.search`.
+        
+        Parameters
+        ----------
+        platform: str
+            e.g. Sentinel-1A
+        processing_level: str or list[str]
+            e.g. SLC or GRD_HD
+        beam_mode: str or list[str]
+            e.g. IW
+        start: datetime.datetime
+            the minimum acquisition date
+        stop: datetime.datetime
+            the maximum acquisition date
+        geometry: str or None
+            a WKT geometry with which the scenes need to overlap
+        
+        Returns
+        -------
+        list[dict]
+            the GeoJSON features of all scenes whose acquisition period overlaps with the search range
+        """
+        processing_level = sorted(processing_level) if isinstance(processing_level, list) else [processing_level]
+        beam_mode = sorted(beam_mode) if isinstance(beam_mode, list) else [beam_mode]
+        query = json.dumps([platform, processing_level, beam_mode])
+        t_start = start.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        t_stop = stop.strftime('%Y-%m-%dT%H:%M:%S.%f')
+        if self.mode == 'refresh' or (self.mode == 'online' and not self._covered(query, t_start, t_stop)):
+            # a search with a geometry does not cover the whole time range and is not recorded as such
+            features = _asf_search(platform=platform, processing_level=processing_level,
+                                   beam_mode=beam_mode, start=start, stop=stop, geometry=geometry)
+            self._insert(features)
+            if geometry is None:
+                with self._connect() as con:
+                    con.execute('INSERT INTO searches VALUES (?, ?, ?, ?)', (query, t_start, t_stop, time.time()))
+            return features
+        with self._connect() as con:
+            rows = con.execute('SELECT feature FROM scenes WHERE platform = ? '
+                               'AND processingLevel IN ({0}) AND beamModeType IN ({1}) '
+                               'AND stop >= ? AND start <= ? ORDER BY sceneName'
+                               .format(', '.join('?' * len(processing_level)), ', '.join('?' * len(beam_mode))),
+                               [platform] + processing_level + beam_mode + [t_start, t_stop]).fetchall()
+        features = [json.loads(x[0]) for x in rows]
+        if geometry is not None:
+            site = ogr.CreateGeometryFromWkt(geometry)
+            features = [x for x in features if x['geometry'] is not None and
+                        ogr.CreateGeometryFromJson(json.dumps(x['geometry'])).Intersects(site)]
+        return features
+    
+    def fill(self, sensor, product, acquisition_mode, mindate, maxdate):
+        """
+        Search the ASF catalog and store the result in the mirror regardless of :attr:`mode`.
+        The arguments are those of :func:`asf_select`.
+        
+        Returns
+        -------
+        int
+            the number of stored scenes
+        """
+        mode = self.mode
+        self.mode = 'refresh'
+        try:
+            names = asf_select(sensor=sensor, product=product, acquisition_mode=acquisition_mode,
+                               mindate=mindate, maxdate=maxdate, return_value='sceneName',
+                               date_strict=False, mirror=self)
+        finally:
+            self.mode = mode
+        return len(names)
+    
+    def export_jsonl(self, filename):
+        """
+        Write the content of the mirror to a JSON lines file, e.g. to transfer it to another node
+        or to record a test fixture.
+        
+        Parameters
+        ----------
+        filename: str
+            the name of the file to be written
+        
+        Returns
+        -------
+        
+        """
+        with self._connect() as con:
+            scenes = con.execute('SELECT feature FROM scenes ORDER BY sceneName').fetchall()
+            searches = con.execute('SELECT query, start, stop, created FROM searches').fetchall()
+        with open(filename, 'w') as f:
+            for query, start, stop, created in searches:
+                f.write(json.dumps({'search': {'query': query, 'start': start, 'stop': stop,
+                                               'created': created}}) + '\n')
+            for feature, in scenes:
+                f.write(feature + '\n')
+    
+    def import_jsonl(self, filename):
+        """
+        Add the content of a JSON lines file written by :meth:`export_jsonl` to the mirror.
+        
+        Parameters
+        ----------
+        filename: str
+            the name of the file to be read
+        
+        Returns
+        -------
+        
+        """
+        features = []
+        searches = []
+        with open(filename, 'r') as f:
+            for line in f:
+                if line.strip() == '':
+                    continue
+                record = json.loads(line)
+                if 'search' in record.keys():
+                    x = record['search']
+                    searches.append((x['query'], x['start'], x['stop'], x['created']))
+                else:
+                    features.append(record)
+        self._insert(features)
+        with self._connect() as con:
+            con.executemany('INSERT INTO searches VALUES (?, ?, ?, ?)', searches)
+    
+    def _covered(self, query, start, stop):
+        with self._connect() as con:
+            row = con.execute('SELECT 1 FROM searches WHERE query = ? AND start <= ? AND stop >= ?',
+                              (query, start, stop)).fetchone()
+        return row is not None
+    
+    def _insert(self, features):
+        rows = []
+        for feature in features:
+            prop = feature['properties']
+            rows.append((prop['sceneName'], prop['platform'], prop['processingLevel'], prop['beamModeType'],
+                         _asf_time(prop['startTime']).strftime('%Y-%m-%dT%H:%M:%S.%f'),
+                         _asf_time(prop['stopTime']).strftime('%Y-%m-%dT%H:%M:%S.%f'),
+                         json.dumps(feature)))
+        with self._connect() as con:
+            con.executemany('INSERT OR REPLACE INTO scenes VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
 
 
 class ASFArchive(object):
     """
     Search for scenes in the Alaska Satellite Facility (ASF) catalog.
+    
+    Parameters
+    ----------
+    mirror: ASFMirror or None
+        a local mirror of the catalog to search instead of or in addition to the online catalog
     """
     
+    def __init__(self, mirror=None):
+        self.mirror = mirror
+    
     def __enter__(self):
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         return
     
-    @staticmethod
-    def select(sensor=None, product=None, acquisition_mode=None, mindate=None,
+    def select(self, sensor=None, product=None, acquisition_mode=None, mindate=None,
                maxdate=None, vectorobject=None, date_strict=True, return_value='url'):
         """
         Select scenes from the ASF catalog. This is a simple wrapper around the function
@@ -344,11 +990,11 @@ class ASFArchive(object):
             see :func:`~S1_NRB.search.asf_select` for details
         """
         return asf_select(sensor, product, acquisition_mode, mindate, maxdate, vectorobject,
-                          return_value=return_value, date_strict=date_strict)
+                          return_value=return_value, date_strict=date_strict, mirror=self.mirror)
 
 
 def asf_select(sensor, product, acquisition_mode, mindate, maxdate,
-               vectorobject=None, return_value='url', date_strict=True):
+               vectorobject=None, return_value='url', date_strict=True, mirror=None):
     """
     Search scenes in the Alaska Satellite Facility (ASF) data catalog. This is a simple interface to the
     `asf_search <https://github.com/asfadmin/Discovery-asf_search>`_ package.
@@ -381,6 +1027,8 @@ def asf_select(sensor, product, acquisition_mode, mindate, maxdate,
         
         - strict: start >= mindate & stop <= maxdate
         - not strict: stop >= mindate & start <= maxdate
+    mirror: ASFMirror or None
+        a local mirror of the ASF catalog to search instead of or in addition to the online catalog
 
     Returns
     -------
@@ -417,23 +1065,18 @@ def asf_select(sensor, product, acquisition_mode, mindate, maxdate,
     else:
         stop = maxdate
     
-    result = asf.search(platform=sensor.replace('S1', 'Sentinel-1'),
-                        processingLevel=processing_level,
-                        beamMode=beam_mode,
-                        start=start,
-                        end=stop,
-                        intersectsWith=geometry).geojson()
-    features = result['features']
-    
-    def date_extract(item, key):
-        value = item['properties'][key]
-        out = datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ')
-        return out
+    platform = sensor.replace('S1', 'Sentinel-1')
+    if mirror is not None:
+        features = mirror.search(platform=platform, processing_level=processing_level,
+                                 beam_mode=beam_mode, start=start, stop=stop, geometry=geometry)
+    else:
+        features = _asf_search(platform=platform, processing_level=processing_level,
+                               beam_mode=beam_mode, start=start, stop=stop, geometry=geometry)
     
     if date_strict:
         features = [x for x in features
-                    if start <= date_extract(x, 'startTime')
-                    and date_extract(x, 'stopTime') <= stop]
+                    if start <= _asf_time(x['properties']['startTime'])
+                    and _asf_time(x['properties']['stopTime']) <= stop]
     
     if return_value == 'ASF':
         return [ASF(x) for x in features]
@@ -449,6 +1092,26 @@ def asf_select(sensor, product, acquisition_mode, mindate, maxdate,
     return sorted(out)
 
 
+def _asf_search(platform, processing_level, beam_mode, start, stop, geometry):
+    """
+    Helper function to search the ASF catalog.
+    """
+    result = asf.search(platform=platform,
+                        processingLevel=processing_level,
+                        beamMode=beam_mode,
+                        start=start,
+                        end=stop,
+                        intersectsWith=geometry).geojson()
+    return result['features']
+
+
+def _asf_time(value):
+    """
+    Helper function to read a time from the ASF catalog.
+    """
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ')
+
+
 def scene_select(archive, kml_file, aoi_tiles=None, aoi_geometry=None, **kwargs):
     """
     Central scene search utility. Selects scenes from a database and returns their file names
@@ -465,7 +1128,7 @@ def scene_select(archive, kml_file, aoi_tiles=None, aoi_geometry=None, **kwargs)
        `mindate` and `maxdate`
      - extend the `mindate` and `maxdate` search parameters by one minute
      - perform a second search with the extended acquisition date parameters and the
-       derived MGRS tile geometries
+       union of the derived MGRS tile geometries
     
     As consequence, if one defines the search parameters to only return one scene, the neighboring
     acquisitions will also be returned. This is because the scene overlaps with a set of MGRS
@@ -477,6 +1140,9 @@ def scene_select(archive, kml_file, aoi_tiles=None, aoi_geometry=None, **kwargs)
     geometry is extended to the bounding box of all MGRS tiles overlapping with the initial geometry
     to ensure full coverage of all tiles.
     
+    Independent of the number of tiles, only one search is performed with the union of all tile
+    geometries (see :func:`union`).
+    
     Parameters
     ----------
     archive: pyroSAR.drivers.Archive or STACArchive or ASFArchive
@@ -530,13 +1196,11 @@ def scene_select(archive, kml_file, aoi_tiles=None, aoi_geometry=None, **kwargs)
     
     # derive geometries and tiles from scene footprints
     if vec is None:
-        selection_tmp = archive.select(**args)
-        if len(selection_tmp) == 0:
+        scenes = archive.select(**args)
+        if len(scenes) == 0:
             return [], []
-        if not isinstance(selection_tmp[0], ID):
-            scenes = identify_many(scenes=selection_tmp, sortkey='start')
-        else:
-            scenes = selection_tmp
+        if not isinstance(scenes[0], ID):
+            scenes = identify_catalog(archive=archive, scenes=scenes, sortkey='start')
         scenes_geom = [x.geometry() for x in scenes]
         # select all tiles overlapping with the scenes for further processing
         vec = tile_from_aoi(vector=scenes_geom, kml=kml_file,
@@ -560,16 +1224,178 @@ def scene_select(archive, kml_file, aoi_tiles=None, aoi_geometry=None, **kwargs)
     args['mindate'] -= timedelta(minutes=1)
     args['maxdate'] += timedelta(minutes=1)
     
-    if isinstance(archive, ASFArchive):
-        args['return_value'] = 'url'
-    
-    for item in vec:
-        args['vectorobject'] = item
-        selection.extend(archive.select(**args))
+    # a single search with the union of all tile geometries
+    with union(vec) as site:
+        args['vectorobject'] = site
+        if isinstance(archive, ASFArchive):
+            # the ASF search API might simplify complex geometries,
+            # so the result is reduced to the scenes overlapping with the tiles
+            for scene in archive.select(**args):
+                with scene.geometry() as footprint:
+                    inter = intersect(footprint, site)
+                    if inter is not None:
+                        selection.append(scene.scene)
+                        inter.close()
+        else:
+            selection.extend(archive.select(**args))
     del vec, args
     return sorted(list(set(selection))), aoi_tiles
 
 
+def union(vectors):
+    """
+    Dissolve the geometries of one or multiple vector objects into a single feature.
+    
+    Parameters
+    ----------
+    vectors: spatialist.vector.Vector or list[spatialist.vector.Vector]
+        the vector object(s), e.g. MGRS tiles in different UTM zones
+    
+    Returns
+    -------
+    spatialist.vector.Vector
+        a vector object in EPSG:4326 containing a single (multi)polygon feature
+    """
+    if not isinstance(vectors, list):
+        vectors = [vectors]
+    geom = None
+    for vector in vectors:
+        with vector.clone() as vec:
+            vec.reproject(4326)
+            part = _union_geometry(vec)
+        geom = part if geom is None else geom.Union(part)
+    return wkt2vector(geom.ExportToWkt(), srs=4326)
+
+
+def _union_geometry(vector):
+    """
+    Helper function to get the union of all feature geometries of a vector object as :class:`osgeo.ogr.Geometry`.
+    """
+    geom = None
+    for feature in vector.layer:
+        part = feature.GetGeometryRef()
+        geom = part.Clone() if geom is None else geom.Union(part)
+    vector.layer.ResetReading()
+    return geom
+
+
+def identify_catalog(archive, scenes, sortkey=None):
+    """
+    Create metadata handlers for scenes from the metadata stored in a scene archive so that the scenes
+    themselves do not need to be opened:
+    
+    - :class:`STACArchive`: :class:`STACScene` objects from the items of previous selections
+    - :class:`pyroSAR.drivers.Archive`: :class:`ArchiveScene` objects from the rows of the data table
+    
+    Scenes not found in the archive and scenes of other archive types are identified with
+    :func:`pyroSAR.drivers.identify_many`.
+    
+    Parameters
+    ----------
+    archive: pyroSAR.drivers.Archive or STACArchive or ASFArchive
+        an open scene archive connection
+    scenes: list[str]
+        the scene locations
+    sortkey: str or None
+        sort the handler object list by an attribute
+    
+    Returns
+    -------
+    list[pyroSAR.drivers.ID]
+        the metadata handlers
+    """
+    if isinstance(archive, STACArchive):
+        return archive.identify_many(scenes=scenes, sortkey=sortkey)
+    elif isinstance(archive, Archive):
+        rows = {x['scene']: x for x in _archive_rows(archive=archive, scenes=scenes)}
+        out = [ArchiveScene(row=rows[x]) if x in rows.keys() else identify(x) for x in scenes]
+        if sortkey is not None:
+            out.sort(key=lambda x: getattr(x, sortkey))
+        return out
+    else:
+        return identify_many(scenes, sortkey=sortkey)
+
+
+def _archive_rows(archive, scenes, chunksize=500):
+    """
+    Helper function to read the rows of the data table of a :class:`pyroSAR.drivers.Archive` for a list of scenes.
+    """
+    columns = ['scene', 'sensor', 'orbit', 'orbitNumber_abs', 'orbitNumber_rel', 'cycleNumber', 'frameNumber',
+               'acquisition_mode', 'start', 'stop', 'product', 'samples', 'lines', 'hh', 'vv', 'hv', 'vh']
+    select = ', '.join(['"{}"'.format(x) for x in columns])
+    out = []
+    for i in range(0, len(scenes), chunksize):
+        names = ', '.join(["'{}'".format(x.replace("'", "''")) for x in scenes[i:i + chunksize]])
+        query = 'SELECT {0}, ST_AsText(geometry) FROM data WHERE scene IN ({1})'.format(select, names)
+        for row in archive.conn.execute(query):
+            row = list(row)
+            record = dict(zip(columns, row[:-1]))
+            record['wkt'] = row[-1]
+            out.append(record)
+    return out
+
+
+def query_datatakes(archive, scenes, seconds=2):
+    """
+    Query all slices of the data takes of a list of scenes with one search per data take.
+    The scenes are grouped by sensor, product, acquisition mode, absolute orbit number and data take ID
+    (`frameNumber`). For each group, the archive is searched for all scenes acquired between the
+    start of the first and the stop of the last scene plus a buffer. The neighbors and the
+    completeness of the individual scenes can then be determined from the result without further queries
+    (see :func:`collect_neighbors_many` and :func:`check_acquisition_completeness`).
+    
+    Parameters
+    ----------
+    archive: pyroSAR.drivers.Archive or STACArchive or ASFArchive
+        an open scene archive connection
+    scenes: list[pyroSAR.drivers.ID]
+        the Sentinel-1 scenes
+    seconds: int
+        the time buffer in seconds
+    
+    Returns
+    -------
+    dict
+        the scenes of each data take sorted by acquisition start with keys as returned by :func:`datatake_key`
+    """
+    groups = {}
+    for scene in scenes:
+        groups.setdefault(datatake_key(scene), []).append(scene)
+    out = {}
+    for key, group in groups.items():
+        start = min([x.start for x in group])
+        stop = max([x.stop for x in group])
+        start, stop = buffer_time(start, stop, seconds=seconds)
+        selection = archive.select(mindate=start, maxdate=stop, date_strict=False,
+                                   sensor=group[0].sensor, product=group[0].product,
+                                   acquisition_mode=group[0].acquisition_mode)
+        out[key] = sorted(selection, key=lambda x: _times(x)[0])
+    return out
+
+
+def datatake_key(scene):
+    """
+    Get the key identifying the data take of a scene as used by :func:`query_datatakes`.
+    
+    Parameters
+    ----------
+    scene: pyroSAR.drivers.ID
+        the Sentinel-1 scene
+    
+    Returns
+    -------
+    tuple
+        the sensor, product, acquisition mode, absolute orbit number and data take ID
+    """
+    if isinstance(scene, ASF):
+        # the ASF frame number identifies the individual slice; the data take ID is read from the scene name
+        datatake = SceneName(scene.scene).frameNumber
+    else:
+        datatake = scene.meta['frameNumber']
+    return (scene.sensor, scene.product, scene.acquisition_mode,
+            scene.meta['orbitNumber_abs'], datatake)
+
+
 def collect_neighbors(archive, scene):
     """
     Collect a scene's neighboring acquisitions in a data take
@@ -585,17 +1411,45 @@ def collect_neighbors(archive, scene):
     -------
     list[str]
         the file names of the neighboring scenes
+    
+    See Also
+    --------
+    collect_neighbors_many
     """
-    start, stop = buffer_time(scene.start, scene.stop, seconds=2)
+    return collect_neighbors_many(archive=archive, scenes=[scene])[0]
+
+
+def collect_neighbors_many(archive, scenes, datatakes=None):
+    """
+    Collect the neighboring acquisitions of multiple scenes with one search per data take.
+    Neighbors are all scenes whose acquisition period overlaps with that of the scene
+    buffered by two seconds.
     
-    neighbors = archive.select(mindate=start, maxdate=stop, date_strict=False,
-                               sensor=scene.sensor, product=scene.product,
-                               acquisition_mode=scene.acquisition_mode)
-    del neighbors[neighbors.index(scene.scene)]
-    return neighbors
+    Parameters
+    ----------
+    archive: pyroSAR.drivers.Archive or STACArchive or ASFArchive
+        an open scene archive connection
+    scenes: list[pyroSAR.drivers.ID]
+        the Sentinel-1 scenes
+    datatakes: dict or None
+        the data take slices as returned by :func:`query_datatakes`. Queried if None.
+    
+    Returns
+    -------
+    list[list[str]]
+        the file names of the neighboring scenes of each scene
+    """
+    if datatakes is None:
+        datatakes = query_datatakes(archive=archive, scenes=scenes)
+    out = []
+    for scene in scenes:
+        neighbors = _overlapping(datatakes[datatake_key(scene)], scene, strict=False)
+        del neighbors[neighbors.index(scene.scene)]
+        out.append(neighbors)
+    return out
 
 
-def check_acquisition_completeness(archive, scenes):
+def check_acquisition_completeness(archive, scenes, datatakes=None, mirror=None):
     """
     Check presence of neighboring acquisitions.
     Check that for each scene a predecessor and successor can be queried
@@ -604,6 +1458,7 @@ def check_acquisition_completeness(archive, scenes):
     during processing. In case a scene is suspected to be missing, the Alaska Satellite Facility (ASF)
     online catalog is cross-checked.
     An error will only be raised if the locally missing scene is present in the ASF catalog.
+    The archive and the ASF catalog are searched at most once per data take.
 
     Parameters
     ----------
@@ -611,6 +1466,10 @@ def check_acquisition_completeness(archive, scenes):
         an open scene archive connection
     scenes: list[pyroSAR.drivers.ID]
         a list of scenes
+    datatakes: dict or None
+        the data take slices as returned by :func:`query_datatakes`. Queried if None.
+    mirror: ASFMirror or None
+        a local mirror of the ASF catalog, e.g. for processing without internet access
 
     Returns
     -------
@@ -623,6 +1482,25 @@ def check_acquisition_completeness(archive, scenes):
     --------
     S1_NRB.search.asf_select
     """
+    if datatakes is None:
+        datatakes = query_datatakes(archive=archive, scenes=scenes)
+    refs = {}
+    
+    def asf_ref(scene):
+        # all scenes of the data take in the ASF catalog, queried once per data take
+        key = datatake_key(scene)
+        if key not in refs:
+            group = [x for x in scenes if datatake_key(x) == key]
+            start, stop = buffer_time(min([x.start for x in group]), max([x.stop for x in group]), seconds=2)
+            refs[key] = asf_select(sensor=scene.sensor,
+                                   product=scene.product,
+                                   acquisition_mode=scene.acquisition_mode,
+                                   mindate=start,
+                                   maxdate=stop,
+                                   return_value='sceneName',
+                                   mirror=mirror)
+        return _overlapping(refs[key], scene, strict=True)
+    
     messages = []
     for scene in scenes:
         slice = scene.meta['sliceNumber']
@@ -635,15 +1513,9 @@ def check_acquisition_completeness(archive, scenes):
         ref = None
         if slice == 0 or n_slices == 0:
             # NRT slicing mode
-            ref = asf_select(sensor=scene.sensor,
-                             product=scene.product,
-                             acquisition_mode=scene.acquisition_mode,
-                             mindate=start,
-                             maxdate=stop,
-                             return_value='sceneName')
-            match = [re.search(scene.pattern, x + '.SAFE').groupdict() for x in ref]
-            ref_start_min = min([x['start'] for x in match])
-            ref_stop_max = max([x['stop'] for x in match])
+            ref = asf_ref(scene)
+            ref_start_min = min([_times(x)[0] for x in ref])
+            ref_stop_max = max([_times(x)[1] for x in ref])
             if ref_start_min == scene.start:
                 groupsize -= 1
                 has_predecessor = False
@@ -657,31 +1529,19 @@ def check_acquisition_completeness(archive, scenes):
             if slice == n_slices:  # last slice in the data take
                 groupsize -= 1
                 has_successor = False
-        # Do another database selection to get the scene in question as well as its potential
-        # predecessor and successor by adding an acquisition time buffer of two seconds.
-        group = archive.select(sensor=scene.sensor,
-                               product=scene.product,
-                               acquisition_mode=scene.acquisition_mode,
-                               mindate=start,
-                               maxdate=stop,
-                               date_strict=False)
-        group = identify_many(group)
+        # the scene in question as well as its potential predecessor and successor
+        # selected with an acquisition time buffer of two seconds.
+        group = _overlapping(datatakes[datatake_key(scene)], scene, strict=False)
         # if the number of selected scenes is lower than the expected group size,
         # check whether the predecessor, the successor or both are missing by
         # cross-checking with the ASF database.
         if len(group) < groupsize:
             if ref is None:
-                ref = asf_select(sensor=scene.sensor,
-                                 product=scene.product,
-                                 acquisition_mode=scene.acquisition_mode,
-                                 mindate=start,
-                                 maxdate=stop,
-                                 return_value='sceneName')
-            match = [re.search(scene.pattern, x + '.SAFE').groupdict() for x in ref]
-            ref_start_min = min([x['start'] for x in match])
-            ref_stop_max = max([x['stop'] for x in match])
-            start_min = min([x.start for x in group])
-            stop_max = max([x.stop for x in group])
+                ref = asf_ref(scene)
+            ref_start_min = min([_times(x)[0] for x in ref])
+            ref_stop_max = max([_times(x)[1] for x in ref])
+            start_min = min([_times(x)[0] for x in group])
+            stop_max = max([_times(x)[1] for x in group])
             missing = []
             if ref_start_min < start < start_min and has_predecessor:
                 missing.append('predecessor')
@@ -693,3 +1553,41 @@ def check_acquisition_completeness(archive, scenes):
     if len(messages) != 0:
         text = '\n - '.join(messages)
         raise RuntimeError(f'missing the following scenes:\n - {text}')
+
+
+def _overlapping(names, scene, strict, seconds=2):
+    """
+    Helper function to select the scenes acquired within the buffered acquisition period of a scene.
+    Strict: start >= mindate & stop <= maxdate, not strict: stop >= mindate & start <= maxdate,
+    like argument `date_strict` of the archive `select` methods.
+    """
+    start, stop = buffer_time(scene.start, scene.stop, seconds=seconds)
+    out = []
+    for name in names:
+        desc = SceneName(name)
+        t_start, t_stop = desc.start, desc.stop
+        if strict:
+            if start <= t_start and t_stop <= stop:
+                out.append(name)
+        else:
+            if t_stop >= start and t_start <= stop:
+                out.append(name)
+    return out
+
+
+def _times(name):
+    """
+    Helper function to read the acquisition start and stop time from a Sentinel-1 scene name or path.
+    """
+    desc = SceneName(name)
+    return desc.start, desc.stop
+
+
+def _utc(value):
+    """
+    Helper function to convert a time string to a naive datetime object in UTC.
+    """
+    value = dateutil.parser.parse(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
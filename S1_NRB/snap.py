@@ -13,11 +13,12 @@ from dateutil.parser import parse as dateparse
 from spatialist import Raster
 from spatialist.envi import HDRobject
 from spatialist.ancillary import finder
-from pyroSAR import identify, identify_many
+from S1_NRB.cache import identify, identify_many
 from pyroSAR.snap.auxil import gpt, parse_recipe, parse_node, \
     orb_parametrize, mli_parametrize, geo_parametrize, \
     sub_parametrize, erode_edges
 from S1_NRB.tile_extraction import aoi_from_scene
+from S1_NRB import metrics
 from pyroSAR.ancillary import Lock, LockCollection
 
 
@@ -548,7 +549,7 @@ def process(scene, outdir, measurement, spacing, kml, dem,
             img_resampling_method='BILINEAR_INTERPOLATION',
             rlks=None, azlks=None, tmpdir=None, export_extra=None,
             allow_res_osv=True, clean_edges=True, clean_edges_pixels=4,
-            neighbors=None, gpt_args=None, cleanup=True):
+            neighbors=None, gpt_args=None, cleanup=True, tiles=None):
     """
     Main function for SAR processing with SNAP.
     
@@ -612,6 +613,10 @@ def process(scene, outdir, measurement, spacing, kml, dem,
         - e.g. ``['-x', '-c', '2048M']`` for increased tile cache size and intermediate clearing
     cleanup: bool
         Delete intermediate files after successful process termination?
+    tiles: list[str] or None
+        the IDs of the MGRS tiles overlapping with the scene as computed by
+        :func:`S1_NRB.tile_extraction.tile_overlaps`. If None, they are looked up
+        by :func:`S1_NRB.tile_extraction.aoi_from_scene`.
 
     Returns
     -------
@@ -659,7 +664,7 @@ def process(scene, outdir, measurement, spacing, kml, dem,
     workflows.append(out_pre_wf)
     output_noise = 'NESZ' in export_extra
     print('### preprocessing main scene')
-    with Lock(out_pre):
+    with Lock(out_pre), metrics.measure('snap.pre'):
         pre(src=scene, dst=out_pre, workflow=out_pre_wf,
             allow_res_osv=allow_res_osv, output_noise=output_noise,
             output_beta0=apply_rtc, gpt_args=gpt_args)
@@ -676,7 +681,7 @@ def process(scene, outdir, measurement, spacing, kml, dem,
             out_pre_nb = tmp_base_nb + '_pre.dim'
             out_pre_nb_wf = out_pre_nb.replace('.dim', '.xml')
             print('### preprocessing neighbor:', item)
-            with Lock(out_pre_nb):
+            with Lock(out_pre_nb), metrics.measure('snap.pre', neighbor=basename_nb):
                 pre(src=item, dst=out_pre_nb, workflow=out_pre_nb_wf,
                     allow_res_osv=allow_res_osv, output_noise=output_noise,
                     output_beta0=apply_rtc, gpt_args=gpt_args)
@@ -688,7 +693,7 @@ def process(scene, outdir, measurement, spacing, kml, dem,
         workflows.append(out_buffer_wf)
         if not os.path.isfile(out_buffer):
             print('### buffering scene with neighboring acquisitions')
-            with LockCollection(out_pre_neighbors, soft=True):
+            with LockCollection(out_pre_neighbors, soft=True), metrics.measure('snap.grd_buffer'):
                 grd_buffer(src=out_pre, dst=out_buffer, workflow=out_buffer_wf,
                            neighbors=out_pre_neighbors, gpt_args=gpt_args,
                            buffer=10 * spacing)
@@ -697,15 +702,17 @@ def process(scene, outdir, measurement, spacing, kml, dem,
     # range look direction angle
     if 'lookDirection' in export_extra:
         print('### look direction computation')
-        look_direction(dim=out_pre)
+        with metrics.measure('snap.look_direction'):
+            look_direction(dim=out_pre)
     ############################################################################
     # multi-looking
     out_mli = tmp_base + '_mli.dim'
     out_mli_wf = out_mli.replace('.dim', '.xml')
     if not os.path.isfile(out_mli):
         print('### multi-looking')
-        mli(src=out_pre, dst=out_mli, workflow=out_mli_wf,
-            spacing=spacing, rlks=rlks, azlks=azlks, gpt_args=gpt_args)
+        with metrics.measure('snap.mli'):
+            mli(src=out_pre, dst=out_mli, workflow=out_mli_wf,
+                spacing=spacing, rlks=rlks, azlks=azlks, gpt_args=gpt_args)
     if not os.path.isfile(out_mli):
         out_mli = out_pre
     else:
@@ -720,11 +727,12 @@ def process(scene, outdir, measurement, spacing, kml, dem,
         output_sigma0_rtc = measurement == 'sigma' or 'gammaSigmaRatio' in export_extra
         if not os.path.isfile(out_rtc):
             print('### radiometric terrain correction')
-            rtc(src=out_mli, dst=out_rtc, workflow=out_rtc_wf, dem=dem,
-                dem_resampling_method=dem_resampling_method,
-                sigma0=output_sigma0_rtc,
-                scattering_area='scatteringArea' in export_extra,
-                gpt_args=gpt_args)
+            with metrics.measure('snap.rtc'):
+                rtc(src=out_mli, dst=out_rtc, workflow=out_rtc_wf, dem=dem,
+                    dem_resampling_method=dem_resampling_method,
+                    sigma0=output_sigma0_rtc,
+                    scattering_area='scatteringArea' in export_extra,
+                    gpt_args=gpt_args)
         ########################################################################
         # gamma-sigma ratio computation
         out_gsr = None
@@ -733,8 +741,9 @@ def process(scene, outdir, measurement, spacing, kml, dem,
             out_gsr_wf = out_gsr.replace('.dim', '.xml')
             workflows.append(out_gsr_wf)
             if not os.path.isfile(out_gsr):
-                gsr(src=out_rtc, dst=out_gsr, workflow=out_gsr_wf,
-                    gpt_args=gpt_args)
+                with metrics.measure('snap.gsr'):
+                    gsr(src=out_rtc, dst=out_gsr, workflow=out_gsr_wf,
+                        gpt_args=gpt_args)
         ########################################################################
         # sigma-gamma ratio computation
         out_sgr = None
@@ -743,8 +752,9 @@ def process(scene, outdir, measurement, spacing, kml, dem,
             out_sgr_wf = out_sgr.replace('.dim', '.xml')
             workflows.append(out_sgr_wf)
             if not os.path.isfile(out_sgr):
-                sgr(src=out_rtc, dst=out_sgr, workflow=out_sgr_wf,
-                    gpt_args=gpt_args)
+                with metrics.measure('snap.sgr'):
+                    sgr(src=out_rtc, dst=out_sgr, workflow=out_sgr_wf,
+                        gpt_args=gpt_args)
     ############################################################################
     # geocoding
     
@@ -768,26 +778,28 @@ def process(scene, outdir, measurement, spacing, kml, dem,
                 bands1.append('simulatedImage')
             if 'lookDirection' in export_extra:
                 bands0.append('lookDirection')
-            geo(out_mli, out_rtc, out_gsr, out_sgr,
-                dst=out_geo, workflow=out_geo_wf,
-                spacing=spacing, crs=epsg, geometry=ext,
-                export_extra=export_extra,
-                standard_grid_origin_x=align_x,
-                standard_grid_origin_y=align_y,
-                bands0=bands0, bands1=bands1, dem=dem,
-                dem_resampling_method=dem_resampling_method,
-                img_resampling_method=img_resampling_method,
-                gpt_args=gpt_args)
+            with metrics.measure('snap.geo', epsg=epsg):
+                geo(out_mli, out_rtc, out_gsr, out_sgr,
+                    dst=out_geo, workflow=out_geo_wf,
+                    spacing=spacing, crs=epsg, geometry=ext,
+                    export_extra=export_extra,
+                    standard_grid_origin_x=align_x,
+                    standard_grid_origin_y=align_y,
+                    bands0=bands0, bands1=bands1, dem=dem,
+                    dem_resampling_method=dem_resampling_method,
+                    img_resampling_method=img_resampling_method,
+                    gpt_args=gpt_args)
             print('### edge cleaning')
-            postprocess(out_geo, clean_edges=clean_edges,
-                        clean_edges_pixels=clean_edges_pixels)
+            with metrics.measure('snap.postprocess', epsg=epsg):
+                postprocess(out_geo, clean_edges=clean_edges,
+                            clean_edges_pixels=clean_edges_pixels)
         for wf in workflows:
             wf_dst = os.path.join(outdir_scene, os.path.basename(wf))
             if wf != wf_dst:
                 shutil.copyfile(src=wf, dst=wf_dst)
     
     print('### determining UTM zone overlaps')
-    aois = aoi_from_scene(scene=id, kml=kml, multi=utm_multi)
+    aois = aoi_from_scene(scene=id, kml=kml, multi=utm_multi, tiles=tiles)
     for aoi in aois:
         ext = aoi['extent']
         epsg = aoi['epsg']
@@ -1177,3 +1189,125 @@ def look_direction(dim):
         arr = interpolate(infile=dim)
         write(array=arr, out=out, reference=ref)
         metadata(dim=dim)
+
+
+def gpt_resources(gpt_args=None):
+    """
+    Read the resource limits of a SNAP GPT call from its additional arguments.
+    
+    Parameters
+    ----------
+    gpt_args: list[str] or None
+        a list of additional arguments to be passed to the gpt call, e.g. ``['-J-Xmx100G -c 75G -q 30']``.
+        Individual list elements may contain multiple whitespace-separated arguments.
+    
+    Returns
+    -------
+    dict
+        a dictionary with keys
+        
+        - `memory`: the maximum JVM heap size in bytes (``-J-Xmx``)
+        - `threads`: the number of parallel threads (``-q``)
+        
+        Values of arguments not defined in `gpt_args` are None.
+        The tile cache size (``-c``) is not read because the cache is part of the JVM heap.
+    
+    Examples
+    --------
+    >>> from S1_NRB.snap import gpt_resources
+    >>> gpt_resources(['-J-Xmx100G -c 75G -q 30'])
+    {'memory': 107374182400, 'threads': 30}
+    """
+    out = {'memory': None, 'threads': None}
+    if gpt_args is None:
+        return out
+    args = ' '.join(gpt_args).split()
+    for i, arg in enumerate(args):
+        if arg.startswith('-J-Xmx'):
+            out['memory'] = _parse_bytes(arg[6:])
+        elif arg == '-q' and i + 1 < len(args):
+            out['threads'] = int(args[i + 1])
+    return out
+
+
+def gpt_workers(gpt_args=None, max_workers=None, memory_overhead=1.2, reserved_threads=0, reserved_memory=0,
+                cores=None, ram=None):
+    """
+    Determine the number of SNAP GPT processes that can safely run concurrently on the current host.
+    Each GPT process is assumed to occupy its maximum JVM heap size (``-J-Xmx``) times `memory_overhead`
+    to account for non-heap memory of the JVM, and the number of threads defined by ``-q``.
+    The number of workers is then limited by the RAM and the number of CPU cores available
+    to the current process minus the resources reserved for other processes running at the same time,
+    e.g. the ARD workers. If the heap size is not defined, the SNAP default is unknown
+    and only one worker is returned.
+    
+    Parameters
+    ----------
+    gpt_args: list[str] or None
+        a list of additional arguments to be passed to the gpt call. See :func:`gpt_resources`.
+    max_workers: int or None
+        an upper limit for the number of workers.
+    memory_overhead: int or float
+        the factor by which the JVM heap size is multiplied to estimate the memory footprint of a GPT process.
+    reserved_threads: int
+        the number of CPU threads used by other processes running concurrently
+    reserved_memory: int
+        the memory in bytes used by other processes running concurrently
+    cores: int or None
+        the number of CPU cores. Default None: the cores available to the current process.
+    ram: int or None
+        the total RAM in bytes. Default None: the physical memory of the host.
+    
+    Returns
+    -------
+    int
+        the number of workers; at least 1
+    
+    Examples
+    --------
+    >>> from S1_NRB.snap import gpt_workers
+    >>> gpt_workers(['-J-Xmx50G -q 8'], cores=32, ram=256 * 1024 ** 3,
+    ...             reserved_threads=16, reserved_memory=64 * 1024 ** 3)
+    2
+    """
+    res = gpt_resources(gpt_args=gpt_args)
+    if cores is None:
+        try:
+            cores = len(os.sched_getaffinity(0))
+        except AttributeError:
+            cores = os.cpu_count() or 1
+    if ram is None:
+        try:
+            ram = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        except (AttributeError, ValueError, OSError):
+            ram = None
+    if res['memory'] is None or ram is None:
+        workers = 1
+    else:
+        workers = int((ram - reserved_memory) // (res['memory'] * memory_overhead))
+    threads = res['threads'] if res['threads'] is not None else cores
+    workers = min(workers, (cores - reserved_threads) // threads)
+    if max_workers is not None:
+        workers = min(workers, max_workers)
+    return max(1, workers)
+
+
+def _parse_bytes(value):
+    """
+    Convert a JVM-style memory string like `100G` or `2048M` to bytes.
+    
+    Parameters
+    ----------
+    value: str
+        the memory string
+    
+    Returns
+    -------
+    int
+    """
+    match = re.search('^([0-9]+)([KkMmGgTt]?)B?$', value)
+    if match is None:
+        raise ValueError(f"cannot parse memory value '{value}'")
+    number, unit = match.groups()
+    factor = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}[unit.lower()]
+    return int(number) * factor
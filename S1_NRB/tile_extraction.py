@@ -1,10 +1,20 @@
+import os
 import re
+import json
+import sqlite3
 import itertools
+import threading
 from lxml import html
+from osgeo import ogr, osr
+from scipy.sparse import csr_matrix
 from spatialist.vector import Vector, wkt2vector, bbox
-from spatialist.auxil import utm_autodetect
+from spatialist.auxil import utm_autodetect, crsConvert
 from S1_NRB.ancillary import get_max_ext, buffer_min_overlap
 
+_indices = {}
+_inherited = []
+_lock = threading.Lock()
+
 
 def tile_from_aoi(vector, kml, epsg=None, strict=True, return_geometries=False, tilenames=None):
     """
@@ -39,6 +49,9 @@ def tile_from_aoi(vector, kml, epsg=None, strict=True, return_geometries=False,
     -----
     The global Sentinel-2 tiling grid can be retrieved from:
     https://sentinel.esa.int/documents/247904/1955685/S2A_OPER_GIP_TILPAR_MPC__20151209T095117_V20150622T000000_21000101T000000_B00.kml
+    
+    The tiles are looked up in the grid index returned by :func:`grid_index`, which is created
+    from the KML file on first use.
     """
     if isinstance(epsg, int):
         epsg = [epsg]
@@ -52,48 +65,128 @@ def tile_from_aoi(vector, kml, epsg=None, strict=True, return_geometries=False,
     sortkey = None
     if return_geometries:
         sortkey = lambda x: x.mgrs
-    with Vector(kml, driver='KML') as vec:
-        tilenames_src = []
-        tiles = []
-        for vector in vectors:
-            vector.layer.ResetReading()
-            for item in vector.layer:
-                geom = item.GetGeometryRef()
-                vec.layer.SetSpatialFilter(geom)
-                for tile in vec.layer:
-                    tilename = tile.GetField('Name')
-                    c1 = tilename not in tilenames_src
-                    c2 = tilenames is None or tilename in tilenames
-                    if c1 and c2:
-                        tilenames_src.append(tilename)
-                        attrib = description2dict(tile.GetField('Description'))
-                        reproject = False
-                        if epsg is not None and attrib['EPSG'] not in epsg:
-                            if len(epsg) == 1 and not strict:
-                                epsg_target = int(epsg[0])
-                                tilename += '_{}'.format(epsg_target)
-                                reproject = True
-                            else:
-                                continue
-                        if return_geometries:
-                            if reproject:
-                                with wkt2vector(attrib['UTM_WKT'], attrib['EPSG']) as tmp:
-                                    tmp.reproject(epsg_target)
-                                    ext = tmp.extent
-                                    for k, v in ext.items():
-                                        ext[k] = round(v / 10) * 10
-                                geom = bbox(ext, crs=epsg_target)
-                            else:
-                                geom = wkt2vector(attrib['UTM_WKT'], attrib['EPSG'])
-                            geom.mgrs = tilename
-                            tiles.append(geom)
+    index = grid_index(kml)
+    tilenames_src = []
+    tiles = []
+    for vector in vectors:
+        vector.layer.ResetReading()
+        for item in vector.layer:
+            geom = item.GetGeometryRef()
+            for tilename in index.intersecting(geom):
+                c1 = tilename not in tilenames_src
+                c2 = tilenames is None or tilename in tilenames
+                if c1 and c2:
+                    tilenames_src.append(tilename)
+                    attrib = index.attributes(tilename)
+                    reproject = False
+                    if epsg is not None and attrib['EPSG'] not in epsg:
+                        if len(epsg) == 1 and not strict:
+                            epsg_target = int(epsg[0])
+                            tilename += '_{}'.format(epsg_target)
+                            reproject = True
                         else:
-                            tiles.append(tilename)
-            vector.layer.ResetReading()
-        tile = None
-        geom = None
-        item = None
-        return sorted(tiles, key=sortkey)
+                            continue
+                    if return_geometries:
+                        if reproject:
+                            ext = index.extent(tile=tilenames_src[-1], epsg=epsg_target)
+                            geom = bbox(ext, crs=epsg_target)
+                        else:
+                            geom = wkt2vector(attrib['UTM_WKT'], attrib['EPSG'])
+                        geom.mgrs = tilename
+                        tiles.append(geom)
+                    else:
+                        tiles.append(tilename)
+        vector.layer.ResetReading()
+    geom = None
+    item = None
+    return sorted(tiles, key=sortkey)
+
+
+def tile_overlaps(vectors, kml, tilenames=None):
+    """
+    Compute the overlap of multiple footprints, e.g. those of all SAR scenes of a processing run, with the MGRS tiles.
+    The candidate tiles are looked up in the grid index (see :func:`grid_index`) and each footprint is transformed
+    only once per UTM zone, so that the overlap with all tiles of a zone is computed without any further reprojection.
+    
+    Parameters
+    ----------
+    vectors: list[spatialist.vector.Vector]
+        the footprints. CRS must be EPSG:4326.
+    kml: str
+        Path to the Sentinel-2 tiling grid KML file.
+    tilenames: list[str] or None
+        an optional list of MGRS tile names to limit the selection
+    
+    Returns
+    -------
+    overlaps: scipy.sparse.csr_matrix
+        a matrix of shape (number of footprints, number of tiles) containing the fraction of each tile's area
+        that is covered by each footprint. Only non-zero overlaps are stored.
+    tiles: list[str]
+        the sorted MGRS tile IDs, i.e. the columns of `overlaps`
+    
+    Examples
+    --------
+    >>> from S1_NRB.tile_extraction import tile_overlaps
+    >>> vectors = [x.geometry() for x in scenes]
+    >>> overlaps, tiles = tile_overlaps(vectors=vectors, kml=kml)
+    >>> # the tiles overlapping with the first scene
+    >>> print([tiles[j] for j in overlaps[0].indices])
+    """
+    index = grid_index(kml)
+    footprints = []
+    candidates = {}
+    for i, vector in enumerate(vectors):
+        if vector.getProjection('epsg') != 4326:
+            raise RuntimeError('the CRS of the input vector object(s) must be EPSG:4326')
+        footprint = _footprint(vector)
+        footprints.append({4326: footprint})
+        for tilename in index.intersecting(footprint):
+            if tilenames is None or tilename in tilenames:
+                candidates.setdefault(tilename, []).append(i)
+    tiles = sorted(candidates.keys())
+    transformations = {}
+    rows = []
+    cols = []
+    data = []
+    for j, tilename in enumerate(tiles):
+        attrib = index.attributes(tilename)
+        epsg = attrib['EPSG']
+        if epsg not in transformations.keys():
+            transformations[epsg] = osr.CoordinateTransformation(crsConvert(4326, 'osr'),
+                                                                 crsConvert(epsg, 'osr'))
+        tile = ogr.CreateGeometryFromWkt(attrib['UTM_WKT'])
+        area = tile.GetArea()
+        for i in candidates[tilename]:
+            if epsg not in footprints[i].keys():
+                geom = footprints[i][4326].Clone()
+                geom.Transform(transformations[epsg])
+                footprints[i][epsg] = geom
+            intersection = tile.Intersection(footprints[i][epsg])
+            overlap = intersection.GetArea() if intersection is not None else 0
+            if overlap > 0:
+                rows.append(i)
+                cols.append(j)
+                data.append(overlap / area)
+    overlaps = csr_matrix((data, (rows, cols)), shape=(len(vectors), len(tiles)))
+    return overlaps, tiles
+
+
+def _footprint(vector):
+    """
+    Get the union of all geometries of a vector object as a single geometry.
+    """
+    out = ogr.Geometry(ogr.wkbMultiPolygon)
+    vector.layer.ResetReading()
+    for feat in vector.layer:
+        geom = feat.GetGeometryRef()
+        if geom.GetGeometryName() == 'MULTIPOLYGON':
+            for subgeom in geom:
+                out.AddGeometry(subgeom)
+        else:
+            out.AddGeometry(geom)
+    vector.layer.ResetReading()
+    return out.UnionCascaded()
 
 
 def aoi_from_tile(kml, tile):
@@ -120,23 +213,20 @@ def aoi_from_tile(kml, tile):
     -----
     The global Sentinel-2 tiling grid can be retrieved from:
     https://sentinel.esa.int/documents/247904/1955685/S2A_OPER_GIP_TILPAR_MPC__20151209T095117_V20150622T000000_21000101T000000_B00.kml
+    
+    The tiles are looked up in the grid index returned by :func:`grid_index`, which is created
+    from the KML file on first use.
     """
     if isinstance(tile, list):
         return [aoi_from_tile(kml=kml, tile=x) for x in tile]
     else:
         tilename, epsg = re.search('([A-Z0-9]{5})_?([0-9]+)?', tile).groups()
-        with Vector(kml, driver='KML') as vec:
-            feat = vec.getFeatureByAttribute('Name', tilename)
-            attrib = description2dict(feat.GetField('Description'))
-            feat = None
+        index = grid_index(kml)
         if epsg is None:
+            attrib = index.attributes(tilename)
             return wkt2vector(attrib['UTM_WKT'], attrib['EPSG'])
         else:
-            with wkt2vector(attrib['UTM_WKT'], attrib['EPSG']) as tmp:
-                tmp.reproject(int(epsg))
-                ext = tmp.extent
-                for k, v in ext.items():
-                    ext[k] = round(v / 10) * 10
+            ext = index.extent(tile=tilename, epsg=int(epsg))
             return bbox(ext, crs=int(epsg))
 
 
@@ -162,7 +252,277 @@ def description2dict(description):
     return attrib
 
 
-def aoi_from_scene(scene, kml, multi=True, percent=1):
+class GridIndex(object):
+    """
+    Index of the Sentinel-2 MGRS tiling grid used by :func:`tile_from_aoi` and :func:`aoi_from_tile`.
+    The KML file is parsed once and the tile attributes (see :func:`description2dict`) and WGS84 geometries
+    are stored in an SQLite database together with an R*Tree index of the WGS84 tile extents.
+    The index is rebuilt if the size or modification time of the KML file changes.
+    The extents of tiles reprojected to other UTM zones (see :meth:`extent`) are added to the database
+    on first use so that they are shared by all processes and processing runs.
+    Each process uses its own database connection, so an index opened before forking worker processes
+    can safely be used by the workers.
+    
+    Parameters
+    ----------
+    kml: str
+        Path to the Sentinel-2 tiling grid KML file.
+    filename: str or None
+        the index database file. If None, the file is placed next to the KML file with extension `.sqlite`
+        or, if this directory is not writable, in the directory `~/.cache/S1_NRB`.
+    
+    Examples
+    --------
+    >>> from S1_NRB.tile_extraction import GridIndex
+    >>> index = GridIndex(kml='S2A_OPER_GIP_TILPAR_MPC__20151209T095117_V20150622T000000_21000101T000000_B00.kml')
+    >>> print(index.attributes('33TUM')['EPSG'])
+    32633
+    """
+    version = 2
+    
+    def __init__(self, kml, filename=None):
+        self.kml = kml
+        if filename is None:
+            filename = self._default_filename(kml)
+        self.filename = filename
+        self._attributes = {}
+        self._geometries = {}
+        self._extents = {}
+        self._lock = threading.Lock()
+        self._con = None
+        self._pid = None
+        if not self._valid():
+            self.build()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    @staticmethod
+    def _default_filename(kml):
+        directory, basename = os.path.split(os.path.abspath(kml))
+        basename = os.path.splitext(basename)[0] + '.sqlite'
+        if not os.access(directory, os.W_OK):
+            directory = os.path.join(os.path.expanduser('~'), '.cache', 'S1_NRB')
+            os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, basename)
+    
+    def _source(self):
+        stat = os.stat(self.kml)
+        return json.dumps([self.version, stat.st_size, stat.st_mtime_ns])
+    
+    def _valid(self):
+        if not os.path.isfile(self.filename):
+            return False
+        con = sqlite3.connect(self.filename, timeout=120)
+        try:
+            row = con.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        except sqlite3.DatabaseError:
+            return False
+        finally:
+            con.close()
+        return row is not None and row[0] == self._source()
+    
+    def build(self):
+        """
+        Parse the KML file and (re)write the index database.
+        The database is written to a temporary file first so that other processes never read an incomplete index.
+        
+        Returns
+        -------
+        
+        """
+        rows = []
+        bounds = []
+        with Vector(self.kml, driver='KML') as vec:
+            vec.layer.ResetReading()
+            for i, feat in enumerate(vec.layer):
+                attrib = description2dict(feat.GetField('Description'))
+                geom = feat.GetGeometryRef()
+                lon_min, lon_max, lat_min, lat_max = geom.GetEnvelope()
+                rows.append((i, feat.GetField('Name'), attrib['EPSG'],
+                             json.dumps(attrib), geom.ExportToWkb()))
+                bounds.append((i, lon_min, lon_max, lat_min, lat_max))
+            vec.layer.ResetReading()
+            feat = geom = None
+        tmp = f'{self.filename}.{os.getpid()}.tmp'
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+        con = sqlite3.connect(tmp)
+        try:
+            con.execute('''CREATE TABLE meta
+                           (key TEXT PRIMARY KEY,
+                            value TEXT)''')
+            con.execute('''CREATE TABLE tiles
+                           (id INTEGER PRIMARY KEY,
+                            name TEXT UNIQUE,
+                            epsg INTEGER,
+                            attributes TEXT,
+                            geometry BLOB)''')
+            con.execute('''CREATE TABLE extents
+                           (name TEXT,
+                            epsg INTEGER,
+                            xmin INTEGER,
+                            xmax INTEGER,
+                            ymin INTEGER,
+                            ymax INTEGER,
+                            PRIMARY KEY (name, epsg))''')
+            con.execute('CREATE VIRTUAL TABLE tiles_rtree USING rtree(id, lon_min, lon_max, lat_min, lat_max)')
+            con.executemany('INSERT INTO tiles VALUES (?, ?, ?, ?, ?)', rows)
+            con.executemany('INSERT INTO tiles_rtree VALUES (?, ?, ?, ?, ?)', bounds)
+            con.execute("INSERT INTO meta VALUES ('source', ?)", (self._source(),))
+            con.commit()
+        finally:
+            con.close()
+        os.replace(tmp, self.filename)
+    
+    def close(self):
+        """
+        Close the database connection of the current process.
+        
+        Returns
+        -------
+        
+        """
+        if self._con is not None:
+            if self._pid == os.getpid():
+                self._con.close()
+            else:
+                _inherited.append(self._con)
+        self._con = None
+        self._pid = None
+    
+    def _connection(self):
+        # SQLite connections must not be used across fork(); a process that inherited
+        # the index from its parent opens its own connection. The inherited connection is
+        # kept referenced so that it is neither used nor closed in this process.
+        pid = os.getpid()
+        if self._pid != pid:
+            if self._con is not None:
+                _inherited.append(self._con)
+            self._lock = threading.Lock()
+            self._con = sqlite3.connect(self.filename, timeout=120, check_same_thread=False)
+            self._pid = pid
+        return self._con
+    
+    def _query(self, sql, parameters):
+        con = self._connection()
+        with self._lock:
+            return con.execute(sql, parameters).fetchall()
+    
+    def _load(self, rows):
+        for name, attributes, geometry in rows:
+            if name not in self._attributes.keys():
+                self._attributes[name] = json.loads(attributes)
+                self._geometries[name] = ogr.CreateGeometryFromWkb(geometry)
+    
+    def attributes(self, tile):
+        """
+        Get the attributes of a tile.
+        
+        Parameters
+        ----------
+        tile: str
+            the MGRS tile ID
+        
+        Returns
+        -------
+        dict
+            the attributes as returned by :func:`description2dict`
+        """
+        if tile not in self._attributes.keys():
+            self._load(self._query('SELECT name, attributes, geometry FROM tiles WHERE name = ?', (tile,)))
+            if tile not in self._attributes.keys():
+                raise RuntimeError(f"tile '{tile}' is not contained in the grid")
+        return dict(self._attributes[tile])
+    
+    def extent(self, tile, epsg):
+        """
+        Get the extent of a tile reprojected to another CRS with corner coordinates rounded to multiples of 10.
+        The extents are computed once and kept in memory and in the index database.
+        
+        Parameters
+        ----------
+        tile: str
+            the MGRS tile ID
+        epsg: int
+            the EPSG code of the target CRS
+        
+        Returns
+        -------
+        dict
+            the extent with keys `xmin`, `xmax`, `ymin` and `ymax`
+        """
+        key = (tile, epsg)
+        if key not in self._extents.keys():
+            row = self._query('SELECT xmin, xmax, ymin, ymax FROM extents WHERE name = ? AND epsg = ?', key)
+            if len(row) > 0:
+                ext = dict(zip(['xmin', 'xmax', 'ymin', 'ymax'], row[0]))
+            else:
+                attrib = self.attributes(tile)
+                with wkt2vector(attrib['UTM_WKT'], attrib['EPSG']) as tmp:
+                    tmp.reproject(epsg)
+                    ext = tmp.extent
+                    for k, v in ext.items():
+                        ext[k] = round(v / 10) * 10
+                # written via the connection of the current process, see _connection
+                con = self._connection()
+                with self._lock:
+                    con.execute('INSERT OR REPLACE INTO extents VALUES (?, ?, ?, ?, ?, ?)',
+                                key + (ext['xmin'], ext['xmax'], ext['ymin'], ext['ymax']))
+                    con.commit()
+            self._extents[key] = ext
+        return dict(self._extents[key])
+    
+    def intersecting(self, geometry):
+        """
+        Get the names of all tiles intersecting with a geometry.
+        
+        Parameters
+        ----------
+        geometry: osgeo.ogr.Geometry
+            the geometry in EPSG:4326
+        
+        Returns
+        -------
+        list[str]
+            the MGRS tile IDs in the order of the KML file
+        """
+        lon_min, lon_max, lat_min, lat_max = geometry.GetEnvelope()
+        rows = self._query('SELECT t.name, t.attributes, t.geometry FROM tiles t '
+                           'JOIN tiles_rtree r ON t.id = r.id '
+                           'WHERE r.lon_max >= ? AND r.lon_min <= ? AND r.lat_max >= ? AND r.lat_min <= ? '
+                           'ORDER BY t.id', (lon_min, lon_max, lat_min, lat_max))
+        self._load(rows)
+        return [x[0] for x in rows if self._geometries[x[0]].Intersects(geometry)]
+
+
+def grid_index(kml):
+    """
+    Get the :class:`GridIndex` of a Sentinel-2 tiling grid KML file.
+    The index is opened once per KML file and kept for the lifetime of the process.
+    Processes forked from it continue to use the in-memory tile cache but open their own database connection.
+    
+    Parameters
+    ----------
+    kml: str
+        Path to the Sentinel-2 tiling grid KML file.
+    
+    Returns
+    -------
+    GridIndex
+        the grid index
+    """
+    key = os.path.realpath(kml)
+    with _lock:
+        if key not in _indices.keys():
+            _indices[key] = GridIndex(kml=kml)
+        return _indices[key]
+
+
+def aoi_from_scene(scene, kml, multi=True, percent=1, tiles=None):
     """
     Get processing AOIs for a SAR scene. The MGRS grid requires a SAR scene to be geocoded to multiple UTM zones
     depending on the overlapping MGRS tiles and their projection. This function returns the following for each
@@ -189,6 +549,10 @@ def aoi_from_scene(scene, kml, multi=True, percent=1):
     percent: int or float
         the minimum overlap in percent of each AOI with the SAR scene.
         See function :func:`S1_NRB.ancillary.buffer_min_overlap`.
+    tiles: list[str] or None
+        the IDs of the MGRS tiles overlapping with the scene, e.g. as computed for all scenes of a processing run
+        with :func:`tile_overlaps`. If None, the tiles are determined with :func:`tile_from_aoi`.
+        Only applies if `multi=True`.
 
     Returns
     -------
@@ -198,8 +562,11 @@ def aoi_from_scene(scene, kml, multi=True, percent=1):
     out = []
     if multi:
         # extract all overlapping tiles
-        with scene.geometry() as geom:
-            tiles = tile_from_aoi(vector=geom, kml=kml, return_geometries=True)
+        if tiles is None:
+            with scene.geometry() as geom:
+                tiles = tile_from_aoi(vector=geom, kml=kml, return_geometries=True)
+        else:
+            tiles = aoi_from_tile(kml=kml, tile=sorted(tiles))
         
         # group tiles by UTM zone
         def fn(x):
@@ -0,0 +1,515 @@
+import os
+import re
+import json
+import time
+import uuid
+import pickle
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pyroSAR.ancillary import Lock
+import S1_NRB.ancillary as anc
+
+
+class FileQueue(object):
+    """
+    Work queue on a shared file system using the file locking mechanism of :class:`pyroSAR.ancillary.Lock`.
+    Each job is stored as a pickle file `<name>.job` in `directory`. Leases are hard locks (`<name>.job.lock`)
+    containing the ID of the worker holding it, which renews their modification time regularly. Leases that
+    have not been renewed for longer than `lease` seconds are considered stale (e.g. because the worker was killed)
+    and are reclaimed by atomically renaming the lock file, so that only one worker can take over a job.
+    The age of a lease is measured with the clock of the shared file system, not that of the individual workers.
+    A worker only renews and removes locks containing its own ID.
+    Finished jobs are marked with a file `<name>.job.done`. If a job fails, the lock is renamed to
+    `<name>.job.error` following the semantics of :class:`~pyroSAR.ancillary.Lock`. Such a job and all jobs
+    depending on it are not run again until the error file has been removed.
+
+    Parameters
+    ----------
+    directory: str
+        the queue directory on a file system shared by all workers. Will be created if it does not exist.
+    lease: int
+        the time in seconds after which a lease that has not been renewed is considered stale
+    """
+    def __init__(self, directory, lease=600):
+        self.directory = directory
+        self.lease_time = lease
+        self.locks = {}
+        self.id = uuid.uuid4().hex
+        os.makedirs(directory, exist_ok=True)
+
+    def __str__(self):
+        return self.directory
+
+    def _file(self, name):
+        return os.path.join(self.directory, re.sub(r'[^\w.-]', '_', name) + '.job')
+
+    def _jobs(self):
+        jobs = []
+        for item in os.listdir(self.directory):
+            if item.endswith('.job'):
+                with open(os.path.join(self.directory, item), 'rb') as f:
+                    jobs.append(pickle.load(f))
+        return sorted(jobs, key=lambda x: (-x['node']['priority'], x['index']))
+
+    def _now(self):
+        """
+        The current time of the shared file system clock, to which the lock modification times refer.
+        """
+        probe = os.path.join(self.directory, f'.clock_{self.id}')
+        with open(probe, 'w'):
+            pass
+        try:
+            return os.path.getmtime(probe)
+        finally:
+            os.remove(probe)
+
+    @staticmethod
+    def _owner(lock):
+        """
+        The ID of the worker holding a lock or None if the lock does not exist.
+        """
+        try:
+            with open(lock, 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _stale(self, lock, now):
+        try:
+            return now - os.path.getmtime(lock) > self.lease_time
+        except FileNotFoundError:
+            return False
+
+    def _reclaim(self, lock, now):
+        """
+        Release a stale lease by renaming the lock file to a unique name.
+        Renaming is atomic, so only one of multiple workers finding the same stale lease succeeds.
+        If the lease has been renewed by its owner in the meantime, the lock is restored.
+        """
+        stale = f'{lock}.stale_{uuid.uuid4().hex}'
+        try:
+            os.rename(lock, stale)
+        except FileNotFoundError:
+            # reclaimed by another worker
+            return
+        if not self._stale(stale, now):
+            try:
+                # link instead of rename: does not replace a lock acquired by another worker in the meantime
+                os.link(stale, lock)
+            except FileExistsError:
+                pass
+        os.remove(stale)
+
+    def _status(self, name, now=None):
+        job = self._file(name)
+        if not os.path.isfile(job):
+            return None
+        if os.path.isfile(job + '.done'):
+            return 'done'
+        if os.path.isfile(job + '.error'):
+            return 'failed'
+        if os.path.isfile(job + '.lock'):
+            now = self._now() if now is None else now
+            if self._stale(job + '.lock', now):
+                # stale lease of a worker that has not renewed it
+                self._reclaim(job + '.lock', now)
+            if os.path.isfile(job + '.lock'):
+                return 'running'
+        return 'pending'
+
+    def submit(self, nodes):
+        """
+        Submit processing nodes to the queue. Jobs that are already contained in the queue are replaced
+        unless they are currently running.
+
+        Parameters
+        ----------
+        nodes: dict[str, dict]
+            the processing nodes. See :func:`S1_NRB.pipeline.execute`.
+
+        Returns
+        -------
+
+        """
+        now = self._now()
+        for i, (name, node) in enumerate(nodes.items()):
+            job = self._file(name)
+            if self._status(name, now) == 'running':
+                continue
+            for ext in ['.done', '.error']:
+                if os.path.isfile(job + ext):
+                    os.remove(job + ext)
+            tmp = job + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump({'name': name, 'index': i, 'node': node}, f)
+            os.replace(tmp, job)
+
+    def lease(self, worker):
+        """
+        Lease the next job whose dependencies have finished.
+
+        Parameters
+        ----------
+        worker: str
+            the worker ID
+
+        Returns
+        -------
+        tuple[str, dict] or None
+            the job name and processing node or None if no job is ready
+        """
+        jobs = self._jobs()
+        now = self._now()
+        status = {job['name']: self._status(job['name'], now) for job in jobs}
+        for job in jobs:
+            name = job['name']
+            if status[name] != 'pending':
+                continue
+            deps = [status.get(x) for x in job['node']['deps']]
+            if not all(x in [None, 'done'] for x in deps):
+                continue
+            try:
+                lock = Lock(self._file(name), timeout=1)
+            except RuntimeError:
+                # acquired by another worker in the meantime
+                continue
+            with open(lock.lock, 'w') as f:
+                f.write(worker)
+            self.locks[name] = (lock, worker)
+            return name, job['node']
+        return None
+
+    def renew(self, name):
+        """
+        Renew the lease of a job.
+
+        Parameters
+        ----------
+        name: str
+            the job name
+
+        Returns
+        -------
+        bool
+            False if the lease has been lost, i.e. it was reclaimed by another worker after it had expired
+        """
+        lock, worker = self.locks[name]
+        if self._owner(lock.lock) != worker:
+            return False
+        os.utime(lock.lock)
+        return True
+
+    def complete(self, name, result=None, error=None):
+        """
+        Mark a leased job as finished.
+
+        Parameters
+        ----------
+        name: str
+            the job name
+        result: Any
+            the return value of the job
+        error: Exception or None
+            the exception raised by the job, if any
+
+        Returns
+        -------
+
+        """
+        lock, worker = self.locks.pop(name)
+        # the lease might have been reclaimed by another worker, whose lock must not be removed
+        owned = self._owner(lock.lock) == worker
+        if error is None:
+            with open(self._file(name) + '.done', 'w') as f:
+                f.write(str(result))
+            if owned:
+                lock.remove()
+        elif owned:
+            # convert the hard lock to an error lock
+            os.rename(lock.lock, lock.error)
+
+    def summary(self):
+        """
+        Count the jobs by status.
+
+        Returns
+        -------
+        dict[str, int]
+            the number of jobs per status: 'pending', 'blocked', 'running', 'done' and 'failed'.
+            Jobs are blocked if one of their dependencies has failed or is blocked.
+        """
+        jobs = self._jobs()
+        now = self._now()
+        status = {job['name']: self._status(job['name'], now) for job in jobs}
+        return _summarize(status, {job['name']: job['node']['deps'] for job in jobs})
+
+
+class SQLiteQueue(object):
+    """
+    Work queue in an SQLite database. Jobs are pickled processing nodes.
+    Leases expire if they are not renewed within `lease` seconds, e.g. because the worker was killed.
+    Failed jobs and all jobs depending on them are not run again until the queue is submitted anew.
+
+    Note that SQLite locking is not reliable on some network file systems (e.g. NFS).
+    In this case, the queue should be accessed on a local file system or :class:`FileQueue` should be used.
+
+    Parameters
+    ----------
+    filename: str
+        the SQLite database file. Will be created if it does not exist.
+    lease: int
+        the time in seconds after which a lease that has not been renewed expires
+    """
+    def __init__(self, filename, lease=600):
+        self.filename = filename
+        self.lease_time = lease
+        self.workers = {}
+        with self._connect() as con:
+            con.execute('''CREATE TABLE IF NOT EXISTS jobs
+                           (name TEXT PRIMARY KEY,
+                            idx INTEGER,
+                            priority INTEGER,
+                            deps TEXT,
+                            node BLOB,
+                            status TEXT,
+                            worker TEXT,
+                            expires REAL,
+                            result TEXT)''')
+
+    def __str__(self):
+        return self.filename
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.filename, timeout=120, isolation_level=None)
+        try:
+            con.execute('BEGIN IMMEDIATE')
+            yield con
+            con.execute('COMMIT')
+        except BaseException:
+            con.execute('ROLLBACK')
+            raise
+        finally:
+            con.close()
+
+    def submit(self, nodes):
+        """
+        Submit processing nodes to the queue. Jobs that are already contained in the queue are replaced
+        unless they are currently running.
+
+        Parameters
+        ----------
+        nodes: dict[str, dict]
+            the processing nodes. See :func:`S1_NRB.pipeline.execute`.
+
+        Returns
+        -------
+
+        """
+        with self._connect() as con:
+            for i, (name, node) in enumerate(nodes.items()):
+                con.execute('''INSERT INTO jobs (name, idx, priority, deps, node, status)
+                               VALUES (?, ?, ?, ?, ?, 'pending')
+                               ON CONFLICT (name) DO UPDATE SET
+                               idx=excluded.idx, priority=excluded.priority, deps=excluded.deps,
+                               node=excluded.node, status='pending', worker=NULL, expires=NULL, result=NULL
+                               WHERE status != 'running' ''',
+                            (name, i, node['priority'], json.dumps(node['deps']), pickle.dumps(node)))
+
+    def lease(self, worker):
+        """
+        Lease the next job whose dependencies have finished.
+
+        Parameters
+        ----------
+        worker: str
+            the worker ID
+
+        Returns
+        -------
+        tuple[str, dict] or None
+            the job name and processing node or None if no job is ready
+        """
+        with self._connect() as con:
+            # release expired leases
+            con.execute('''UPDATE jobs SET status='pending', worker=NULL, expires=NULL
+                           WHERE status='running' AND expires < ?''', (time.time(),))
+            status = dict(con.execute('SELECT name, status FROM jobs').fetchall())
+            rows = con.execute('''SELECT name, deps, node FROM jobs WHERE status='pending'
+                                  ORDER BY priority DESC, idx''').fetchall()
+            for name, deps, node in rows:
+                deps = [status.get(x) for x in json.loads(deps)]
+                if all(x in [None, 'done'] for x in deps):
+                    con.execute('''UPDATE jobs SET status='running', worker=?, expires=?
+                                   WHERE name=?''', (worker, time.time() + self.lease_time, name))
+                    self.workers[name] = worker
+                    return name, pickle.loads(node)
+        return None
+
+    def renew(self, name):
+        """
+        Renew the lease of a job.
+
+        Parameters
+        ----------
+        name: str
+            the job name
+
+        Returns
+        -------
+        bool
+            False if the lease has been lost, i.e. it was released or leased by another worker after it had expired
+        """
+        with self._connect() as con:
+            cursor = con.execute("UPDATE jobs SET expires=? WHERE name=? AND worker=? AND status='running'",
+                                 (time.time() + self.lease_time, name, self.workers[name]))
+            return cursor.rowcount > 0
+
+    def complete(self, name, result=None, error=None):
+        """
+        Mark a leased job as finished.
+
+        Parameters
+        ----------
+        name: str
+            the job name
+        result: Any
+            the return value of the job
+        error: Exception or None
+            the exception raised by the job, if any
+
+        Returns
+        -------
+
+        """
+        if error is None:
+            status, result = 'done', str(result)
+        else:
+            status, result = 'failed', f'{type(error).__name__}: {error}'
+        worker = self.workers.pop(name)
+        with self._connect() as con:
+            # the job might have been leased by another worker after the lease had expired
+            con.execute('''UPDATE jobs SET status=?, result=?, expires=NULL
+                           WHERE name=? AND (worker=? OR worker IS NULL)''',
+                        (status, result, name, worker))
+
+    def summary(self):
+        """
+        Count the jobs by status.
+
+        Returns
+        -------
+        dict[str, int]
+            the number of jobs per status: 'pending', 'blocked', 'running', 'done' and 'failed'.
+            Jobs are blocked if one of their dependencies has failed or is blocked.
+        """
+        with self._connect() as con:
+            con.execute('''UPDATE jobs SET status='pending', worker=NULL, expires=NULL
+                           WHERE status='running' AND expires < ?''', (time.time(),))
+            rows = con.execute('SELECT name, status, deps FROM jobs').fetchall()
+        status = {row[0]: row[1] for row in rows}
+        deps = {row[0]: json.loads(row[2]) for row in rows}
+        return _summarize(status, deps)
+
+
+def _summarize(status, deps):
+    """
+    Helper function to count jobs by status including those blocked by failed dependencies.
+    """
+    blocked = set()
+    changed = True
+    while changed:
+        changed = False
+        for name, value in status.items():
+            if value == 'pending' and name not in blocked:
+                if any(status.get(x) == 'failed' or x in blocked for x in deps[name]):
+                    blocked.add(name)
+                    changed = True
+    out = {key: 0 for key in ['pending', 'blocked', 'running', 'done', 'failed']}
+    for name, value in status.items():
+        out['blocked' if name in blocked else value] += 1
+    return out
+
+
+def get_queue(url):
+    """
+    Get a work queue object.
+
+    Parameters
+    ----------
+    url: str
+        the queue location. A file name ending with `.db` creates a :class:`SQLiteQueue`,
+        anything else is interpreted as a directory for a :class:`FileQueue`.
+
+    Returns
+    -------
+    FileQueue or SQLiteQueue
+    """
+    if url.endswith('.db'):
+        return SQLiteQueue(filename=url)
+    else:
+        return FileQueue(directory=url)
+
+
+def work(queue, logger, poll=30, worker=None):
+    """
+    Process jobs from a work queue until all jobs have finished or are blocked by failed dependencies.
+    The lease of the current job is renewed in a background thread.
+
+    Parameters
+    ----------
+    queue: FileQueue or SQLiteQueue
+        the work queue
+    logger: logging.Logger
+        The log handler for the current process.
+    poll: int or float
+        the time in seconds to wait before checking the queue again if no job is ready
+    worker: str or None
+        the worker ID. Default None: `<hostname>_<process ID>_<random suffix>`.
+
+    Returns
+    -------
+    dict[str, int]
+        the job summary of the queue after finishing. See :meth:`SQLiteQueue.summary`.
+    """
+    if worker is None:
+        worker = f'{socket.gethostname()}_{os.getpid()}_{uuid.uuid4().hex[:6]}'
+    while True:
+        job = queue.lease(worker=worker)
+        if job is None:
+            summary = queue.summary()
+            if summary['pending'] == 0 and summary['running'] == 0:
+                return summary
+            time.sleep(poll)
+            continue
+        name, node = job
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(queue.lease_time / 3):
+                if not queue.renew(name):
+                    print(f'lost the lease of job {name}; it might be processed by another worker')
+                    break
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        if node.get('msg') is not None:
+            print(node['msg'])
+        try:
+            result = node['func'](**node['kwargs'])
+        except Exception as e:
+            stop.set()
+            thread.join()
+            anc.log(handler=logger, mode='exception', proc_step=node['proc_step'],
+                    scenes=node['scenes'], msg=e)
+            queue.complete(name, error=e)
+            continue
+        stop.set()
+        thread.join()
+        if result == 'Already processed - Skip!':
+            print('### ' + result)
+        anc.log(handler=logger, mode='info', proc_step=node['proc_step'],
+                scenes=node['scenes'], msg=result)
+        queue.complete(name, result=result)
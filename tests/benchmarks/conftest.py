@@ -0,0 +1,68 @@
+import os
+import importlib.util
+import pytest
+
+# the benchmarks require the plugin pytest-benchmark
+if importlib.util.find_spec('pytest_benchmark') is None:
+    collect_ignore = ['test_ard.py']
+
+
+def pytest_collection_modifyitems(config, items):
+    # the benchmarks write several GB of data and are only run if explicitly requested;
+    # this hook receives the items of the whole session, so only those of this directory are skipped
+    if config.getoption('benchmark_only', default=False):
+        return
+    skip = pytest.mark.skip(reason='benchmarks are only run with option --benchmark-only')
+    here = os.path.dirname(os.path.abspath(__file__))
+    for item in items:
+        if str(item.fspath).startswith(here):
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope='session')
+def synthetic_dir(tmp_path_factory):
+    """
+    The directory to store the synthetic data in. Set environment variable `S1_NRB_BENCHMARK_DIR`
+    to reuse the data between sessions.
+    """
+    directory = os.environ.get('S1_NRB_BENCHMARK_DIR')
+    if directory is None:
+        return str(tmp_path_factory.mktemp('synthetic'))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+@pytest.fixture(scope='session', params=['IW', 'EW'])
+def synthetic_scene(request, synthetic_dir):
+    """
+    A synthetic scene and its SNAP processing output for each acquisition mode.
+    The tile size can be reduced for quick runs with environment variable `S1_NRB_BENCHMARK_SCALE`,
+    e.g. `0.25` for a quarter of the MGRS tile width and height.
+    """
+    import synthetic
+    scale = float(os.environ.get('S1_NRB_BENCHMARK_SCALE', 1))
+    tile = dict(synthetic.TILE)
+    ext = dict(tile['extent'])
+    ext['xmax'] = ext['xmin'] + round((ext['xmax'] - ext['xmin']) * scale, -2)
+    ext['ymin'] = ext['ymax'] - round((ext['ymax'] - ext['ymin']) * scale, -2)
+    tile['extent'] = ext
+    mode = request.param
+    directory = os.path.join(synthetic_dir, f'{mode}_{scale}')
+    marker = os.path.join(directory, 'complete')
+    if not os.path.isfile(marker):
+        synthetic.create(directory=directory, mode=mode, tile=tile)
+        open(marker, 'w').close()
+    scene = os.path.join(directory, 'scenes', synthetic.scene_name(mode=mode))
+    return {'mode': mode, 'scene': scene, 'sar_dir': os.path.join(directory, 'SAR'),
+            'tile': tile['name'], 'epsg': tile['epsg'], 'extent': ext,
+            'outdir': os.path.join(directory, 'ARD')}
+
+
+@pytest.fixture(autouse=True)
+def offline_osv(monkeypatch):
+    """
+    Avoid searching and downloading orbit state vector files for the synthetic scenes.
+    """
+    from pyroSAR.drivers import SAFE
+    osv = 'S1A_OPER_AUX_POEORB_OPOD_20200728T121213_V20200707T225942_20200709T005942.EOF.zip'
+    monkeypatch.setattr(SAFE, 'getOSV', lambda self, *args, **kwargs: osv)
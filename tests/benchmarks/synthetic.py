@@ -0,0 +1,432 @@
+"""
+Generator of synthetic Sentinel-1 scenes and SNAP processing output for benchmarking the ARD
+product generation without real data and without SNAP.
+
+The following is written for each scene:
+
+- a SAFE folder containing a `manifest.safe` and one annotation XML file per polarization with all
+  elements read by :class:`pyroSAR.drivers.SAFE`, :func:`S1_NRB.metadata.extract.meta_dict` and
+  :func:`S1_NRB.ard.calc_product_start_stop`
+- the SNAP output folder `<sar_dir>/<scene>/<scene>_geo_<epsg>.data` containing ENVI layers named
+  like those found by :func:`S1_NRB.snap.find_datasets`
+- a multi-looking workflow `<sar_dir>/<scene>/<scene>_mli.xml` as read by :func:`S1_NRB.snap.get_metadata`
+"""
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from osgeo import gdal, osr
+
+# an MGRS tile in UTM zone 32N (northern Italy)
+TILE = {'name': '32TNS', 'epsg': 32632,
+        'extent': {'xmin': 499980.0, 'ymin': 5090220.0, 'xmax': 609780.0, 'ymax': 5200020.0}}
+
+MODES = {'IW': {'resolution': 'H', 'pols': ['VV', 'VH'], 'spacing': 10, 'swaths': ['IW1', 'IW2', 'IW3'],
+                'pixel_spacing': 10.0, 'rlks': 5, 'azlks': 1},
+         'EW': {'resolution': 'M', 'pols': ['HH', 'HV'], 'spacing': 40, 'swaths': ['EW1', 'EW2', 'EW3', 'EW4', 'EW5'],
+                'pixel_spacing': 40.0, 'rlks': 3, 'azlks': 1}}
+
+_namespaces = {'safe': 'http://www.esa.int/safe/sentinel-1.0',
+               's1': 'http://www.esa.int/safe/sentinel-1.0/sentinel-1',
+               's1sarl1': 'http://www.esa.int/safe/sentinel-1.0/sentinel-1/sar/level-1',
+               'gml': 'http://www.opengis.net/gml',
+               'xfdu': 'urn:ccsds:schema:xfdu:1'}
+
+
+def scene_name(mode='IW', start=datetime(2020, 7, 8, 18, 26, 14), duration=29):
+    """
+    Create the name of a synthetic Sentinel-1 GRD scene.
+
+    Parameters
+    ----------
+    mode: {'IW', 'EW'}
+        the acquisition mode
+    start: datetime.datetime
+        the acquisition start time
+    duration: int
+        the acquisition duration in seconds
+
+    Returns
+    -------
+    str
+        the SAFE folder name
+    """
+    stop = start + timedelta(seconds=duration)
+    pols = {'VV': 'DV', 'HH': 'DH'}[MODES[mode]['pols'][0]]
+    return 'S1A_{}_GRD{}_1S{}_{}_{}_033367_03DDAA_D160.SAFE'.format(mode, MODES[mode]['resolution'], pols,
+                                                                   start.strftime('%Y%m%dT%H%M%S'),
+                                                                   stop.strftime('%Y%m%dT%H%M%S'))
+
+
+def footprint(extent, epsg, buffer=20000):
+    """
+    Compute the geographic footprint of a scene covering a projected extent plus a buffer.
+
+    Parameters
+    ----------
+    extent: dict
+        the projected extent with keys `xmin`, `ymin`, `xmax` and `ymax`
+    epsg: int
+        the EPSG code of the extent
+    buffer: int or float
+        the buffer in meters
+
+    Returns
+    -------
+    list[tuple[float]]
+        the corner coordinates as (longitude, latitude) tuples in the order
+        lower left, lower right, upper right, upper left
+    """
+    src = osr.SpatialReference()
+    src.ImportFromEPSG(epsg)
+    dst = osr.SpatialReference()
+    dst.ImportFromEPSG(4326)
+    for srs in [src, dst]:
+        srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+    transform = osr.CoordinateTransformation(src, dst)
+    xmin = extent['xmin'] - buffer
+    xmax = extent['xmax'] + buffer
+    ymin = extent['ymin'] - buffer
+    ymax = extent['ymax'] + buffer
+    corners = [(xmin, ymin), (xmax, ymin), (xmax, ymax), (xmin, ymax)]
+    return [transform.TransformPoint(x, y)[:2] for x, y in corners]
+
+
+def write_safe(directory, name, coordinates):
+    """
+    Write a synthetic SAFE folder containing a manifest and annotation files.
+
+    Parameters
+    ----------
+    directory: str
+        the directory to write the SAFE folder to
+    name: str
+        the SAFE folder name, see :func:`scene_name`
+    coordinates: list[tuple[float]]
+        the scene footprint, see :func:`footprint`
+
+    Returns
+    -------
+    str
+        the SAFE folder
+    """
+    mode = name[4:6]
+    prm = MODES[mode]
+    start = datetime.strptime(name[17:32], '%Y%m%dT%H%M%S')
+    stop = datetime.strptime(name[33:48], '%Y%m%dT%H%M%S')
+    fmt = '%Y-%m-%dT%H:%M:%S.%f'
+    safe = os.path.join(directory, name)
+    os.makedirs(os.path.join(safe, 'annotation'), exist_ok=True)
+    # the coordinates are stored as latitude,longitude pairs
+    gml = ' '.join(['{1},{0}'.format(*c) for c in coordinates])
+    pols = ''.join([f'<s1sarl1:transmitterReceiverPolarisation>{p}</s1sarl1:transmitterReceiverPolarisation>'
+                    for p in prm['pols']])
+    ns = ' '.join([f'xmlns:{k}="{v}"' for k, v in _namespaces.items()])
+    manifest = f"""<?xml version="1.0" encoding="UTF-8"?>
+<xfdu:XFDU {ns} version="esa/safe/sentinel-1.0/sentinel-1/sar/level-1/standard/grd">
+  <metadataSection>
+    <metadataObject ID="processing">
+      <metadataWrap><xmlData>
+        <safe:processing name="GRD Post Processing" start="{stop.strftime(fmt)}" stop="{stop.strftime(fmt)}">
+          <safe:facility country="Germany" name="Copernicus S1 Core Ground Segment - DPA" organisation="ESA" site="DLR">
+            <safe:software name="Sentinel-1 IPF" version="003.20"/>
+          </safe:facility>
+        </safe:processing>
+      </xmlData></metadataWrap>
+    </metadataObject>
+    <metadataObject ID="platform">
+      <metadataWrap><xmlData>
+        <safe:platform>
+          <safe:nssdcIdentifier>2014-016A</safe:nssdcIdentifier>
+          <safe:familyName>SENTINEL-1</safe:familyName>
+          <safe:number>A</safe:number>
+          <safe:instrument>
+            <safe:familyName abbreviation="SAR">Synthetic Aperture Radar</safe:familyName>
+            <safe:extension>
+              <s1sarl1:instrumentMode><s1sarl1:mode>{mode}</s1sarl1:mode><s1sarl1:swath>{mode}</s1sarl1:swath></s1sarl1:instrumentMode>
+            </safe:extension>
+          </safe:instrument>
+        </safe:platform>
+      </xmlData></metadataWrap>
+    </metadataObject>
+    <metadataObject ID="measurementOrbitReference">
+      <metadataWrap><xmlData>
+        <safe:orbitReference>
+          <safe:orbitNumber type="start">33367</safe:orbitNumber>
+          <safe:orbitNumber type="stop">33367</safe:orbitNumber>
+          <safe:relativeOrbitNumber type="start">117</safe:relativeOrbitNumber>
+          <safe:relativeOrbitNumber type="stop">117</safe:relativeOrbitNumber>
+          <safe:cycleNumber>201</safe:cycleNumber>
+          <safe:phaseIdentifier>1</safe:phaseIdentifier>
+          <safe:extension>
+            <s1:orbitProperties>
+              <s1:pass>DESCENDING</s1:pass>
+              <s1:ascendingNodeTime>{(start - timedelta(minutes=50)).strftime(fmt)}</s1:ascendingNodeTime>
+            </s1:orbitProperties>
+          </safe:extension>
+        </safe:orbitReference>
+      </xmlData></metadataWrap>
+    </metadataObject>
+    <metadataObject ID="generalProductInformation">
+      <metadataWrap><xmlData>
+        <s1sarl1:standAloneProductInformation>
+          <s1sarl1:productClass>S</s1sarl1:productClass>
+          <s1sarl1:productClassDescription>SAR Standard L1 Product</s1sarl1:productClassDescription>
+          <s1sarl1:productConsolidation>SLICE</s1sarl1:productConsolidation>
+          <s1sarl1:sliceProductFlag>true</s1sarl1:sliceProductFlag>
+          <s1sarl1:segmentStartTime>{start.strftime(fmt)}</s1sarl1:segmentStartTime>
+          <s1sarl1:sliceNumber>5</s1sarl1:sliceNumber>
+          <s1sarl1:totalSlices>10</s1sarl1:totalSlices>
+          <s1sarl1:productTimelinessCategory>Fast-24h</s1sarl1:productTimelinessCategory>
+          <s1sarl1:instrumentConfigurationID>6</s1sarl1:instrumentConfigurationID>
+          <s1sarl1:missionDataTakeID>253354</s1sarl1:missionDataTakeID>
+          {pols}
+          <s1sarl1:productType>GRD</s1sarl1:productType>
+        </s1sarl1:standAloneProductInformation>
+      </xmlData></metadataWrap>
+    </metadataObject>
+    <metadataObject ID="acquisitionPeriod">
+      <metadataWrap><xmlData>
+        <safe:acquisitionPeriod>
+          <safe:startTime>{start.strftime(fmt)}</safe:startTime>
+          <safe:stopTime>{stop.strftime(fmt)}</safe:stopTime>
+          <safe:extension>
+            <s1:timeANX>
+              <s1:startTimeANX>3.000000e+06</s1:startTimeANX>
+              <s1:stopTimeANX>{3.0e6 + (stop - start).total_seconds() * 1000:e}</s1:stopTimeANX>
+            </s1:timeANX>
+          </safe:extension>
+        </safe:acquisitionPeriod>
+      </xmlData></metadataWrap>
+    </metadataObject>
+    <metadataObject ID="measurementFrameSet">
+      <metadataWrap><xmlData>
+        <safe:frameSet><safe:frame><safe:footPrint srsName="http://www.opengis.net/gml/srs/epsg.xml#4326">
+          <gml:coordinates>{gml}</gml:coordinates>
+        </safe:footPrint></safe:frame></safe:frameSet>
+      </xmlData></metadataWrap>
+    </metadataObject>
+  </metadataSection>
+</xfdu:XFDU>
+"""
+    with open(os.path.join(safe, 'manifest.safe'), 'w') as f:
+        f.write(manifest)
+    for i, pol in enumerate(prm['pols']):
+        basename = 's1a-{}-grd-{}-{}-{}-033367-03ddaa-{:03d}.xml'.format(mode.lower(), pol.lower(),
+                                                                         start.strftime('%Y%m%dt%H%M%S'),
+                                                                         stop.strftime('%Y%m%dt%H%M%S'), i + 1)
+        with open(os.path.join(safe, 'annotation', basename), 'w') as f:
+            f.write(_annotation(mode=mode, pol=pol, start=start, stop=stop, coordinates=coordinates))
+    return safe
+
+
+def write_snap_output(scene, sar_dir, extent, epsg, buffer=5000, seed=42):
+    """
+    Write synthetic SNAP processing output of a scene as found by :func:`S1_NRB.snap.find_datasets`.
+    The layers cover `extent` plus a buffer. A diagonal stripe on the western side contains no data
+    as it would be the case for the near range border of a descending scene.
+
+    Parameters
+    ----------
+    scene: str
+        the SAFE folder of the scene
+    sar_dir: str
+        the SAR processing directory
+    extent: dict
+        the projected extent with keys `xmin`, `ymin`, `xmax` and `ymax`
+    epsg: int
+        the EPSG code of the extent
+    buffer: int or float
+        the buffer in meters to add to `extent`
+    seed: int
+        the seed of the random number generator
+
+    Returns
+    -------
+    str
+        the `.data` folder containing the ENVI layers
+    """
+    name = os.path.basename(scene)
+    mode = name[4:6]
+    prm = MODES[mode]
+    spacing = prm['spacing']
+    basename = os.path.splitext(name)[0]
+    scenedir = os.path.join(sar_dir, basename)
+    datadir = os.path.join(scenedir, f'{basename}_geo_{epsg}.data')
+    os.makedirs(datadir, exist_ok=True)
+
+    xmin = extent['xmin'] - buffer
+    ymax = extent['ymax'] + buffer
+    cols = int((extent['xmax'] - extent['xmin'] + 2 * buffer) / spacing)
+    rows = int((extent['ymax'] - extent['ymin'] + 2 * buffer) / spacing)
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(epsg)
+
+    pol1, pol2 = prm['pols']
+    layers = {f'Gamma0_{pol1}': (gdal.GDT_Float32, lambda r, c, rng: rng.gamma(4, 0.025, r.shape)),
+              f'Gamma0_{pol2}': (gdal.GDT_Float32, lambda r, c, rng: rng.gamma(4, 0.005, r.shape)),
+              f'NESZ_{pol1}': (gdal.GDT_Float32, lambda r, c, rng: 0.002 + 0.001 * c / cols),
+              f'NESZ_{pol2}': (gdal.GDT_Float32, lambda r, c, rng: 0.001 + 0.001 * c / cols),
+              'incidenceAngleFromEllipsoid': (gdal.GDT_Float32, lambda r, c, rng: 30 + 16 * c / cols),
+              'localIncidenceAngle': (gdal.GDT_Float32,
+                                      lambda r, c, rng: 30 + 16 * c / cols + rng.normal(0, 5, r.shape)),
+              f'simulatedImage_{pol1}': (gdal.GDT_Float32, lambda r, c, rng: rng.gamma(9, 1 / 9, r.shape)),
+              f'gammaSigmaRatio_{pol1}': (gdal.GDT_Float32,
+                                          lambda r, c, rng: 0.8 + 0.4 * c / cols + rng.normal(0, 0.01, r.shape)),
+              'layoverShadowMask': (gdal.GDT_Byte,
+                                    lambda r, c, rng: rng.choice([0, 1, 2, 3], r.shape, p=[0.97, 0.01, 0.015, 0.005]))}
+
+    rng = np.random.default_rng(seed)
+    driver = gdal.GetDriverByName('ENVI')
+    block = 512
+    for layer, (dtype, fun) in layers.items():
+        outname = os.path.join(datadir, f'{layer}.img')
+        ds = driver.Create(outname, cols, rows, 1, dtype)
+        ds.SetGeoTransform([xmin, spacing, 0, ymax, 0, -spacing])
+        ds.SetProjection(srs.ExportToWkt())
+        band = ds.GetRasterBand(1)
+        for row in range(0, rows, block):
+            n = min(block, rows - row)
+            r, c = np.mgrid[row:row + n, 0:cols]
+            arr = np.asarray(fun(r, c, rng) * np.ones(r.shape))
+            # no data west of a diagonal line crossing the western fifth of the raster
+            invalid = c < cols * (0.05 + 0.15 * r / rows)
+            if dtype == gdal.GDT_Float32:
+                arr = arr.astype('float32')
+                arr[invalid] = np.nan
+            else:
+                arr = arr.astype('uint8')
+                arr[invalid] = 0
+            band.WriteArray(arr, 0, row)
+        band.FlushCache()
+        band = ds = None
+
+    workflow = os.path.join(scenedir, f'{basename}_mli.xml')
+    with open(workflow, 'w') as f:
+        f.write(_workflow_mli(rlks=1, azlks=1))
+    return datadir
+
+
+def create(directory, mode='IW', tile=None):
+    """
+    Create a synthetic scene and its SNAP processing output for an MGRS tile.
+
+    Parameters
+    ----------
+    directory: str
+        the directory to write the data to. The scene is written to subdirectory `scenes`
+        and the SNAP output to subdirectory `SAR`.
+    mode: {'IW', 'EW'}
+        the acquisition mode, which also defines the pixel spacing (IW: 10 m, EW: 40 m)
+    tile: dict or None
+        the tile definition with keys `name`, `epsg` and `extent`. Default: :data:`TILE`.
+
+    Returns
+    -------
+    dict
+        a dictionary with keys `scene` (the SAFE folder), `sar_dir`, `tile`, `epsg` and `extent`
+    """
+    tile = TILE if tile is None else tile
+    scene_dir = os.path.join(directory, 'scenes')
+    sar_dir = os.path.join(directory, 'SAR')
+    coordinates = footprint(extent=tile['extent'], epsg=tile['epsg'])
+    scene = write_safe(directory=scene_dir, name=scene_name(mode=mode), coordinates=coordinates)
+    write_snap_output(scene=scene, sar_dir=sar_dir, extent=tile['extent'], epsg=tile['epsg'])
+    return {'scene': scene, 'sar_dir': sar_dir, 'tile': tile['name'],
+            'epsg': tile['epsg'], 'extent': dict(tile['extent'])}
+
+
+def _annotation(mode, pol, start, stop, coordinates, lines=10, pixels=21):
+    """
+    Helper function to create the content of an annotation XML file.
+    The geolocation grid is interpolated between the footprint corners with azimuth time
+    increasing from north to south (descending orbit).
+    """
+    prm = MODES[mode]
+    fmt = '%Y-%m-%dT%H:%M:%S.%f'
+    ll, lr, ur, ul = [np.asarray(x) for x in coordinates]
+    duration = (stop - start).total_seconds()
+    points = []
+    for i in range(lines):
+        fi = i / (lines - 1)
+        t = start + timedelta(seconds=duration * fi)
+        west = ul + (ll - ul) * fi
+        east = ur + (lr - ur) * fi
+        for j in range(pixels):
+            fj = j / (pixels - 1)
+            lon, lat = west + (east - west) * fj
+            points.append(f"""<geolocationGridPoint><azimuthTime>{t.strftime(fmt)}</azimuthTime>
+<slantRangeTime>{5.3e-3 + 1.2e-3 * fj:.6e}</slantRangeTime><line>{i * 1000}</line><pixel>{j * 1250}</pixel>
+<latitude>{lat:.6f}</latitude><longitude>{lon:.6f}</longitude><height>0</height>
+<incidenceAngle>{30 + 16 * fj:.6f}</incidenceAngle><elevationAngle>{27 + 14 * fj:.6f}</elevationAngle>
+</geolocationGridPoint>""")
+    swath_params = ''.join([f"""<swathProcParams><swath>{swath}</swath>
+<rangeProcessing><windowType>Hamming</windowType><windowCoefficient>0.75</windowCoefficient>
+<totalBandwidth>5.6e+07</totalBandwidth><processingBandwidth>4.2e+07</processingBandwidth>
+<lookBandwidth>4.2e+07</lookBandwidth><numberOfLooks>{prm['rlks']}</numberOfLooks></rangeProcessing>
+<azimuthProcessing><windowType>Hamming</windowType><windowCoefficient>0.7</windowCoefficient>
+<totalBandwidth>4.5e+02</totalBandwidth><processingBandwidth>3.3e+02</processingBandwidth>
+<lookBandwidth>3.3e+02</lookBandwidth><numberOfLooks>{prm['azlks']}</numberOfLooks></azimuthProcessing>
+</swathProcParams>""" for swath in prm['swaths']])
+    quality = ''.join([f"""<qualityData><azimuthTime>{start.strftime(fmt)}</azimuthTime>
+<imageQuality><imageStatistics><outputDataMean>0.1</outputDataMean></imageStatistics>
+<crossCorrelationIslr>{-18.5 - k * 0.1:.2f}</crossCorrelationIslr>
+<crossCorrelationPslr>{-21.0 - k * 0.1:.2f}</crossCorrelationPslr></imageQuality></qualityData>"""
+                       for k in range(len(prm['swaths']))])
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<product>
+<adsHeader><missionId>S1A</missionId><productType>GRD</productType><polarisation>{pol}</polarisation>
+<mode>{mode}</mode><swath>{mode}</swath><startTime>{start.strftime(fmt)}</startTime>
+<stopTime>{stop.strftime(fmt)}</stopTime><absoluteOrbitNumber>33367</absoluteOrbitNumber>
+<missionDataTakeId>253354</missionDataTakeId><imageNumber>001</imageNumber></adsHeader>
+<qualityInformation><productQualityIndex>0.0</productQualityIndex><qualityDataList>{quality}</qualityDataList>
+</qualityInformation>
+<generalAnnotation><productInformation><pass>Descending</pass><timelinessCategory>Fast-24h</timelinessCategory>
+<platformHeading>-1.669e+02</platformHeading><projection>Ground Range</projection>
+<rangeSamplingRate>6.4e+07</rangeSamplingRate><radarFrequency>5.405e+09</radarFrequency>
+<azimuthSteeringRate>1.59</azimuthSteeringRate></productInformation></generalAnnotation>
+<imageAnnotation>
+<imageInformation><productFirstLineUtcTime>{start.strftime(fmt)}</productFirstLineUtcTime>
+<productLastLineUtcTime>{stop.strftime(fmt)}</productLastLineUtcTime>
+<rangePixelSpacing>{prm['pixel_spacing']:e}</rangePixelSpacing>
+<azimuthPixelSpacing>{prm['pixel_spacing']:e}</azimuthPixelSpacing>
+<numberOfSamples>{int(250000 / prm['pixel_spacing'])}</numberOfSamples>
+<numberOfLines>{int(170000 / prm['pixel_spacing'])}</numberOfLines>
+<incidenceAngleMidSwath>3.8e+01</incidenceAngleMidSwath></imageInformation>
+<processingInformation><swathProcParamsList count="{len(prm['swaths'])}">{swath_params}</swathProcParamsList>
+<applicationLutId>Sea</applicationLutId></processingInformation>
+</imageAnnotation>
+<geolocationGrid><geolocationGridPointList count="{len(points)}">{''.join(points)}</geolocationGridPointList>
+</geolocationGrid>
+</product>
+"""
+
+
+def _workflow_mli(rlks, azlks):
+    """
+    Helper function to create the content of a SNAP multi-looking workflow XML file.
+    """
+    return f"""<graph id="Graph">
+  <version>1.0</version>
+  <node id="Read">
+    <operator>Read</operator>
+    <sources/>
+    <parameters class="com.bc.ceres.binding.dom.XppDomElement"><file/></parameters>
+  </node>
+  <node id="Multilook">
+    <operator>Multilook</operator>
+    <sources><sourceProduct refid="Read"/></sources>
+    <parameters class="com.bc.ceres.binding.dom.XppDomElement">
+      <sourceBands/>
+      <nRgLooks>{rlks}</nRgLooks>
+      <nAzLooks>{azlks}</nAzLooks>
+      <outputIntensity>true</outputIntensity>
+      <grSquarePixel>true</grSquarePixel>
+    </parameters>
+  </node>
+  <node id="Write">
+    <operator>Write</operator>
+    <sources><sourceProduct refid="Multilook"/></sources>
+    <parameters class="com.bc.ceres.binding.dom.XppDomElement"><file/><formatName>BEAM-DIMAP</formatName></parameters>
+  </node>
+</graph>
+"""
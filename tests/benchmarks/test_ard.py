@@ -0,0 +1,132 @@
+import os
+import shutil
+from datetime import datetime, timezone
+import pytest
+from S1_NRB import ard
+from S1_NRB.metadata import extract
+
+ROUNDS = int(os.environ.get('S1_NRB_BENCHMARK_ROUNDS', 3))
+
+CONFIG = {'dem_type': 'Copernicus 30m Global DEM', 'etad': False,
+          'meta': {'access_url': None, 'doi': None, 'licence': None,
+                   'processing_center': 'synthetic', 'copy_original': False,
+                   'format': ['OGC', 'STAC']}}
+
+ANNOTATION = ['dm', 'ei', 'id', 'lc', 'li', 'np', 'gs']
+
+CREATION_OPT = ['BLOCKSIZE=512', 'OVERVIEW_RESAMPLING=AVERAGE', 'COMPRESS=LERC_ZSTD', 'MAX_Z_ERROR=0.000000']
+
+
+def _reset(scene, outdir=True):
+    """
+    remove the files created by previous benchmark rounds: the data mask files created by
+    :func:`ard.get_datasets` and optionally the ARD products
+    """
+    if outdir:
+        if os.path.isdir(scene['outdir']):
+            shutil.rmtree(scene['outdir'])
+        os.makedirs(scene['outdir'])
+    base = os.path.splitext(os.path.basename(scene['scene']))[0]
+    datadir = os.path.join(scene['sar_dir'], base, f"{base}_geo_{scene['epsg']}.data")
+    for ext in ['tif', 'gpkg']:
+        fname = os.path.join(datadir, f'datamask.{ext}')
+        if os.path.isfile(fname):
+            os.remove(fname)
+
+
+def _format(scene, outdir=None):
+    return ard.format(config=CONFIG, product_type='NRB', scenes=[scene['scene']],
+                      datadir=scene['sar_dir'], outdir=outdir or scene['outdir'], tile=scene['tile'],
+                      extent=scene['extent'], epsg=scene['epsg'], annotation=ANNOTATION)
+
+
+def _get_datasets(scene):
+    return ard.get_datasets(scenes=[scene['scene']], datadir=scene['sar_dir'],
+                            extent=scene['extent'], epsg=scene['epsg'])
+
+
+@pytest.fixture(scope='session')
+def synthetic_product(synthetic_scene):
+    """
+    an ARD product created from the synthetic scene as input to the benchmarks of individual steps;
+    it is written to a separate directory so that it is not removed by the other benchmarks
+    """
+    outdir = synthetic_scene['outdir'] + '_ref'
+    if not os.path.isdir(outdir) or len(os.listdir(outdir)) == 0:
+        os.makedirs(outdir, exist_ok=True)
+        _format(synthetic_scene, outdir=outdir)
+    out = dict(synthetic_scene)
+    out['ard_dir'] = os.path.join(outdir, os.listdir(outdir)[0])
+    out['src_ids'], out['datasets'] = _get_datasets(synthetic_scene)
+    return out
+
+
+def test_format(benchmark, synthetic_scene):
+    result = benchmark.pedantic(_format, args=(synthetic_scene,), rounds=ROUNDS,
+                                setup=lambda: _reset(synthetic_scene))
+    assert result != 'Already processed - Skip!'
+
+
+def test_get_datasets(benchmark, synthetic_scene):
+    src_ids, datasets = benchmark.pedantic(_get_datasets, args=(synthetic_scene,), rounds=ROUNDS,
+                                           setup=lambda: _reset(synthetic_scene, outdir=False))
+    assert len(src_ids) == 1
+    assert 'datamask' in datasets[0]
+
+
+def test_create_data_mask(benchmark, synthetic_product, tmp_path):
+    outname = str(tmp_path / 'dm.tif')
+
+    def setup():
+        if os.path.isfile(outname):
+            os.remove(outname)
+        # the data masks may have been removed by other benchmarks
+        if not os.path.isfile(synthetic_product['datasets'][0]['datamask']):
+            _get_datasets(synthetic_product)
+
+    benchmark.pedantic(ard.create_data_mask, kwargs={'outname': outname, 'datasets': synthetic_product['datasets'],
+                                                     'extent': synthetic_product['extent'],
+                                                     'epsg': synthetic_product['epsg'], 'driver': 'COG',
+                                                     'creation_opt': CREATION_OPT, 'overviews': [2, 4, 9, 18, 36],
+                                                     'overview_resampling': 'AVERAGE', 'dst_nodata': 255,
+                                                     'product_type': 'NRB'},
+                       setup=setup, rounds=ROUNDS)
+    assert os.path.isfile(outname)
+
+
+def test_create_acq_id_image(benchmark, synthetic_product, tmp_path):
+    outname = str(tmp_path / 'id.tif')
+    measurement = os.path.join(synthetic_product['ard_dir'], 'measurement')
+    ref_tif = os.path.join(measurement, sorted(x for x in os.listdir(measurement) if x.endswith('.tif'))[0])
+
+    def setup():
+        if os.path.isfile(outname):
+            os.remove(outname)
+        # the data masks may have been removed by other benchmarks
+        if not os.path.isfile(synthetic_product['datasets'][0]['datamask']):
+            _get_datasets(synthetic_product)
+
+    benchmark.pedantic(ard.create_acq_id_image, kwargs={'outname': outname, 'ref_tif': ref_tif,
+                                                        'datasets': synthetic_product['datasets'],
+                                                        'src_ids': synthetic_product['src_ids'],
+                                                        'extent': synthetic_product['extent'],
+                                                        'epsg': synthetic_product['epsg'], 'driver': 'COG',
+                                                        'creation_opt': CREATION_OPT, 'overviews': [2, 4, 9, 18, 36],
+                                                        'dst_nodata': 255},
+                       setup=setup, rounds=ROUNDS)
+    assert os.path.isfile(outname)
+
+
+def test_meta_dict(benchmark, synthetic_product):
+    start, stop = ard.calc_product_start_stop(src_ids=synthetic_product['src_ids'],
+                                              extent=synthetic_product['extent'],
+                                              epsg=synthetic_product['epsg'])
+    meta = benchmark.pedantic(extract.meta_dict, kwargs={'config': CONFIG, 'target': synthetic_product['ard_dir'],
+                                                         'src_ids': synthetic_product['src_ids'],
+                                                         'sar_dir': synthetic_product['sar_dir'],
+                                                         'proc_time': datetime.now(timezone.utc),
+                                                         'start': datetime.strptime(start, '%Y%m%dT%H%M%S'),
+                                                         'stop': datetime.strptime(stop, '%Y%m%dT%H%M%S'),
+                                                         'compression': 'LERC_ZSTD', 'product_type': 'NRB'},
+                              rounds=ROUNDS)
+    assert len(meta['source']) == 1
@@ -22,3 +22,16 @@ def kml():
 def stac():
     return {'url': 'https://stac.terrabyte.lrz.de/public/api',
             'collection': 'sentinel-1-grd'}
+
+
+@pytest.fixture
+def asf_mirror(tmp_path):
+    """
+    An offline ASF catalog mirror containing the five scenes of the data take used in test_search.
+    The features are reduced to the properties needed for searching and do not contain footprints.
+    """
+    from S1_NRB.search import ASFMirror
+    td = os.path.dirname(os.path.abspath(__file__))
+    mirror = ASFMirror(filename=str(tmp_path / 'asf.db'), mode='offline')
+    mirror.import_jsonl(os.path.join(td, 'data', 'asf_20200708.jsonl'))
+    return mirror
@@ -0,0 +1,35 @@
+import pytest
+from spatialist.vector import bbox
+from S1_NRB.ancillary import SceneName, buffer_min_overlap, group_by_time
+
+
+def test_scene_name():
+    name = SceneName('/data/S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160.SAFE')
+    assert (name.sensor, name.acquisition_mode, name.product) == ('S1A', 'IW', 'GRD')
+    assert name.polarizations == ['VV', 'VH']
+    assert (name.start, name.stop) == ('20200708T182614', '20200708T182643')
+    assert name.orbitNumber_abs == 33367
+    assert name.frameNumber == 0x03DDAA
+    assert name.uid == 'D160'
+    
+    scenes = ['S1A_IW_GRDH_1SDV_20200708T182643_20200708T182708_033367_03DDAA_9550.zip',
+              'S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160.zip',
+              'S1A_IW_GRDH_1SDV_20200720T182615_20200720T182644_033542_03E2F6_0B35.zip']
+    groups = group_by_time(scenes)
+    assert [[x.uid for x in group] for group in groups] == [['D160', '9550'], ['0B35']]
+
+
+def test_buffer_min_overlap():
+    with bbox({'xmin': 9, 'xmax': 19, 'ymin': 0, 'ymax': 10}, 4326) as geom1, \
+            bbox({'xmin': 0, 'xmax': 10, 'ymin': 0, 'ymax': 10}, 4326) as geom2:
+        # the overlap of 10% is sufficient
+        with buffer_min_overlap(geom1=geom1, geom2=geom2, percent=10) as buffered:
+            assert buffered.extent == geom1.extent
+        # 30% overlap are reached with a buffer of 40% of the width and height of geom1
+        with buffer_min_overlap(geom1=geom1, geom2=geom2, percent=30) as buffered:
+            assert buffered.extent == {'xmin': 7, 'xmax': 21, 'ymin': -2, 'ymax': 12}
+        # the overlap does not depend on the CRS of geom2; 29.5% are reached with a buffer of 39%
+        with geom2.clone() as geom2_utm:
+            geom2_utm.reproject(32632)
+            with buffer_min_overlap(geom1=geom1, geom2=geom2_utm, percent=29.5) as buffered:
+                assert buffered.extent == pytest.approx({'xmin': 7.05, 'xmax': 20.95, 'ymin': -1.95, 'ymax': 11.95})
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import sqlite3
+from S1_NRB import cache, context
+from S1_NRB.cache import DiskCache
+
+
+def test_cache(tmp_path):
+    cache = DiskCache(directory=str(tmp_path), ttl=3600, max_size=None)
+    # keys do not depend on the order of arguments
+    key1 = cache.key(collections=['sentinel-1-grd'], filter={'op': '=', 'args': [{'property': 'platform'}, 'S1A']})
+    key2 = cache.key(filter={'args': [{'property': 'platform'}, 'S1A'], 'op': '='}, collections=['sentinel-1-grd'])
+    assert key1 == key2
+    assert cache.get(key1) is None
+    cache.set(key1, ['a.SAFE', 'b.SAFE'])
+    assert cache.get(key1) == ['a.SAFE', 'b.SAFE']
+    
+    # expired entries are not returned
+    assert DiskCache(directory=str(tmp_path), ttl=0).get(key1) is None
+    
+    # the least recently used entries are removed first
+    key3 = cache.key(collections=['sentinel-1-slc'])
+    cache.set(key3, ['c.SAFE'])
+    past = time.time() - 60
+    os.utime(cache._path(key3), (past, past))
+    cache.get(key1)
+    size = os.path.getsize(cache._path(key1))
+    cache.evict(max_size=size)
+    assert cache.get(key1) == ['a.SAFE', 'b.SAFE']
+    assert cache.get(key3) is None
+
+
+def test_cache_size(tmp_path, monkeypatch):
+    cache = DiskCache(directory=str(tmp_path), max_size=None)
+    size = len(json.dumps({'created': time.time(), 'value': ['a.SAFE']}))
+    cache.max_size = 10 * size + 50
+    scans = []
+    entries = cache._entries
+    
+    def scan():
+        scans.append(1)
+        return entries()
+    
+    monkeypatch.setattr(cache, '_entries', scan)
+    # the directory is not scanned for every new entry, e.g. each page of a search
+    for i in range(10):
+        cache.set(cache.key(page=i), ['a.SAFE'])
+    assert len(scans) == 1
+    # replacing an entry does not increase the size
+    cache.set(cache.key(page=0), ['a.SAFE'])
+    assert len(scans) == 1
+    # the least recently used entries are removed once the limit is exceeded
+    for i in range(10, 15):
+        cache.set(cache.key(page=i), ['a.SAFE'])
+    assert len(scans) > 1
+    assert sum([x[1] for x in entries()]) <= cache.max_size
+    assert cache.get(cache.key(page=14)) == ['a.SAFE']
+
+
+class Handler(object):
+    def __init__(self, scene):
+        self.scene = scene
+        self.meta = {'start': '20200708T182614', 'spacing': (10.0, 10.0), 'coordinates': [(1.0, 2.0)]}
+        # the standardized attributes of pyroSAR.drivers.ID
+        self.locals = ['start', 'spacing']
+        for item in self.locals:
+            setattr(self, item, self.meta[item])
+
+
+def test_identify(tmp_path, monkeypatch):
+    scene = tmp_path / 'S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160.zip'
+    scene.write_bytes(b'0')
+    calls = []
+    
+    def parse(x):
+        calls.append(x)
+        return Handler(x)
+    
+    monkeypatch.setattr(cache.drivers, 'identify', parse)
+    monkeypatch.setattr(cache.drivers, 'Handler', Handler, raising=False)
+    monkeypatch.setattr(cache, '_identified', {})
+    monkeypatch.setattr(context, '_settings', {})
+    cache.configure(directory=str(tmp_path / 'cache'))
+    id1 = cache.identify(str(scene))
+    id2 = cache.identify(str(scene))
+    assert len(calls) == 1
+    # each call returns a new object
+    assert id1 is not id2 and id1.meta == id2.meta
+    
+    # the database is used by new processes; the handler is restored from its metadata
+    monkeypatch.setattr(cache, '_identified', {})
+    id3 = cache.identify(str(scene))
+    assert len(calls) == 1
+    assert isinstance(id3, Handler)
+    assert vars(id3) == vars(id1)
+    assert id3.spacing == (10.0, 10.0) and id3.meta['coordinates'] == [(1.0, 2.0)]
+    
+    # corrupt entries are replaced
+    filename = context.get('identify_cache')
+    con = sqlite3.connect(filename)
+    con.execute("UPDATE handlers SET data = '{\"driver\": '")
+    con.commit()
+    con.close()
+    monkeypatch.setattr(cache, '_identified', {})
+    cache.identify(str(scene))
+    assert len(calls) == 2
+    monkeypatch.setattr(cache, '_identified', {})
+    cache.identify(str(scene))
+    assert len(calls) == 2
+    
+    # entries of other pyroSAR versions are not used
+    monkeypatch.setattr(cache.pyroSAR, '__version__', '0.0.0', raising=False)
+    monkeypatch.setattr(cache, '_identified', {})
+    cache.identify(str(scene))
+    assert len(calls) == 3
+    
+    # modified scenes are identified again
+    scene.write_bytes(b'01')
+    cache.identify(str(scene))
+    assert len(calls) == 4
@@ -0,0 +1,20 @@
+from S1_NRB import context
+
+
+def test_context(monkeypatch):
+    monkeypatch.setattr(context, '_settings', {})
+    context.update(metrics='/path/to/metrics.jsonl', profile={'directory': '/path/to/profiles', 'stages': []})
+    assert context.get('metrics') == '/path/to/metrics.jsonl'
+    assert context.get('dem_store') is None
+    
+    # the snapshot is not affected by later changes
+    settings = context.settings()
+    context.update(profile=None)
+    assert context.get('profile') is None
+    assert 'profile' in settings.keys()
+    
+    # e.g. in a worker process
+    context.activate(settings)
+    assert context.get('profile') == {'directory': '/path/to/profiles', 'stages': []}
+    context.activate({})
+    assert context.settings() == {}
@@ -0,0 +1,56 @@
+import os
+import pytest
+from osgeo import gdal
+from spatialist import bbox
+from S1_NRB.dem import TileStore
+
+
+def create_tile(filename, x, y):
+    # a small 1x1 degree DEM tile
+    dataset = gdal.GetDriverByName('GTiff').Create(filename, 10, 10, 1, gdal.GDT_Float32)
+    dataset.SetGeoTransform([x, 0.1, 0, y + 1, 0, -0.1])
+    dataset.SetProjection('EPSG:4326')
+    dataset.GetRasterBand(1).Fill(100)
+    dataset = None
+
+
+def test_tile_store(tmp_path):
+    dem_type = 'Copernicus 30m Global DEM'
+    seed = tmp_path / 'seed'
+    seed.mkdir()
+    for x in [11, 12]:
+        create_tile(str(seed / f'Copernicus_DSM_COG_10_N46_00_E0{x}_00_DEM.tif'), x=x, y=46)
+    store = TileStore(directory=str(tmp_path / 'store'), offline=True)
+    assert store.seed(directory=str(seed), dem_type=dem_type) == ['N46_E011', 'N46_E012']
+    
+    ext = {'xmin': 11.2, 'xmax': 12.5, 'ymin': 46.2, 'ymax': 46.8}
+    with bbox(coordinates=ext, crs=4326) as vec:
+        files = store.load(geometries=[vec], dem_type=dem_type)
+        assert [os.path.basename(x) for x in files] == ['N46_E011.tif', 'N46_E012.tif']
+        vrt = str(tmp_path / 'dem.vrt')
+        store.load(geometries=[vec], dem_type=dem_type, vrt=vrt)
+        assert gdal.Open(vrt).RasterCount == 1
+    
+    # the pixel spacing is only defined up to 90 degrees latitude
+    ext = {'xmin': 11.2, 'xmax': 11.5, 'ymin': -89.8, 'ymax': -89.5}
+    with bbox(coordinates=ext, crs=4326) as vec:
+        with pytest.raises(RuntimeError, match='no resolution'):
+            store._buildvrt(files=[], vrt=str(tmp_path / 'pole.vrt'), geometries=[vec], dem_type=dem_type,
+                            product='dem', buffer=0.5, crop=True)
+    
+    # tiles missing in an offline store are not silently skipped
+    ext = {'xmin': 13.2, 'xmax': 13.5, 'ymin': 46.2, 'ymax': 46.8}
+    with bbox(coordinates=ext, crs=4326) as vec:
+        with pytest.raises(RuntimeError):
+            store.load(geometries=[vec], dem_type=dem_type)
+    
+    # recently used tiles are kept, e.g. for other processes that have not read their VRT yet
+    store.evict(max_size=0, grace=3600)
+    assert os.path.isfile(files[0]) and os.path.isfile(files[1])
+    
+    # the least recently used tiles are removed first
+    ext = {'xmin': 11.2, 'xmax': 11.5, 'ymin': 46.2, 'ymax': 46.8}
+    with bbox(coordinates=ext, crs=4326) as vec:
+        store.load(geometries=[vec], dem_type=dem_type)
+    store.evict(max_size=os.path.getsize(files[0]))
+    assert os.path.isfile(files[0]) and not os.path.isfile(files[1])
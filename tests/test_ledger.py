@@ -0,0 +1,45 @@
+import os
+from S1_NRB.ledger import Ledger, fingerprint, tile_name
+
+
+def test_ledger(tmp_path):
+    ledger = Ledger(filename=str(tmp_path / 'ledger.db'))
+    scene = 'S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160'
+    ledger.set(kind='scene', name=scene, status='pending', fingerprint='abc', inputs=[scene])
+    assert not ledger.is_done(kind='scene', name=scene)
+    with ledger.unit(kind='scene', name=scene):
+        pass
+    assert ledger.is_done(kind='scene', name=scene, fingerprint='abc', inputs=[scene])
+    assert not ledger.is_done(kind='scene', name=scene, fingerprint='def')
+    
+    # a failed unit is recorded with its error message
+    name = tile_name(tile='32TNT', scenes=[scene + '.zip'])
+    try:
+        with ledger.unit(kind='tile', name=name):
+            raise RuntimeError('crash')
+    except RuntimeError:
+        pass
+    record = ledger.get(kind='tile', name=name)
+    assert record['status'] == 'failed'
+    assert record['message'] == 'RuntimeError: crash'
+    
+    # only files recorded as finished layers are kept when resuming a product
+    product = tmp_path / 'product'
+    os.makedirs(product)
+    finished = str(product / 'finished.tif')
+    unfinished = str(product / 'unfinished.tif')
+    for item in [finished, unfinished]:
+        open(item, 'w').close()
+    with ledger.unit(kind='layer', name=finished):
+        pass
+    assert ledger.cleanup(directory=str(product)) == [unfinished]
+    assert os.path.isfile(finished)
+
+
+def test_fingerprint():
+    config = {'product': 'GRD', 'acq_mode': 'IW', 'measurement': 'gamma', 'annotation': ['dm', 'ei'],
+              'dem_type': 'Copernicus 30m Global DEM', 'etad': False, 'meta': {'format': ['OGC', 'STAC']},
+              'mode': ['sar', 'nrb']}
+    # the tiles of an ARD-only run are recognized as finished
+    assert fingerprint(config, kind='tile') == fingerprint(dict(config, mode=['nrb']), kind='tile')
+    assert fingerprint(config, kind='tile') != fingerprint(dict(config, mode=['orb']), kind='tile')
@@ -0,0 +1,40 @@
+import os
+import json
+import pytest
+from S1_NRB import metrics, context
+
+
+def test_metrics(tmp_path, monkeypatch):
+    # the run context is reset after the test
+    monkeypatch.setattr(context, '_settings', {})
+    filename = metrics.configure(directory=str(tmp_path))
+    with metrics.measure('ard', unit='32TNT'):
+        with metrics.measure('ard.gdalwarp', layer='vv-g-lin'):
+            pass
+    with pytest.raises(RuntimeError):
+        with metrics.measure('ard', unit='32TNS'):
+            raise RuntimeError('crash')
+    records = metrics.read(filename)
+    assert [(x['step'], x['unit'], x['status']) for x in records] == \
+           [('ard.gdalwarp', '32TNT', 'done'), ('ard', '32TNT', 'done'), ('ard', '32TNS', 'failed')]
+    assert records[0]['layer'] == 'vv-g-lin'
+    assert all(x['peak_rss'] > 0 for x in records)
+    
+    metrics.finalize()
+    with open(os.path.join(str(tmp_path), 'metrics.prom')) as f:
+        prom = f.read()
+    assert 's1_nrb_step_runs_total{step="ard"} 2' in prom
+    assert 's1_nrb_step_failures_total{step="ard"} 1' in prom
+    
+    metrics.finalize(trace=True)
+    with open(filename.replace('_metrics.jsonl', '_trace.json')) as f:
+        trace = json.load(f)
+    spans = [x for x in trace['traceEvents'] if x['ph'] == 'X']
+    assert [x['name'] for x in spans] == ['ard.gdalwarp', 'ard', 'ard']
+    # the nested step lies within the enclosing one on the same track
+    inner, outer = spans[:2]
+    assert inner['tid'] == outer['tid'] and inner['pid'] == outer['pid']
+    assert outer['ts'] <= inner['ts'] and inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur'] + 1
+    assert inner['args'] == {'unit': '32TNT', 'status': 'done', 'layer': 'vv-g-lin', 'cpu': records[0]['cpu'],
+                             'read_bytes': records[0]['read_bytes'], 'write_bytes': records[0]['write_bytes'],
+                             'peak_rss': records[0]['peak_rss']}
@@ -0,0 +1,115 @@
+import time
+import logging
+import pytest
+from S1_NRB import pipeline
+from S1_NRB.pipeline import execute
+
+calls = []
+initialized = None
+
+
+def _run(name, fail=False, record=None, sleep=0):
+    calls.append(name)
+    start = time.time()
+    time.sleep(sleep)
+    if record is not None:
+        # the worker processes do not share the list of calls
+        with open(record, 'a') as f:
+            f.write(f'{name} {initialized} {start} {time.time()}\n')
+    if fail:
+        raise RuntimeError(f'{name} failed')
+    return name
+
+
+def _init(value):
+    global initialized
+    initialized = value
+
+
+def _read(record):
+    with open(record) as f:
+        rows = [line.split() for line in f]
+    return {name: (init, float(start), float(stop)) for name, init, start, stop in rows}
+
+
+def _node(name, deps=None, priority=0, fail=False, pool='sar', **kwargs):
+    return {'func': _run, 'kwargs': dict(name=name, fail=fail, **kwargs), 'deps': deps or [], 'pool': pool,
+            'priority': priority, 'proc_step': 'TEST', 'scenes': name, 'msg': None}
+
+
+def test_execute():
+    logger = logging.getLogger('test')
+    workers = {'sar': 1}
+    
+    # nodes are started after their dependencies in the order of their priority;
+    # dependencies not contained in the graph are considered finished
+    calls.clear()
+    nodes = {'a': _node('a'),
+             'b': _node('b', deps=['a'], priority=2),
+             'c': _node('c', priority=1),
+             'd': _node('d', deps=['c', 'x'])}
+    status = execute(nodes=nodes, workers=workers, logger=logger)
+    assert calls == ['c', 'a', 'b', 'd']
+    assert set(status.values()) == {'done'}
+    
+    # nodes depending on a failed node are skipped while independent nodes continue;
+    # the first error is raised after all possible nodes have been executed
+    calls.clear()
+    nodes = {'a': _node('a', fail=True, priority=2),
+             'b': _node('b', deps=['a']),
+             'c': _node('c', deps=['b']),
+             'd': _node('d', fail=True, priority=1),
+             'e': _node('e')}
+    with pytest.raises(RuntimeError, match='a failed'):
+        execute(nodes=nodes, workers=workers, logger=logger)
+    assert calls == ['a', 'd', 'e']
+    
+    # cycles are detected
+    nodes = {'a': _node('a', deps=['b']),
+             'b': _node('b', deps=['a'])}
+    with pytest.raises(RuntimeError, match='cycle'):
+        execute(nodes=nodes, workers=workers, logger=logger)
+
+
+def test_execute_pools(tmp_path, monkeypatch):
+    logger = logging.getLogger('test')
+    workers = {'sar': 2, 'ard': 2}
+    initializers = {'sar': (_init, ('sar',)), 'ard': (_init, ('ard',))}
+    
+    # nodes are started after their dependencies in the worker pools
+    record = str(tmp_path / 'record1.txt')
+    nodes = {'a': _node('a', record=record, sleep=0.2),
+             'b': _node('b', record=record),
+             'c': _node('c', deps=['a', 'b'], pool='ard', record=record),
+             'd': _node('d', deps=['c'], record=record)}
+    status = execute(nodes=nodes, workers=workers, logger=logger, initializers=initializers)
+    assert set(status.values()) == {'done'}
+    runs = _read(record)
+    assert runs['c'][1] >= max(runs['a'][2], runs['b'][2])
+    assert runs['d'][1] >= runs['c'][2]
+    # each pool is set up with its own initializer
+    assert [runs[x][0] for x in 'abcd'] == ['sar', 'sar', 'ard', 'sar']
+    
+    # nodes depending on a failed node are skipped while independent nodes continue;
+    # the first error is raised after all possible nodes have been executed
+    record = str(tmp_path / 'record2.txt')
+    nodes = {'a': _node('a', fail=True, record=record),
+             'b': _node('b', deps=['a'], pool='ard', record=record),
+             'c': _node('c', deps=['b'], record=record),
+             'd': _node('d', fail=True, record=record, sleep=0.5),
+             'e': _node('e', pool='ard', record=record, sleep=0.5)}
+    with pytest.raises(RuntimeError, match='a failed'):
+        execute(nodes=nodes, workers=workers, logger=logger, initializers=initializers)
+    assert sorted(_read(record).keys()) == ['a', 'd', 'e']
+    
+    # on interruption, the running nodes are not waited for
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt
+    
+    monkeypatch.setattr(pipeline, 'wait', interrupt)
+    nodes = {'a': _node('a', sleep=3),
+             'b': _node('b', deps=['a'])}
+    start = time.time()
+    with pytest.raises(KeyboardInterrupt):
+        execute(nodes=nodes, workers=workers, logger=logger, initializers=initializers)
+    assert time.time() - start < 2
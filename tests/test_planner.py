@@ -0,0 +1,26 @@
+from S1_NRB.planner import read_timings, estimate
+
+
+def test_planner(tmp_path):
+    scene = 'S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160.zip'
+    lines = [f'[2023-05-05 10:00:00,000] [    INFO] [    SAR] -- {scene} -- 600.0',
+             f'[2023-05-05 10:05:00,000] [    INFO] [    SAR] -- {scene} -- Already processed - Skip!',
+             f"[2023-05-05 10:10:00,000] [    INFO] [    NRB] -- ['{scene}'] -- 300.0",
+             f'[2023-05-05 10:15:00,000] [ WARNING] [    NRB] -- {scene} -- skipped due to a failed dependency']
+    with open(tmp_path / '20230505T1000_process.log', 'w') as f:
+        f.write('\n'.join(lines))
+    timings = read_timings(log_dir=str(tmp_path))
+    assert timings == {'sar': {'GRD': [600.0]}, 'ard': [300.0]}
+
+    graph = {'scenes': [{'name': scene, 'product': 'GRD', 'status': 'todo'}],
+             'tiles': [{'name': 'ard:32TNT:0', 'status': 'todo'},
+                       {'name': 'ard:32TNS:1', 'status': 'done'}]}
+    calibration = {'sar_seconds': {'GRD': 600.0, 'all': 600.0}, 'ard_seconds': 300.0,
+                   'sar_bytes': 2 * 1024 ** 3, 'ard_bytes': None}
+    est = estimate(graph=graph, calibration=calibration, gpt_args=['-J-Xmx10G -c 8G -q 4'],
+                   gdal_threads=2, gdal_cache=1024 ** 3, sar_workers=2, ard_workers=2)
+    assert est['tiles'] == 1
+    assert est['cpu_hours'] == (600 * 4 + 300 * 2) / 3600
+    assert est['wall_hours'] == (600 / 2 + 300 / 2) / 3600
+    assert est['peak_ram_bytes'] == 10 * 1024 ** 3 * 1.2 + 1024 ** 3
+    assert est['disk_bytes'] is None
@@ -0,0 +1,36 @@
+import os
+from S1_NRB.ard import find_products
+from S1_NRB.ledger import Ledger, tile_name
+from S1_NRB.processor import _tile_outputs
+
+
+def test_tile_outputs(tmp_path):
+    led = Ledger(filename=str(tmp_path / 'ledger.db'))
+    scenes = ['S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160.zip']
+    name = tile_name(tile='32TNT', scenes=scenes)
+    outdir = tmp_path / '32TNT'
+    assert find_products(outdir=str(outdir), scenes=scenes, product_type='NRB', tile='32TNT') == []
+
+    # a product created before the ledger was introduced is skipped or updated in place
+    product = outdir / 'S1A_IW_NRB__1SDV_20200708T182614_033367_03DDAA_32TNT_5F2A'
+    os.makedirs(product)
+    os.makedirs(outdir / 'S1A_IW_ORB__1SDV_20200708T182614_033367_03DDAA_32TNT_9C41')
+    existing = find_products(outdir=str(outdir), scenes=scenes, product_type='NRB', tile='32TNT')
+    assert existing == [str(product)]
+    assert _tile_outputs(led=led, name=name, fingerprint='abc', inputs=scenes,
+                         existing=existing) == (True, [str(product)])
+    assert _tile_outputs(led=led, name=name, fingerprint='abc', inputs=scenes,
+                         existing=existing, update=True) == (False, [str(product)])
+
+    # an unfinished product is resumed, a finished one skipped
+    led.set(kind='tile', name=name, status='running', fingerprint='abc', inputs=scenes, outputs=[str(product)])
+    assert _tile_outputs(led=led, name=name, fingerprint='abc', inputs=scenes,
+                         existing=existing) == (False, [str(product)])
+    led.set(kind='tile', name=name, status='done')
+    assert _tile_outputs(led=led, name=name, fingerprint='abc', inputs=scenes,
+                         existing=existing) == (True, [str(product)])
+
+    # an outdated product is removed
+    assert _tile_outputs(led=led, name=name, fingerprint='def', inputs=scenes,
+                         existing=existing) == (False, None)
+    assert not os.path.isdir(product)
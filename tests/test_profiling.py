@@ -0,0 +1,36 @@
+import os
+import time
+import pstats
+from S1_NRB import profiling, context
+
+
+def _work():
+    end = time.time() + 0.1
+    while time.time() < end:
+        sum(range(1000))
+
+
+def test_profiling(tmp_path, monkeypatch):
+    # the run context is reset after the test
+    monkeypatch.setattr(context, '_settings', {})
+    outdir = profiling.configure(directory=str(tmp_path), stages=['ard.format', 'extract.meta_dict'])
+    with profiling.profile('ard.format', unit='32TNT'):
+        with profiling.profile('extract.meta_dict'):
+            _work()
+        with profiling.profile('stac.parse'):
+            _work()
+    unitdir = os.path.join(outdir, '32TNT')
+    assert sorted(os.listdir(unitdir)) == ['ard.format.collapsed', 'ard.format.prof',
+                                           'extract.meta_dict.collapsed']
+    stats = pstats.Stats(os.path.join(unitdir, 'ard.format.prof'))
+    assert any(func[2] == '_work' for func in stats.stats)
+    with open(os.path.join(unitdir, 'extract.meta_dict.collapsed')) as f:
+        lines = f.read().splitlines()
+    assert any('_work (test_profiling.py' in line for line in lines)
+    assert all(line.split(' ')[-1].isdigit() for line in lines)
+    
+    # profiling is disabled again
+    assert profiling.configure(directory=str(tmp_path), stages=None) is None
+    with profiling.profile('ard.format', unit='32TNS'):
+        pass
+    assert not os.path.isdir(os.path.join(outdir, '32TNS'))
@@ -1,4 +1,7 @@
-from S1_NRB.search import STACArchive, ASFArchive, collect_neighbors, scene_select
+import os
+from S1_NRB.search import STACArchive, STACScene, ASFArchive, ASFMirror, asf_select, collect_neighbors, \
+    collect_neighbors_many, datatake_key, scene_select, union
+from S1_NRB.tile_extraction import aoi_from_tile
 
 
 def test_stac(stac):
@@ -7,6 +10,21 @@ def test_stac(stac):
     scenes = archive.select(sensor='S1A', mindate='20200708T182600',
                             maxdate='20200708T182800', check_exist=False)
     assert len(scenes) == 4
+    # retrieving the result in pages of one item gives the same scenes
+    pages = archive.iselect(sensor='S1A', mindate='20200708T182600',
+                            maxdate='20200708T182800', check_exist=False, page_size=1)
+    assert sorted(pages) == scenes
+    # metadata handlers from the item properties without opening the scenes
+    ids = archive.identify_many(scenes=scenes, sortkey='start')
+    assert all(isinstance(x, STACScene) for x in ids)
+    assert [x.sensor for x in ids] == ['S1A'] * 4
+    assert [x.start for x in ids] == sorted([os.path.basename(x).split('_')[4] for x in scenes])
+    # only the metadata of the most recently selected scenes is kept
+    archive = STACArchive(url=stac['url'],
+                          collections=[stac['collection']], max_meta=2)
+    scenes = archive.select(sensor='S1A', mindate='20200708T182600',
+                            maxdate='20200708T182800', check_exist=False)
+    assert sorted(archive.scenes_meta.keys()) == scenes[-2:]
 
 
 def test_asf():
@@ -15,8 +33,13 @@ def test_asf():
                                 mindate='20200708T182600', maxdate='20200708T182800',
                                 return_value='ASF')
         assert len(scenes) == 4
+        # the ASF frame numbers of the slices differ but they belong to the same data take
+        assert len(set(datatake_key(x) for x in scenes)) == 1
         neighbors = collect_neighbors(archive=archive, scene=scenes[0])
         assert len(neighbors) == 2
+        # one query for the whole data take gives the same result as one query per scene
+        neighbors_many = collect_neighbors_many(archive=archive, scenes=scenes)
+        assert sorted(neighbors_many[0]) == sorted(neighbors)
 
 
 def test_scene_select(kml):
@@ -54,3 +77,64 @@ def test_aoi_date(kml):
                                      aoi_tiles=['33TUM'])
     assert len(scenes) == 2
     assert len(tiles) == 1
+
+
+def test_union(kml):
+    # two neighboring tiles in different UTM zones
+    tiles = aoi_from_tile(kml=kml, tile=['32TQS', '33TUM'])
+    with union(tiles) as site:
+        assert site.nfeatures == 1
+        assert site.getProjection('epsg') == 4326
+        ext = site.extent
+    for tile in tiles:
+        with tile.clone() as vec:
+            vec.reproject(4326)
+            assert ext['xmin'] <= vec.extent['xmin'] and vec.extent['xmax'] <= ext['xmax']
+        tile.close()
+
+
+def test_asf_mirror(asf_mirror, tmp_path):
+    names = asf_select(sensor='S1A', product='GRD', acquisition_mode='IW',
+                       mindate='20200708T182600', maxdate='20200708T182800',
+                       return_value='sceneName', mirror=asf_mirror)
+    assert len(names) == 4
+    names = asf_select(sensor='S1A', product='GRD', acquisition_mode='IW',
+                       mindate='20200708T182600', maxdate='20200708T182800',
+                       return_value='sceneName', date_strict=False, mirror=asf_mirror)
+    assert len(names) == 5
+    # the content can be transferred to another mirror
+    asf_mirror.export_jsonl(str(tmp_path / 'asf.jsonl'))
+    mirror = ASFMirror(filename=str(tmp_path / 'asf2.db'), mode='offline')
+    mirror.import_jsonl(str(tmp_path / 'asf.jsonl'))
+    assert asf_select(sensor='S1A', product='GRD', acquisition_mode='IW',
+                      mindate='20200708T182600', maxdate='20200708T182800',
+                      return_value='sceneName', date_strict=False, mirror=mirror) == names
+
+
+def test_asf_mirror_online(tmp_path, monkeypatch):
+    from datetime import datetime
+    from S1_NRB import search
+    
+    def fail(**kwargs):
+        raise RuntimeError('the ASF catalog must not be searched')
+    
+    monkeypatch.setattr(search, '_asf_search', fail)
+    mirror = ASFMirror(filename=str(tmp_path / 'asf.db'), mode='online')
+    features = []
+    for name, x in [('S1A_IW_GRDH_1SDV_20200708T182614_20200708T182643_033367_03DDAA_D160', 11),
+                    ('S1A_IW_GRDH_1SDV_20200708T182643_20200708T182708_033367_03DDAA_9550', 13)]:
+        geometry = {'type': 'Polygon', 'coordinates': [[[x, 46], [x + 1, 46], [x + 1, 47], [x, 47], [x, 46]]]}
+        features.append({'type': 'Feature', 'geometry': geometry,
+                         'properties': {'sceneName': name, 'platform': 'Sentinel-1A', 'processingLevel': 'GRD_HD',
+                                        'beamModeType': 'IW', 'startTime': '2020-07-08T18:26:14.000Z',
+                                        'stopTime': '2020-07-08T18:26:43.000Z'}})
+    mirror._insert(features)
+    with mirror._connect() as con:
+        con.execute('INSERT INTO searches VALUES (?, ?, ?, ?)',
+                    ('["Sentinel-1A", ["GRD_HD"], ["IW"]]', '2020-07-08T18:25:00.000000',
+                     '2020-07-08T18:30:00.000000', 0))
+    # a search with a geometry within a covered time range is served from the mirror
+    result = mirror.search(platform='Sentinel-1A', processing_level='GRD_HD', beam_mode='IW',
+                           start=datetime(2020, 7, 8, 18, 26), stop=datetime(2020, 7, 8, 18, 28),
+                           geometry='POLYGON ((11.2 46.2, 11.8 46.2, 11.8 46.8, 11.2 46.8, 11.2 46.2))')
+    assert [x['properties']['sceneName'] for x in result] == [features[0]['properties']['sceneName']]
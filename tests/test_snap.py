@@ -0,0 +1,29 @@
+import pytest
+from S1_NRB.snap import gpt_resources, gpt_workers, _parse_bytes
+
+
+def test_gpt_resources():
+    assert _parse_bytes('2048M') == 2048 * 1024 ** 2
+    assert _parse_bytes('100g') == 100 * 1024 ** 3
+    assert _parse_bytes('512') == 512
+    with pytest.raises(ValueError):
+        _parse_bytes('1.5G')
+    assert gpt_resources(None) == {'memory': None, 'threads': None}
+    assert gpt_resources(['-J-Xmx100G -c 75G', '-q 30']) == {'memory': 100 * 1024 ** 3, 'threads': 30}
+
+
+def test_gpt_workers():
+    gb = 1024 ** 3
+    args = ['-J-Xmx50G -q 8']
+    # limited by the CPU cores: 32 // 8
+    assert gpt_workers(args, cores=32, ram=1024 * gb) == 4
+    # limited by the memory: 256G // (50G * 1.2)
+    assert gpt_workers(args, cores=64, ram=256 * gb) == 4
+    assert gpt_workers(args, cores=64, ram=256 * gb, max_workers=2) == 2
+    # the resources of concurrently running ARD workers are not available
+    assert gpt_workers(args, cores=32, ram=1024 * gb, reserved_threads=16) == 2
+    assert gpt_workers(args, cores=64, ram=256 * gb, reserved_memory=100 * gb) == 2
+    # at least one worker
+    assert gpt_workers(args, cores=8, ram=16 * gb, reserved_threads=8) == 1
+    # sequential processing if the heap size is unknown
+    assert gpt_workers(['-q 8'], cores=64, ram=1024 * gb) == 1
@@ -0,0 +1,77 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from spatialist.vector import Vector, wkt2vector
+from S1_NRB.tile_extraction import GridIndex, aoi_from_tile, description2dict, tile_from_aoi, tile_overlaps
+
+_index = None
+
+
+def _extent(tile):
+    # run in a forked worker process using the index opened by the parent
+    return os.getpid(), _index.extent(tile=tile, epsg=32632)
+
+
+def test_grid_index(kml, tmp_path):
+    index = GridIndex(kml=kml, filename=str(tmp_path / 'grid.sqlite'))
+    # the attributes in the index are identical to those in the KML file
+    with Vector(kml, driver='KML') as vec:
+        feat = vec.getFeatureByAttribute('Name', '33TUM')
+        assert index.attributes('33TUM') == description2dict(feat.GetField('Description'))
+        feat = None
+    # a tile overlaps with its own footprint
+    with aoi_from_tile(kml=kml, tile='33TUM') as tile:
+        tile.reproject(4326)
+        assert '33TUM' in tile_from_aoi(vector=tile, kml=kml)
+    # an existing index is not rebuilt
+    mtime = os.path.getmtime(index.filename)
+    with GridIndex(kml=kml, filename=index.filename):
+        assert os.path.getmtime(index.filename) == mtime
+    # reprojected extents are snapped to 10 m and shared via the database
+    attrib = index.attributes('33TUM')
+    with wkt2vector(attrib['UTM_WKT'], attrib['EPSG']) as tmp:
+        tmp.reproject(32632)
+        ext = {k: round(v / 10) * 10 for k, v in tmp.extent.items()}
+    assert index.extent(tile='33TUM', epsg=32632) == ext
+    with GridIndex(kml=kml, filename=index.filename) as index2:
+        assert index2._query('SELECT count(*) FROM extents', ())[0][0] == 1
+        assert index2.extent(tile='33TUM', epsg=32632) == ext
+    index.close()
+
+
+def test_grid_index_fork(kml, tmp_path):
+    global _index
+    index = GridIndex(kml=kml, filename=str(tmp_path / 'grid.sqlite'))
+    _index = index
+    # the parent has an open connection when the workers are forked
+    ext = index.extent(tile='33TUM', epsg=32632)
+    tiles = ['32TQS', '32TQT', '33TUN', '33TUL']
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('fork')) as pool:
+        results = list(pool.map(_extent, tiles))
+    assert all(pid != os.getpid() for pid, _ in results)
+    # the extents written by the workers are stored in the database and the parent connection is still usable
+    assert index._query('SELECT count(*) FROM extents', ())[0][0] == 5
+    assert index.extent(tile='33TUM', epsg=32632) == ext
+    with GridIndex(kml=kml, filename=index.filename) as index2:
+        for tile, (_, extent) in zip(tiles, results):
+            assert index2.extent(tile=tile, epsg=32632) == extent
+    index.close()
+    _index = None
+
+
+def test_tile_overlaps(kml):
+    footprints = aoi_from_tile(kml=kml, tile=['32TQS', '33TUM'])
+    for footprint in footprints:
+        footprint.reproject(4326)
+    overlaps, tiles = tile_overlaps(vectors=footprints, kml=kml)
+    assert overlaps.shape == (2, len(tiles))
+    # each footprint fully covers its own tile and only partially covers the others
+    for i, tile in enumerate(['32TQS', '33TUM']):
+        row = dict(zip([tiles[j] for j in overlaps[i].indices], overlaps[i].data))
+        assert row[tile] > 0.99
+        assert all(v < 0.99 for k, v in row.items() if k != tile)
+    # the selection can be limited to certain tiles
+    overlaps, tiles = tile_overlaps(vectors=footprints, kml=kml, tilenames=['33TUM'])
+    assert tiles == ['33TUM']
+    for footprint in footprints:
+        footprint.close()
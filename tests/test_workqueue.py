@@ -0,0 +1,61 @@
+import os
+import logging
+import pytest
+from S1_NRB.workqueue import FileQueue, SQLiteQueue, work
+
+
+def _node(deps, priority=0, fail=False):
+    func = int if fail else dict
+    kwargs = {'x': 'a'} if fail else {'a': 1}
+    return {'func': func, 'kwargs': kwargs, 'deps': deps, 'pool': 'sar',
+            'priority': priority, 'proc_step': 'TEST', 'scenes': 'scene', 'msg': None}
+
+
+@pytest.mark.parametrize('kind', ['file', 'sqlite'])
+def test_workqueue(tmp_path, kind):
+    if kind == 'file':
+        queue = FileQueue(directory=str(tmp_path / 'queue'))
+    else:
+        queue = SQLiteQueue(filename=str(tmp_path / 'queue.db'))
+    nodes = {'sar:1': _node(deps=[]),
+             'sar:2': _node(deps=[], fail=True),
+             'ard:1': _node(deps=['sar:1'], priority=2),
+             'ard:2': _node(deps=['sar:1', 'sar:2'], priority=2)}
+    queue.submit(nodes)
+
+    # dependent jobs are not leased before their dependencies have finished
+    name, node = queue.lease(worker='test')
+    assert name == 'sar:1'
+    assert queue.summary()['running'] == 1
+    queue.complete(name, result=node['func'](**node['kwargs']))
+    name, node = queue.lease(worker='test')
+    assert name == 'ard:1'
+    queue.complete(name, result=None)
+
+    # the remaining jobs are processed by a worker; ard:2 is blocked by the failing job sar:2
+    summary = work(queue=queue, logger=logging.getLogger('test'), poll=0)
+    assert summary == {'pending': 0, 'blocked': 1, 'running': 0, 'done': 2, 'failed': 1}
+
+
+def test_stale_lease(tmp_path):
+    directory = str(tmp_path / 'queue')
+    queue_a = FileQueue(directory=directory, lease=60)
+    queue_a.submit({'sar:1': _node(deps=[])})
+    name, node = queue_a.lease(worker='a')
+    lock = queue_a._file(name) + '.lock'
+    
+    # the lease of worker a expires and the job is taken over by worker b
+    past = os.path.getmtime(lock) - 120
+    os.utime(lock, (past, past))
+    queue_b = FileQueue(directory=directory, lease=60)
+    assert queue_b.lease(worker='b') == (name, node)
+    assert queue_b.summary()['running'] == 1
+    
+    # worker a has lost its lease and does not remove the lock of worker b
+    assert not queue_a.renew(name)
+    queue_a.complete(name, result=None)
+    assert os.path.isfile(lock)
+    assert queue_b.renew(name)
+    queue_b.complete(name, result=None)
+    assert not os.path.isfile(lock)
+    assert queue_b.summary()['done'] == 1